@@ -0,0 +1,144 @@
+"""Parse time and peak memory of /api/upload-excel's workbook reading.
+
+Writes a synthetic workbook in the upload layout (a title row, then headers) with ``--rows``
+banking rows and proportionally fewer in the other sheets, then parses it in a fresh
+interpreter per variant:
+
+- before: the upload read into memory, ``pd.read_excel`` once per sheet
+- after: every sheet from one ``ExcelFile`` on the upload's spooled file (openpyxl read-only)
+- after, calamine: the same with the calamine engine, when python-calamine is installed
+
+Run from backend/:
+
+    uv run python scripts/bench_excel_parse.py [--rows 50000]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+SHEETS = {
+    "Open Banking Data": [
+        "Company Legal Name", "Year", "Month", "Primary Bank", "Monthly POS Transactions",
+        "Monthly POS Sales Amount", "Monthly Digital Transactions", "Monthly Digital Sales Amount",
+        "Monthly Utility Bill Paid", "Monthly Bank Balance", "Monthly EMI", "Monthly Number of Bounced Cheques",
+    ],
+    "Financial statements - SME self": [
+        "Company Legal Name", "Year", "Annual Revenue", "Net Profit", "Total Liabilities", "Total Debt",
+        "Shareholder Equity", "Employees",
+    ],
+    "Tax Authorities": [
+        "Company Legal Name", "Year", "Income tax Return Filed", "Filing Status", "GST/Tax Filing Status",
+    ],
+    "Credit Bureaus": ["Company Legal Name", "Year", "Loan Default Count"],
+}
+
+
+def write_workbook(path: str, rows: int) -> None:
+    from openpyxl import Workbook
+
+    rng = random.Random(0)
+    companies = [f"Company {i:04d} Pvt Ltd" for i in range(max(rows // 120, 1))]
+    workbook = Workbook(write_only=True)
+    for sheet_name, columns in SHEETS.items():
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append([sheet_name])
+        sheet.append(columns)
+        sheet_rows = rows if sheet_name == "Open Banking Data" else max(rows // 12, 1)
+        for i in range(sheet_rows):
+            row = [rng.choice(companies), 2015 + i % 10]
+            for column in columns[2:]:
+                if column == "Primary Bank":
+                    row.append(rng.choice(["HDFC", "SBI", "ICICI", "Axis"]))
+                elif column == "Income tax Return Filed":
+                    row.append(rng.choice(["Yes", "No"]))
+                elif column in ("Filing Status", "GST/Tax Filing Status"):
+                    row.append(rng.choice(["Filed", "Pending", "Regular"]))
+                else:
+                    row.append(round(rng.uniform(0, 1e6), 2))
+            sheet.append(row)
+    workbook.save(path)
+
+
+def run_variant(variant: str, path: str) -> dict:
+    import pandas as pd
+
+    from app.core.excel import read_sheets
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if variant == "before":
+        with open(path, "rb") as f:
+            contents = f.read()
+        sheets = {name: pd.read_excel(io.BytesIO(contents), sheet_name=name, skiprows=1) for name in SHEETS}
+    else:
+        # the upload as Starlette hands it over, UploadFile.file spooled to disk past 1 MB; spooling
+        # happens while the request is parsed, before the endpoint runs, so it is not timed
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as upload, open(path, "rb") as f:
+            shutil.copyfileobj(f, upload, 1024 * 1024)
+            start = time.perf_counter()
+            engine = "calamine" if variant == "after, calamine" else "openpyxl"
+            sheets = read_sheets(upload, list(SHEETS), engine=engine)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "seconds": elapsed,
+        "peak_rss_mb": peak_kb / 1024,
+        "peak_rss_growth_mb": (peak_kb - baseline_kb) / 1024,
+        "rows": sum(len(df) for df in sheets.values()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--workbook", help="parse this workbook instead of writing a synthetic one")
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.workbook)))
+        return
+
+    variants = ["before", "after"]
+    try:
+        import python_calamine  # noqa: F401
+
+        variants.append("after, calamine")
+    except ImportError:
+        print("python-calamine not installed, skipping the calamine engine")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.workbook or os.path.join(tmp, "bench.xlsx")
+        if not args.workbook:
+            start = time.perf_counter()
+            write_workbook(path, args.rows)
+            print(f"wrote {args.rows} banking rows in {time.perf_counter() - start:.1f}s")
+        print(f"workbook: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        print(f"{'variant':<16} {'parse':>8} {'peak RSS':>10} {'growth':>10} {'rows':>8}")
+        for variant in variants:
+            # a fresh interpreter each, so peak RSS isn't carried over from the previous variant
+            out = subprocess.run(
+                [sys.executable, __file__, "--variant", variant, "--workbook", path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{variant:<16} {result['seconds']:>7.2f}s {result['peak_rss_mb']:>8.0f}MB "
+                f"{result['peak_rss_growth_mb']:>8.0f}MB {result['rows']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Per-request key setup cost of /api/generate-ciphertext.
+
+Times what every ciphertext request does before it encrypts anything (client key pair, shared
+key with the server key, nonce XOR, IV and session key), the way it used to be done (server key
+decoded and decompressed per request, point_mul, byte-at-a-time helpers) and with the
+precomputed key material, plus the one-off cost of loading a server key.
+
+Run from backend/ with the app's environment (.env or SECRET_KEY set):
+
+    uv run python scripts/bench_key_setup.py [--iterations 200]
+"""
+
+import argparse
+import base64
+import hashlib
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from app.core.curve25519 import G, convert2wei, point_compress, point_decompress, point_mul, point_mul_g  # noqa: E402
+from app.core.key_material import (  # noqa: E402
+    BUILT_IN_SERVER_NONCE,
+    BUILT_IN_SERVER_PUBLIC_KEY,
+    FAST_KEY_AGREEMENT,
+    get_iv,
+    get_session_key,
+    get_xored_nonce,
+    load_key_material,
+    server_keys,
+)
+
+
+def client_private_key() -> int:
+    private_key = int.from_bytes(random.randbytes(32), "little")
+    private_key &= (1 << 254) - 8
+    private_key |= 1 << 254
+    return private_key
+
+
+# ---- the per-request path before key material was cached ----
+
+
+def legacy_hmac(key: bytes, message: bytes) -> bytes:
+    block_size = hashlib.sha256().block_size
+    if len(key) > block_size:
+        key = hashlib.sha256(key).digest()
+    if len(key) < block_size:
+        key = key + b"\x00" * (block_size - len(key))
+    o_key_pad = bytes((x ^ 0x5C) for x in key)
+    i_key_pad = bytes((x ^ 0x36) for x in key)
+    inner_hash = hashlib.sha256(i_key_pad + message).digest()
+    return hashlib.sha256(o_key_pad + inner_hash).digest()
+
+
+def legacy_session(self_nonce: bytes, server_nonce: bytes, shared_key: bytes) -> tuple[bytes, bytes]:
+    xored_nonce = b""
+    for b1, b2 in zip(self_nonce, server_nonce):
+        xored_nonce += (b1 ^ b2).to_bytes(length=1, byteorder="big")
+    iv = b""
+    for i in range(12):
+        iv += xored_nonce[i + 20].to_bytes(length=1, byteorder="big")
+    salt = b""
+    for i in range(20):
+        salt += xored_nonce[i].to_bytes(length=1, byteorder="big")
+    prk = legacy_hmac(salt, shared_key)
+    session_key = legacy_hmac(prk, b"" + b"" + bytes([1]))
+    return session_key, iv
+
+
+def legacy_key_setup() -> tuple[bytes, bytes]:
+    private_key = client_private_key()
+    point_compress(point_mul(private_key, G))
+    self_nonce = random.randbytes(32)
+    server_point = point_decompress(base64.b64decode(BUILT_IN_SERVER_PUBLIC_KEY))
+    server_nonce = base64.b64decode(BUILT_IN_SERVER_NONCE)
+    shared_key = convert2wei(point_mul(private_key, server_point)).to_bytes(32, "big")
+    return legacy_session(self_nonce, server_nonce, shared_key)
+
+
+# ---- with precomputed key material ----
+
+
+def key_setup() -> tuple[bytes, bytes]:
+    private_key = client_private_key()
+    point_compress(point_mul_g(private_key))
+    self_nonce = random.randbytes(32)
+    material = server_keys.current()
+    shared_key = material.shared_key(private_key)
+    xored_nonce = get_xored_nonce(self_nonce, material.nonce)
+    return get_session_key(xored_nonce, shared_key), get_iv(xored_nonce)
+
+
+def per_call_us(fn, iterations: int) -> float:
+    # best of 5 repeats: the least disturbed by whatever else the machine is doing
+    return min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    n = args.iterations
+
+    # same inputs, same keys: the legacy and current paths must agree byte for byte
+    state = random.getstate()
+    expected = legacy_key_setup()
+    random.setstate(state)
+    if key_setup() != expected:
+        sys.exit("key setup differs from the legacy path")
+
+    material = server_keys.current()
+    private_key = client_private_key()
+    self_nonce = random.randbytes(32)
+    shared_key = material.shared_key(private_key)
+    xored_nonce = get_xored_nonce(self_nonce, material.nonce)
+    server_point = material.point
+
+    def decode_server_key() -> tuple:
+        return point_decompress(base64.b64decode(BUILT_IN_SERVER_PUBLIC_KEY))
+
+    def session_now() -> tuple[bytes, bytes]:
+        return get_session_key(xored_nonce, shared_key), get_iv(get_xored_nonce(self_nonce, material.nonce))
+
+    def key_load(with_table: bool = False) -> None:
+        load_key_material(BUILT_IN_SERVER_PUBLIC_KEY, BUILT_IN_SERVER_NONCE, "bench", with_table=with_table)
+
+    rows = [
+        ("per request, before", per_call_us(legacy_key_setup, n)),
+        ("per request, now", per_call_us(key_setup, n)),
+        ("  client key pair: point_mul(sk, G)", per_call_us(lambda: point_mul(private_key, G), n)),
+        ("  client key pair: G table", per_call_us(lambda: point_mul_g(private_key), n)),
+        ("  server key: decode + decompress", per_call_us(decode_server_key, n)),
+        ("  server key: server_keys.current()", per_call_us(server_keys.current, n)),
+        ("  shared key: point_mul", per_call_us(lambda: convert2wei(point_mul(private_key, server_point)), n)),
+        ("  shared key: KeyMaterial.shared_key", per_call_us(lambda: material.shared_key(private_key), n)),
+        (
+            "  nonce/IV/session key: byte at a time",
+            per_call_us(lambda: legacy_session(self_nonce, material.nonce, shared_key), n),
+        ),
+        ("  nonce/IV/session key: now", per_call_us(session_now, n)),
+        ("per key load", per_call_us(key_load, max(n // 20, 1))),
+        ("per key load, with table", per_call_us(lambda: key_load(with_table=True), max(n // 100, 1))),
+    ]
+
+    print(f"X25519 key agreement: {'on' if FAST_KEY_AGREEMENT else 'off (X25519 unavailable)'}; {n} iterations")
+    width = max(len(name) for name, _ in rows)
+    for name, us in rows:
+        print(f"{name:<{width}}  {us:>10.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ from .smes import router as smes_router
 from .loans import router as loans_router
 from .upload import router as upload_router
 from .query import router as query_router
+from .score_jobs import router as score_jobs_router
+from .portfolio import router as portfolio_router
+from .scores import router as scores_router
 
 router = APIRouter(prefix="/v1")
 router.include_router(login_router)
@@ -19,4 +22,7 @@ router.include_router(banks_router)
 router.include_router(smes_router)
 router.include_router(loans_router)
 router.include_router(upload_router)
-router.include_router(query_router)
\ No newline at end of file
+router.include_router(query_router)
+router.include_router(score_jobs_router)
+router.include_router(portfolio_router)
+router.include_router(scores_router)
\ No newline at end of file
@@ -0,0 +1,260 @@
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Annotated, Any, cast
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core.config import settings
+from ...core.db.database import async_get_db
+from ...core.exceptions.http_exceptions import NotFoundException
+from ...core.tracing import current_traceparent
+from ...core.utils import queue
+from ...crud import sme, user
+from ...crud.crud_loan import crud_loans, loan
+from ...crud.crud_score import score as crud_score
+from ...schemas.score import ScoreRead
+from .query import (
+    MPC_NODE_1_URL,
+    MPC_NODE_2_URL,
+    MPC_NODE_3_URL,
+    RELAY_SERVER_URL,
+    QueryRequest,
+    ScoreGenerationRequest,
+    build_query_requests,
+    build_score_response,
+    group_query_results,
+    run_query,
+)
+from .score_jobs import cancel_job, read_job_status
+
+router = APIRouter(tags=["portfolio"])
+
+
+class PortfolioScoreRequest(BaseModel):
+    loan_ids: list[int] | None = None
+    sme_ids: list[int] | None = None
+    lending_bank_id: int | None = None
+    year: int
+    start_date: str
+    end_date: str
+    relay_server_url: str | None = None
+    mpc_node_urls: list[str] | None = None
+    max_concurrency: int | None = None
+    use_cache: bool = True
+
+
+class PortfolioTarget(BaseModel):
+    sme_id: int
+    loan_id: int | None = None
+    email: str
+    company_name: str
+
+
+# Shared by every portfolio job in the process, so concurrent jobs split the cluster instead of each
+# claiming the full budget. Waiters are served in arrival order, which interleaves the jobs' queries.
+portfolio_budget = asyncio.Semaphore(settings.PORTFOLIO_QUERY_CONCURRENCY)
+
+
+class TargetRun:
+    def __init__(self, target: PortfolioTarget, query_requests: list[QueryRequest]) -> None:
+        self.target = target
+        self.query_requests = query_requests
+        self.query_results: list[dict | None] = [None] * len(query_requests)
+        self.next_index = 0
+        self.remaining = len(query_requests)
+        self.failed = False
+
+
+def interleave(runs: list[TargetRun], max_active: int) -> Iterator[tuple[TargetRun, int]]:
+    """Yield (run, query index) pairs round-robin across a window of at most max_active targets.
+
+    A target leaves the window once all its queries are handed out, letting the next one in, so
+    scores complete steadily instead of all at the end of a large portfolio.
+    """
+    pending = deque(runs)
+    active: deque[TargetRun] = deque()
+    while pending or active:
+        while pending and len(active) < max_active:
+            active.append(pending.popleft())
+        run = active.popleft()
+        if run.failed or run.next_index >= len(run.query_requests):
+            continue
+        index = run.next_index
+        run.next_index += 1
+        if run.next_index < len(run.query_requests):
+            active.append(run)
+        yield run, index
+
+
+async def run_portfolio(
+    request: PortfolioScoreRequest,
+    targets: list[PortfolioTarget],
+    on_score: Callable[[PortfolioTarget, dict[str, Any]], Awaitable[None]],
+    on_failure: Callable[[PortfolioTarget, Exception], Awaitable[None]],
+    on_query: Callable[[PortfolioTarget], Awaitable[None]] | None = None,
+) -> None:
+    """Score every target, scheduling their queries across the MPC cluster.
+
+    At most ``max_concurrency`` of this job's queries run at once (and never more than the
+    process-wide ``portfolio_budget``). ``on_score`` receives each score as soon as its last
+    query finishes; a target whose query raises is reported to ``on_failure`` and its
+    remaining queries are skipped.
+    """
+    relay_server = request.relay_server_url or RELAY_SERVER_URL
+    default_node_urls = [MPC_NODE_1_URL, MPC_NODE_2_URL, MPC_NODE_3_URL]
+    node_urls = (
+        request.mpc_node_urls if request.mpc_node_urls and len(request.mpc_node_urls) == 3 else default_node_urls
+    )
+
+    runs = []
+    for target in targets:
+        score_request = ScoreGenerationRequest(
+            email=target.email,
+            company_name=target.company_name,
+            year=request.year,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            use_cache=request.use_cache,
+        )
+        runs.append(TargetRun(target, build_query_requests(score_request, relay_server, node_urls)))
+
+    concurrency = max(
+        1, min(request.max_concurrency or settings.PORTFOLIO_QUERY_CONCURRENCY, settings.PORTFOLIO_QUERY_CONCURRENCY)
+    )
+    queries_per_target = max(1, len(runs[0].query_requests)) if runs else 1
+    # enough targets in the window to keep every slot busy, plus one to cover stragglers
+    max_active = -(-concurrency // queries_per_target) + 1
+    schedule = interleave(runs, max_active)
+
+    async def fail(run: TargetRun, error: Exception) -> None:
+        if not run.failed:
+            run.failed = True
+            await on_failure(run.target, error)
+
+    async def worker() -> None:
+        for run, index in schedule:
+            if run.failed:
+                continue
+            try:
+                async with portfolio_budget:
+                    query_result = await run_query(run.query_requests[index])
+            except Exception as e:
+                await fail(run, e)
+                continue
+
+            run.query_results[index] = query_result
+            run.remaining -= 1
+            if on_query:
+                await on_query(run.target)
+            if run.remaining or run.failed:
+                continue
+
+            try:
+                # its last query is in, so no result is None any more
+                query_results = cast(list[dict], run.query_results)
+                score = build_score_response(group_query_results(run.query_requests, query_results))
+                await on_score(run.target, score)
+            except Exception as e:
+                await fail(run, e)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def resolve_targets(
+    request: PortfolioScoreRequest, db: AsyncSession
+) -> tuple[list[PortfolioTarget], list[dict[str, Any]]]:
+    """Turn the requested loans, SMEs and lending bank into scoring targets, plus the ones that were skipped"""
+    loans = []
+    if request.lending_bank_id is not None:
+        loans.extend(await loan.get_loans_by_bank(db=db, bank_id=request.lending_bank_id))
+    if request.loan_ids:
+        found = {db_loan.id: db_loan for db_loan in await loan.get_loans_by_ids(db=db, ids=request.loan_ids)}
+        missing = [loan_id for loan_id in request.loan_ids if loan_id not in found]
+        if missing:
+            raise NotFoundException(f"Loan {', '.join(map(str, missing))} not found")
+        loans.extend(found[loan_id] for loan_id in request.loan_ids)
+
+    # (sme_id, loan_id) pairs in request order, each once
+    wanted: dict[tuple[int, int | None], None] = {}
+    deleted: dict[int, int] = {}
+    for db_loan in loans:
+        if db_loan.is_deleted:
+            deleted[db_loan.id] = db_loan.sme_id
+        else:
+            wanted[(db_loan.sme_id, db_loan.id)] = None
+    for sme_id in request.sme_ids or []:
+        wanted[(sme_id, None)] = None
+
+    skipped: list[dict[str, Any]] = [
+        {"sme_id": sme_id, "loan_id": loan_id, "reason": "Loan deleted"} for loan_id, sme_id in deleted.items()
+    ]
+    sme_ids = list(dict.fromkeys(sme_id for sme_id, _ in wanted))
+    names = await sme.get_names_by_ids(db=db, ids=sme_ids) if sme_ids else {}
+    emails = await user.get_emails_by_sme_ids(db=db, sme_ids=list(names)) if names else {}
+
+    targets: list[PortfolioTarget] = []
+    for sme_id, target_loan_id in wanted:
+        if sme_id not in names or sme_id not in emails:
+            skipped.append({"sme_id": sme_id, "loan_id": target_loan_id, "reason": "SME or its user not found"})
+            continue
+        targets.append(
+            PortfolioTarget(sme_id=sme_id, loan_id=target_loan_id, email=emails[sme_id], company_name=names[sme_id])
+        )
+
+    return targets, skipped
+
+
+@router.post("/api/portfolio-jobs", status_code=201)
+async def create_portfolio_job(
+    request: PortfolioScoreRequest, db: Annotated[AsyncSession, Depends(async_get_db)]
+) -> dict[str, Any]:
+    """Queue scoring of a set of loans/SMEs (or a lending bank's whole book) as one background job"""
+    if queue.pool is None:
+        raise HTTPException(status_code=503, detail="Queue is not available")
+    if request.lending_bank_id is None and not request.loan_ids and not request.sme_ids:
+        raise HTTPException(status_code=422, detail="Provide loan_ids, sme_ids or lending_bank_id")
+
+    targets, skipped = await resolve_targets(request, db)
+    if not targets:
+        raise NotFoundException("Nothing to score")
+
+    for target in targets:
+        if target.loan_id is not None:
+            await crud_loans.update(db=db, object={"insights_status": "Queued"}, id=target.loan_id)
+
+    job = await queue.pool.enqueue_job(
+        "generate_portfolio_job",
+        request.model_dump(exclude={"loan_ids", "sme_ids", "lending_bank_id"}),
+        [target.model_dump() for target in targets],
+        traceparent=current_traceparent(),
+    )
+    if job is None:
+        raise HTTPException(status_code=409, detail="Job already exists")
+
+    return {"job_id": job.job_id, "total_targets": len(targets), "skipped": skipped}
+
+
+@router.get("/api/portfolio-jobs/{job_id}")
+async def get_portfolio_job(job_id: str, response: Response) -> dict[str, Any]:
+    """Return the status and aggregate progress of a portfolio job"""
+    # polled for progress, like a score job's status
+    response.headers["Cache-Control"] = "no-store"
+    return await read_job_status(job_id, queue.read_portfolio_job_progress)
+
+
+@router.delete("/api/portfolio-jobs/{job_id}", status_code=202)
+async def delete_portfolio_job(job_id: str) -> dict[str, str]:
+    """Cancel a portfolio job; scores already persisted are kept, loans not scored yet read ``Cancelled``"""
+    return await cancel_job(job_id)
+
+
+@router.get("/api/loan/{loan_id}/score", response_model=ScoreRead)
+async def read_loan_score(loan_id: int, db: Annotated[AsyncSession, Depends(async_get_db)]) -> ScoreRead:
+    """Return the most recent persisted score of a loan"""
+    db_score = await crud_score.get_latest_by_loan(db=db, loan_id=loan_id)
+    if db_score is None:
+        raise NotFoundException("Score not found")
+    return ScoreRead.model_validate(db_score, from_attributes=True)
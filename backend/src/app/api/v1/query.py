@@ -1,11 +1,43 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-import httpx
+from collections.abc import Awaitable, Callable
+from typing import List, Dict, Any, Optional, cast
 import os
 import asyncio
+import logging
+import time
+
+from ...core.db.database import local_session
+from ...core.disconnect import cancel_on_disconnect
+from ...core.exceptions.mpc_exceptions import NodeUnavailableError
+from ...core.key_material import server_keys
+from ...core.metrics import (
+    node_time_taken_seconds,
+    queries_in_flight,
+    query_duration_seconds,
+    score_duration_seconds,
+    scores_in_flight,
+)
+from ...core.mpc.cancellation import task_canceller
+from ...core.mpc.capabilities import BATCH_QUERY_PATH, node_capabilities
+from ...core.mpc.clients import origin
+from ...core.mpc.dispatch import dispatch_to_nodes, encode_payload
+from ...core.mpc.health import node_health
+from ...core.mpc.relay_pool import relay_ids
+from ...core.mpc.completion import completions
+from ...core.mpc.polling import PollStrategy, poll_tasks
+from ...core.mpc.singleflight import single_flight
+from ...core.score_graph import ScoreGraph
+from ...core.scorecard import Scorecard, format_breakdown, scorecard
+from ...core.sse import EventCallback, stream_events
+from ...core.tracing import tracer
+from ...core.utils.cache import result_cache
+from ...crud import user
+from ...crud.crud_score import crud_scores
+from ...schemas.score import ScoreCreate
 
 router = APIRouter(tags=["query"])
+logger = logging.getLogger(__name__)
 
 # Configuration - can be overridden via environment variables
 RELAY_SERVER_URL = os.getenv('RELAY_SERVER_URL', 'http://0.0.0.0:9007')
@@ -13,6 +45,14 @@ MPC_NODE_1_URL = os.getenv('MPC_NODE_1_URL', 'http://0.0.0.0:9000')
 MPC_NODE_2_URL = os.getenv('MPC_NODE_2_URL', 'http://0.0.0.0:9001')
 MPC_NODE_3_URL = os.getenv('MPC_NODE_3_URL', 'http://0.0.0.0:9002')
 
+# Probe the default relay and nodes from startup, before any query needs them
+node_health.watch(RELAY_SERVER_URL, MPC_NODE_1_URL, MPC_NODE_2_URL, MPC_NODE_3_URL)
+# ...and have relay IDs ready for the first queries
+relay_ids.watch(RELAY_SERVER_URL)
+
+# Maximum number of scoring queries in flight at once in concurrent /api/generate-score
+SCORE_QUERY_CONCURRENCY = int(os.getenv('SCORE_QUERY_CONCURRENCY', '16'))
+
 # =========================
 # Pydantic Models
 # =========================
@@ -20,13 +60,20 @@ MPC_NODE_3_URL = os.getenv('MPC_NODE_3_URL', 'http://0.0.0.0:9002')
 class QueryRequest(BaseModel):
     email: str
     category: str
-    query_str: str
+    # either one query_str, or several query_strs of the category to run as a batch
+    query_str: Optional[str] = None
+    query_strs: Optional[List[str]] = None
     company_name: str
     year: int
     start_date: str
     end_date: str
     relay_server_url: Optional[str] = None
     mpc_node_urls: Optional[List[str]] = None
+    use_cache: bool = True
+
+    def all_query_strs(self) -> List[str]:
+        """The batch's query_strs, or the one query_str"""
+        return self.query_strs or [cast(str, self.query_str)]
 
 class ScoreGenerationRequest(BaseModel):
     email: str
@@ -36,10 +83,19 @@ class ScoreGenerationRequest(BaseModel):
     end_date: str
     relay_server_url: Optional[str] = None
     mpc_node_urls: Optional[List[str]] = None
+    concurrent: bool = True
+    max_concurrency: Optional[int] = None
+    use_cache: bool = True
+
+class BatchScoreRequest(BaseModel):
+    # one generate-score `raw_results` per company: {category: {query: data}}
+    raw_results: List[Dict[str, Dict[str, Any]]]
 
 class PollRequest(BaseModel):
     task_ids: List[Dict[str, Any]]
     relay_id: str
+    query_str: Optional[str] = None
+    callback_id: Optional[str] = None
 
 # =========================
 # Scoring Logic
@@ -70,293 +126,67 @@ QUERIES = {
     ]
 }
 
+# query_str -> category, for labelling metrics of queries polled without their category
+QUERY_CATEGORIES = {query_str: category for category, queries in QUERIES.items() for query_str in queries}
+
+# Queries -> metric scores and the EMI coverage ratio -> category subtotals; queries are
+# dispatched in DISPATCH_PRIORITY order so the derived values are ready as early as possible
+score_graph = ScoreGraph(QUERIES, scorecard)
+DISPATCH_PRIORITY = {query_str: rank for rank, query_str in enumerate(score_graph.dispatch_order())}
+
 def calculate_metric_score(metric: str, value: Any) -> float:
     """Calculate score for a specific metric based on its value"""
-    if value is None or value == '':
-        return 0.0
-
-    try:
-        val = float(value)
-    except (ValueError, TypeError):
-        # Handle string values (Filed/Not Filed)
-        if metric in ['GetFilingStatus', 'GetITRFiled']:
-            val_str = str(value).lower()
-            if 'filed on time' in val_str or val_str == 'filed on time':
-                return 10.0
-            elif 'filed late' in val_str or val_str == 'filed late':
-                return 2.5
-            elif 'filed' in val_str:
-                return 10.0  # Assume on time if just "filed"
-            return 0.0
-        if metric == 'GetGSTTaxFilingStatus':
-            return 10.0 if 'filed' in str(value).lower() else 0.0
-        return 0.0
-
-    # Financial Health metrics
-    if metric == 'GetProfitMargin':
-        # Value is already in percentage format (12.62 means 12.62%, not 0.1262)
-        percent = val  # Don't multiply by 100
-        if percent < 0: return 0.0
-        if percent < 5: return 2.5
-        if percent < 10: return 5.0
-        if percent < 20: return 7.5
-        return 10.0
-
-    if metric == 'GetDebtToEquity':
-        if val < 0.5: return 10.0
-        if val < 1: return 7.5
-        if val < 1.5: return 5.0
-        if val < 2: return 2.5
-        return 0.0
-
-    if metric == 'GetRevenueGrowthRate':
-        # Value is already in percentage format (0.69 means 0.69%, not 0.0069)
-        percent = val  # Don't multiply by 100
-        if percent < 2.5: return 0.0
-        if percent < 5: return 2.5
-        if percent < 10: return 5.0
-        if percent < 15: return 7.5
-        return 10.0
-
-    # Liquidity & Repayment metrics
-    if metric == 'AvgBankBalance':
-        if val < 5000: return 0.0
-        if val < 10000: return 2.5
-        if val < 15000: return 5.0
-        if val < 20000: return 7.5
-        return 10.0
-
-    if metric == 'AnnualBouncedCheques':
-        if val == 0: return 10.0
-        if val == 1: return 7.5
-        if val == 2: return 5.0
-        return 0.0
-
-    # Compliance Behavior metrics
-    if metric == 'GetLoanDefaultCounts':
-        if val == 0: return 10.0
-        if val == 1: return 7.5
-        if val == 2: return 5.0
-        return 0.0
-
-    # Operational Size & Stability metrics
-    if metric == 'GetEmployeeCount':
-        if val < 50: return 5.0
-        if val < 100: return 7.5
-        return 10.0
-
-    if metric == 'AnnualUtilityBillPaid':
-        if val < 20000: return 0.0
-        if val < 35000: return 2.5
-        if val < 45000: return 5.0
-        if val < 55000: return 7.5
-        return 10.0
-
-    if metric == 'AnnualPOSTnx':
-        if val < 30000: return 0.0
-        if val < 45000: return 2.5
-        if val < 60000: return 5.0
-        if val < 75000: return 7.5
-        return 10.0
-
-    return 0.0
+    return scorecard.metric_score(metric, value)
 
 def get_metric_weight(metric: str) -> float:
     """Get the weight percentage for a metric"""
-    weights = {
-        # Financial Health (35%)
-        'GetProfitMargin': 15.0,
-        'GetDebtToEquity': 10.0,
-        'GetRevenueGrowthRate': 10.0,
-
-        # Liquidity & Repayment (25%)
-        'AvgBankBalance': 10.0,
-        'EMICoverageRatio': 10.0,  # Calculated from multiple queries
-        'AnnualBouncedCheques': 5.0,
-
-        # Compliance Behavior (20%)
-        'GetFilingStatus': 10.0,  # Tax Return Filed
-        'GetGSTTaxFilingStatus': 5.0,  # GST Filing History
-        'GetLoanDefaultCounts': 5.0,  # Loan Default Count
-
-        # Operational Size & Stability (20%)
-        'GetEmployeeCount': 5.0,
-        'AnnualUtilityBillPaid': 5.0,
-        'AnnualPOSTnx': 10.0
-    }
-    return weights.get(metric, 0.0)
+    return scorecard.weights.get(metric, 0.0)
 
 def calculate_emi_coverage_ratio(all_results: Dict[str, Dict[str, Any]]) -> float:
     """Calculate EMI Coverage Ratio: (Digital Sales + Digital Txn + POS Sales) / Annual EMI"""
-    try:
-        banking_results = all_results.get('banking', {})
-
-        # Extract values
-        digital_sales = 0.0
-        digital_txn = 0.0
-        pos_sales = 0.0
-        annual_emi = 0.0
-
-        for query_name, data in banking_results.items():
-            if isinstance(data, dict) and 'error' not in data:
-                if query_name == 'AnnualDigitalSalesAmt':
-                    for key, value in data.items():
-                        if key != 'query' and value is not None:
-                            digital_sales = float(value)
-                elif query_name == 'AnnualDigitalTxn':
-                    for key, value in data.items():
-                        if key != 'query' and value is not None:
-                            digital_txn = float(value)
-                elif query_name == 'AnnualPOSSalesAmt':
-                    for key, value in data.items():
-                        if key != 'query' and value is not None:
-                            pos_sales = float(value)
-                elif query_name == 'AnnualEmi':
-                    for key, value in data.items():
-                        if key != 'query' and value is not None:
-                            annual_emi = float(value)
-
-        # Calculate ratio
-        if annual_emi > 0:
-            return (digital_sales + digital_txn + pos_sales) / annual_emi
-        return 0.0
-    except:
-        return 0.0
+    return scorecard.emi_coverage_ratio(all_results)
 
 def calculate_emi_coverage_score(ratio: float) -> float:
     """Score EMI Coverage Ratio"""
-    if ratio < 15: return 0.0
-    if ratio < 25: return 2.5
-    if ratio < 35: return 5.0
-    if ratio < 45: return 7.5
-    return 10.0
+    return scorecard.emi_coverage_score(ratio)
 
 def calculate_total_score(all_results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
     """Calculate total weighted score from all query results with detailed breakdown"""
-    category_scores = {
-        'Financial Health': {'score': 0.0, 'weight': 35.0, 'details': []},
-        'Liquidity & Repayment': {'score': 0.0, 'weight': 25.0, 'details': []},
-        'Compliance Behavior': {'score': 0.0, 'weight': 20.0, 'details': []},
-        'Operational Size & Stability': {'score': 0.0, 'weight': 20.0, 'details': []}
-    }
-
-    # Calculate EMI Coverage Ratio separately
-    emi_coverage_ratio = calculate_emi_coverage_ratio(all_results)
-    emi_coverage_score = calculate_emi_coverage_score(emi_coverage_ratio)
-    emi_weight = get_metric_weight('EMICoverageRatio')
-
-    category_scores['Liquidity & Repayment']['details'].append({
-        'metric': 'EMI Coverage Ratio',
-        'value': emi_coverage_ratio,
-        'score': emi_coverage_score,
-        'weight': emi_weight,
-        'product': (emi_coverage_score / 10.0) * emi_weight
-    })
-    category_scores['Liquidity & Repayment']['score'] += (emi_coverage_score / 10.0) * emi_weight
-
-    # Map queries to categories
-    category_mapping = {
-        'GetProfitMargin': 'Financial Health',
-        'GetDebtToEquity': 'Financial Health',
-        'GetRevenueGrowthRate': 'Financial Health',
-        'AvgBankBalance': 'Liquidity & Repayment',
-        'AnnualBouncedCheques': 'Liquidity & Repayment',
-        'GetFilingStatus': 'Compliance Behavior',
-        'GetITRFiled': 'Compliance Behavior',
-        'GetGSTTaxFilingStatus': 'Compliance Behavior',
-        'GetLoanDefaultCounts': 'Compliance Behavior',
-        'GetEmployeeCount': 'Operational Size & Stability',
-        'AnnualUtilityBillPaid': 'Operational Size & Stability',
-        'AnnualPOSTnx': 'Operational Size & Stability'
-    }
-
-    for category, queries in all_results.items():
-        for query_name, data in queries.items():
-            # Skip queries used in EMI Coverage calculation
-            if query_name in ['AnnualEmi', 'AnnualDigitalSalesAmt', 'AnnualDigitalTxn', 'AnnualPOSSalesAmt']:
-                continue
-
-            # Skip if not in mapping
-            if query_name not in category_mapping:
-                continue
-
-            if data and not isinstance(data, dict) or (isinstance(data, dict) and 'error' not in data):
-                if isinstance(data, dict):
-                    for key, value in data.items():
-                        if key != 'query':
-                            score = calculate_metric_score(query_name, value)
-                            weight = get_metric_weight(query_name)
-                            product = (score / 10.0) * weight
-
-                            cat_name = category_mapping[query_name]
-                            category_scores[cat_name]['details'].append({
-                                'metric': query_name,
-                                'value': value,
-                                'score': score,
-                                'weight': weight,
-                                'product': product
-                            })
-                            category_scores[cat_name]['score'] += product
-
-    # Calculate total
-    total_score = sum(cat['score'] for cat in category_scores.values())
+    return scorecard.score(all_results)
 
-    return {
-        'total_score': round(total_score, 2),
-        'category_breakdown': category_scores,
-        'emi_coverage_ratio': emi_coverage_ratio
-    }
-
-def get_tier_rating(score: int) -> Dict[str, str]:
+def get_tier_rating(score: float) -> Dict[str, str]:
     """Get tier rating based on score"""
-    if score >= 75:
-        return {
-            'tier': 'A',
-            'interpretation': 'Strong financials & low risk',
-            'recommendation': 'Eligible for full credit approval'
-        }
-    if score >= 60:
-        return {
-            'tier': 'B',
-            'interpretation': 'Moderate strength; some flags',
-            'recommendation': 'Lending with collateral or limits'
-        }
-    return {
-        'tier': 'C',
-        'interpretation': 'High concerns or weak fundamentals',
-        'recommendation': 'Deprioritize or decline'
-    }
-
-async def poll_query_result(task_ids: List[Dict], max_attempts: int = 60, poll_interval: int = 2) -> Dict:
-    """Poll MPC nodes for query results"""
-    for attempt in range(max_attempts):
-        await asyncio.sleep(poll_interval)
-
-        all_success = True
-        results = []
-
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            for task in task_ids:
-                if task['status'] == 'success':
-                    try:
-                        response = await client.get(f"{task['url']}/node/query/{task['task_id']}")
-                        result = response.json()
-
-                        if result.get('status') == 'success' and result.get('error') is None:
-                            results.append(result.get('result'))
-                        elif result.get('error'):
-                            all_success = False
-                        else:
-                            all_success = False
-                    except Exception:
-                        all_success = False
-                else:
-                    all_success = False
-
-        if all_success and len(results) == 3:
-            return {'success': True, 'data': results[0]}
-
-    return {'success': False, 'error': 'Polling timeout'}
+    return scorecard.tier(score)
+
+async def poll_query_result(
+    task_ids: List[Dict],
+    query_str: Optional[str] = None,
+    callback_id: Optional[str] = None,
+    strategy: Optional[PollStrategy] = None,
+    on_update: Optional[Callable[[List[Dict]], Awaitable[None]]] = None
+) -> Dict:
+    """Wait for query results from the MPC nodes, via callbacks when available and polling otherwise"""
+    poll = await poll_tasks(
+        task_ids, query_str=query_str, strategy=strategy, callback_id=callback_id, on_update=on_update
+    )
+    observe_node_times(task_ids, query_str, poll)
+
+    if poll['success']:
+        return {'success': True, 'data': poll['results'][0]}
+
+    return {'success': False, 'error': poll['error']}
+
+def observe_node_times(task_ids: List[Dict], query_str: Optional[str], poll: Dict, category: Optional[str] = None):
+    """Record the computation time each node reported for a completed query (or batch of queries)"""
+    category = category or QUERY_CATEGORIES.get(query_str or '', 'unknown')
+    for task, node_status in zip(task_ids, poll['node_statuses']):
+        try:
+            seconds = float(node_status['time_taken'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        node_time_taken_seconds.observe(
+            seconds, category=category, query_str=query_str or 'unknown', node=origin(task['url'])
+        )
 
 def check_category_has_data(category_results: List[Dict]) -> bool:
     """Check if ALL queries in a category have valid data (no N/A values)"""
@@ -382,19 +212,83 @@ async def generate_relay_id(relay_url: Optional[str] = None):
     """Generate a new relay ID by calling the relay server"""
     try:
         relay_server = relay_url or RELAY_SERVER_URL
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{relay_server}/relay')
-            if response.status_code == 200:
-                data = response.json()
-                return {"relay_id": data["relay_id"]}
-            else:
-                raise HTTPException(status_code=response.status_code, detail="Failed to generate relay ID")
+        return {"relay_id": await relay_ids.acquire(relay_server)}
+    except NodeUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def dispatch_query(
+    request: QueryRequest, relay_server: str, node_urls: List[str], query_strs: List[str], batch: bool
+) -> Dict:
+    """Start one MPC computation on all nodes over a fresh relay session.
+
+    With batch, all query_strs go to the nodes' batch endpoint as one task per node; otherwise
+    query_strs holds a single query sent to /node/query.
+    """
+    # First get a relay ID, prefetched unless the pool ran dry
+    relay_id = await relay_ids.acquire(relay_server)
+
+    # Extract host and port from relay_server for WebSocket endpoint
+    # Replace 127.0.0.1 with 0.0.0.0 for WebSocket endpoint (required by relay server)
+    relay_ws = relay_server.replace('http://', 'ws://').replace('https://', 'wss://')
+    relay_ws = relay_ws.replace('127.0.0.1', '0.0.0.0').replace('localhost', '0.0.0.0')
+    relay_endpoint = f"{relay_ws}/relay/{relay_id}"
+
+    # Nodes that support completion callbacks push their result instead of waiting to be polled
+    callback = completions.open()
+
+    # Payloads differ only by party_index, so each node gets its own serialized body
+    bodies = []
+    for party_index in range(len(node_urls)):
+        payload = {
+            "email": request.email,
+            "query_type": request.category,
+            "party_index": party_index,
+            "relay_server_endpoint": relay_endpoint,
+            "year": request.year
+        }
+        if batch:
+            payload["query_strs"] = query_strs
+        else:
+            payload["query_str"] = query_strs[0]
+
+        # Add optional fields only if they have values
+        if request.start_date:
+            payload["start_date"] = request.start_date
+        if request.end_date:
+            payload["end_date"] = request.end_date
+        if request.category:
+            payload["category"] = request.category
+        if request.company_name:
+            payload["company_name"] = request.company_name
+        if callback:
+            payload["callback_url"] = callback["callback_url"]
+            payload["callback_token"] = callback["callback_token"]
+
+        bodies.append(encode_payload(payload))
+
+    results = await dispatch_to_nodes(node_urls, BATCH_QUERY_PATH if batch else '/node/query', bodies)
+
+    return {
+        "relay_id": relay_id,
+        "callback_id": callback["callback_id"] if callback else None,
+        "results": results
+    }
+
 @router.post("/api/execute-query")
 async def execute_query(request: QueryRequest):
-    """Execute MPC query on all three nodes"""
+    """Execute MPC query on all three nodes.
+
+    With `query_strs` instead of `query_str`, the queries run over one relay session and one task per
+    node when every node advertises batch support (in batches of the nodes' `max_batch_size`), and as
+    one computation per query otherwise. The response then has `batch` and one entry per computation
+    in `dispatches`, each with its `query_strs`, `relay_id`, `callback_id` and node `results`. A batch
+    task's result is a list with one entry per query, in `query_strs` order.
+    """
+    if (request.query_str is None) == (not request.query_strs):
+        raise HTTPException(status_code=422, detail="Provide either query_str or query_strs")
+
     try:
         # Use provided URLs or defaults
         relay_server = request.relay_server_url or RELAY_SERVER_URL
@@ -403,77 +297,28 @@ async def execute_query(request: QueryRequest):
         default_node_urls = [MPC_NODE_1_URL, MPC_NODE_2_URL, MPC_NODE_3_URL]
         node_urls = request.mpc_node_urls if request.mpc_node_urls and len(request.mpc_node_urls) == 3 else default_node_urls
 
-        # First generate relay ID
-        async with httpx.AsyncClient() as client:
-            relay_response = await client.post(f'{relay_server}/relay')
-            if relay_response.status_code != 200:
-                raise HTTPException(status_code=500, detail="Failed to generate relay ID")
-
-            relay_data = relay_response.json()
-            relay_id = relay_data["relay_id"]
-
-        # Extract host and port from relay_server for WebSocket endpoint
-        # Replace 127.0.0.1 with 0.0.0.0 for WebSocket endpoint (required by relay server)
-        relay_ws = relay_server.replace('http://', 'ws://').replace('https://', 'wss://')
-        relay_ws = relay_ws.replace('127.0.0.1', '0.0.0.0').replace('localhost', '0.0.0.0')
-        relay_endpoint = f"{relay_ws}/relay/{relay_id}"
-
-        mpc_nodes = [
-            {'url': f'{node_urls[0]}/node/query', 'party_index': 0},
-            {'url': f'{node_urls[1]}/node/query', 'party_index': 1},
-            {'url': f'{node_urls[2]}/node/query', 'party_index': 2}
-        ]
+        # Fail fast while a node is down, or move to a standby triplet (only for the default nodes)
+        node_urls = node_health.route(node_urls, failover=node_urls == default_node_urls)
 
-        results = []
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            for i, node in enumerate(mpc_nodes):
-                payload = {
-                    "email": request.email,
-                    "query_type": request.category,
-                    "query_str": request.query_str,
-                    "party_index": node['party_index'],
-                    "relay_server_endpoint": relay_endpoint,
-                    "year": request.year
-                }
+        if not request.query_strs:
+            return await dispatch_query(request, relay_server, node_urls, request.all_query_strs(), batch=False)
 
-                # Add optional fields only if they have values
-                if request.start_date:
-                    payload["start_date"] = request.start_date
-                if request.end_date:
-                    payload["end_date"] = request.end_date
-                if request.category:
-                    payload["category"] = request.category
-                if request.company_name:
-                    payload["company_name"] = request.company_name
-
-                try:
-                    response = await client.post(node['url'], json=payload)
-                    if response.status_code in [200, 201]:
-                        result = response.json()
-                        results.append({
-                            "node": i + 1,
-                            "status": "success",
-                            "task_id": result.get("task_id"),
-                            "url": node['url'].replace('/node/query', '')
-                        })
-                    else:
-                        results.append({
-                            "node": i + 1,
-                            "status": "error",
-                            "error": f"HTTP {response.status_code}"
-                        })
-                except Exception as e:
-                    results.append({
-                        "node": i + 1,
-                        "status": "error",
-                        "error": str(e)
-                    })
+        batch_size = await node_capabilities.batch_size(node_urls)
+        if batch_size == 0:
+            chunks = [[query_str] for query_str in request.query_strs]
+        else:
+            size = batch_size if batch_size > 0 else len(request.query_strs)
+            chunks = [request.query_strs[i:i + size] for i in range(0, len(request.query_strs), size)]
 
+        dispatches = await asyncio.gather(*(
+            dispatch_query(request, relay_server, node_urls, chunk, batch=batch_size != 0) for chunk in chunks
+        ))
         return {
-            "relay_id": relay_id,
-            "results": results
+            "batch": batch_size != 0,
+            "dispatches": [{"query_strs": chunk, **dispatch} for chunk, dispatch in zip(chunks, dispatches)]
         }
+    except NodeUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -485,208 +330,672 @@ async def query_status(node_url: str, task_id: str):
         import base64
         decoded_url = base64.b64decode(node_url).decode('utf-8')
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{decoded_url}/node/query/{task_id}")
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(status_code=response.status_code, detail="Failed to get status")
+        response = await node_health.request('GET', f"{decoded_url}/node/query/{task_id}", timeout=10.0)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise HTTPException(status_code=response.status_code, detail="Failed to get status")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/api/poll-results")
-async def poll_results(request: PollRequest):
-    """Poll for query results from all MPC nodes"""
-    max_attempts = 60
-    poll_interval = 2
-
-    for attempt in range(max_attempts):
-        await asyncio.sleep(poll_interval)
-
-        all_success = True
-        results = []
-        node_statuses = []
-
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            for task in request.task_ids:
-                node_status = {
-                    'node': task.get('node'),
-                    'status': 'pending'
-                }
+def build_poll_response(request: PollRequest, poll: Dict) -> Dict:
+    """Build the poll-results response from the outcome of poll_tasks"""
+    if poll['success']:
+        # All nodes completed successfully
+        final_result = poll['results'][0]
 
-                if task.get('status') == 'success':
-                    try:
-                        response = await client.get(f"{task['url']}/node/query/{task['task_id']}")
-                        result = response.json()
-
-                        if result.get('status') == 'success' and result.get('error') is None:
-                            results.append(result.get('result'))
-                            node_status['status'] = 'success'
-                            node_status['time_taken'] = result.get('time_taken')
-                        elif result.get('error'):
-                            node_status['status'] = 'error'
-                            node_status['error'] = result.get('error')
-                            all_success = False
-                        else:
-                            node_status['status'] = result.get('status', 'pending')
-                            all_success = False
-                    except Exception as e:
-                        node_status['status'] = 'error'
-                        node_status['error'] = str(e)
-                        all_success = False
-                else:
-                    node_status['status'] = 'error'
-                    node_status['error'] = task.get('error', 'Task failed')
-                    all_success = False
-
-                node_statuses.append(node_status)
-
-        if all_success and len(results) == 3:
-            # All nodes completed successfully
-            final_result = results[0]
-
-            # Check if result has any meaningful data
-            has_data = False
-            for key, value in final_result.items():
-                if key != 'query' and value is not None and value != '' and value != 0:
-                    has_data = True
-                    break
-
-            return {
-                'completed': True,
-                'success': True,
-                'relay_id': request.relay_id,
-                'node_statuses': node_statuses,
-                'result': final_result,
-                'has_data': has_data
-            }
+        # Check if result has any meaningful data
+        has_data = False
+        for key, value in final_result.items():
+            if key != 'query' and value is not None and value != '' and value != 0:
+                has_data = True
+                break
 
-        # Still polling
-        if attempt < max_attempts - 1:
-            # Return current status
-            continue
+        return {
+            'completed': True,
+            'success': True,
+            'relay_id': request.relay_id,
+            'node_statuses': poll['node_statuses'],
+            'result': final_result,
+            'has_data': has_data
+        }
+
+    if poll['timeout']:
+        return {
+            'completed': True,
+            'success': False,
+            'relay_id': request.relay_id,
+            'node_statuses': poll['node_statuses'],
+            'error': 'Polling timeout reached',
+            'timeout': True
+        }
 
-    # Timeout reached
     return {
         'completed': True,
         'success': False,
         'relay_id': request.relay_id,
-        'node_statuses': node_statuses,
-        'error': 'Polling timeout reached',
-        'timeout': True
+        'node_statuses': poll['node_statuses'],
+        'error': poll['error']
     }
 
-@router.post("/api/generate-score")
-async def generate_score(request: ScoreGenerationRequest):
-    """Execute all queries and generate complete score"""
-    try:
-        relay_server = request.relay_server_url or RELAY_SERVER_URL
-        default_node_urls = [MPC_NODE_1_URL, MPC_NODE_2_URL, MPC_NODE_3_URL]
-        node_urls = request.mpc_node_urls if request.mpc_node_urls and len(request.mpc_node_urls) == 3 else default_node_urls
+@router.post("/api/poll-results")
+async def poll_results(request: PollRequest, http_request: Request):
+    """Poll for query results from all MPC nodes (stops, cancelling the node tasks, if the client goes away)"""
+    poll = await cancel_on_disconnect(
+        http_request, poll_tasks(request.task_ids, query_str=request.query_str, callback_id=request.callback_id)
+    )
+    observe_node_times(request.task_ids, request.query_str, poll)
+    return build_poll_response(request, poll)
+
+@router.post("/api/poll-results/stream")
+async def poll_results_stream(request: PollRequest):
+    """Stream per-node status changes as Server-Sent Events, then the poll-results response as a `result` event"""
+    async def run(emit: EventCallback) -> Dict:
+        async def on_update(node_statuses: List[Dict]):
+            await emit('node_status', {'relay_id': request.relay_id, 'node_statuses': node_statuses})
+
+        poll = await poll_tasks(
+            request.task_ids,
+            query_str=request.query_str,
+            callback_id=request.callback_id,
+            on_update=on_update
+        )
+        observe_node_times(request.task_ids, request.query_str, poll)
+        return build_poll_response(request, poll)
+
+    return stream_events(run, final_event='result')
+
+@router.post("/api/mpc-callback/{callback_id}")
+async def mpc_callback(callback_id: str, payload: Dict[str, Any], x_callback_token: str = Header(...)):
+    """Receive a task completion pushed by an MPC node"""
+    if not completions.verify(callback_id, x_callback_token):
+        raise HTTPException(status_code=401, detail="Invalid callback token")
+    if payload.get('task_id') is None:
+        raise HTTPException(status_code=400, detail="Missing task_id")
+
+    await completions.deliver(callback_id, payload)
+    return {"status": "accepted"}
+
+def query_cache_key(query_request: QueryRequest, query_str: Optional[str], data_version: Any) -> tuple:
+    """Cache (and single-flight) key of one query's result, computed from data_version of the email's category data"""
+    return (
+        query_request.email, query_request.category, data_version, query_str,
+        query_request.company_name, query_request.year, query_request.start_date, query_request.end_date
+    )
+
+async def run_query(query_request: QueryRequest, on_event: Optional[EventCallback] = None) -> Dict:
+    """Execute a single query on all MPC nodes and wait for its result.
+
+    When on_event is given it receives `query_dispatched`, `node_status` and `query_result` events.
+    Successful results are cached per query and data version of the category (so until new ciphertext is
+    posted for it, or SCORE_CACHE_QUERY_TTL); a cache hit only emits `query_result` (with `cached: true`).
+    A query identical to one already in flight waits for that one instead of dispatching again, and
+    also only emits `query_result` (with `shared: true`).
+    """
+    # read before dispatching: a result computed while new ciphertext arrives is stored under the old version
+    data_version = await result_cache.data_version(query_request.email, query_request.category)
+    cache_key = query_cache_key(query_request, query_request.query_str, data_version)
+    if query_request.use_cache:
+        cached: Optional[Dict] = await result_cache.get('query', *cache_key)
+        if cached is not None:
+            if on_event:
+                await on_event('query_result', {
+                    'category': query_request.category,
+                    'query': query_request.query_str,
+                    'relay_id': cached['relay_id'],
+                    'result': cached['result'],
+                    'cached': True
+                })
+            return cached
+
+    async def dispatch_and_poll() -> Dict:
+        query_response = await execute_query(query_request)
+        relay_id = query_response['relay_id']
+        event_base = {'category': query_request.category, 'query': query_request.query_str, 'relay_id': relay_id}
+
+        on_update = None
+        if on_event:
+            await on_event('query_dispatched', {**event_base, 'node_results': query_response['results']})
+
+            async def on_update(node_statuses: List[Dict]):
+                await on_event('node_status', {**event_base, 'node_statuses': node_statuses})
+
+        with tracer.span('mpc.poll', relay_id=relay_id, callback=query_response['callback_id'] is not None) as span:
+            query_result = await poll_query_result(
+                query_response['results'],
+                query_str=query_request.query_str,
+                callback_id=query_response['callback_id'],
+                on_update=on_update
+            )
+            if not query_result['success']:
+                span.record_error(query_result.get('error') or 'Query failed')
+
+        result = {
+            'query_str': query_request.query_str,
+            'relay_id': relay_id,
+            'result': query_result
+        }
+        if query_result['success']:
+            await result_cache.set(
+                'query', *cache_key, value=result,
+                tags=[result_cache.tag(query_request.email, query_request.category)], ttl=result_cache.query_ttl
+            )
+        return result
+
+    async def compute() -> Dict:
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            with queries_in_flight.track_inprogress(), tracer.span(
+                'mpc.query', category=query_request.category, query_str=query_request.query_str
+            ) as span:
+                result = await dispatch_and_poll()
+                span.set_attribute('relay_id', result['relay_id'])
+            outcome = 'success' if result['result']['success'] else 'failed'
+            return result
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        finally:
+            query_duration_seconds.observe(
+                time.perf_counter() - start,
+                category=query_request.category, query_str=query_request.query_str, outcome=outcome
+            )
+
+    # Identical queries already running (another tab, a double click) share that computation
+    result: Dict
+    result, shared = await single_flight.run(compute, *cache_key)
+
+    if on_event:
+        event = {
+            'category': query_request.category,
+            'query': query_request.query_str,
+            'relay_id': result['relay_id'],
+            'result': result['result']
+        }
+        if shared:
+            event['shared'] = True
+        await on_event('query_result', event)
+
+    return result
+
+def split_batch_result(query_strs: List[str], data: Any) -> List[Dict]:
+    """One poll_query_result-shaped result per query from a batch task's result list"""
+    if not isinstance(data, list) or len(data) != len(query_strs):
+        return [{'success': False, 'error': 'Malformed batch result'} for _ in query_strs]
+    return [
+        {'success': False, 'error': item['error']} if isinstance(item, dict) and item.get('error')
+        else {'success': True, 'data': item}
+        for item in data
+    ]
+
+async def run_batch_query(query_request: QueryRequest, on_event: Optional[EventCallback] = None) -> List[Dict]:
+    """run_query for several `query_strs` of one category: one relay session and node task for all
+    of them when the nodes support batches, one computation per query otherwise.
+
+    Returns a run_query result per query, in `query_strs` order, and emits the same per-query events.
+    Results are cached per query, so only queries without a cached result are dispatched.
+    """
+    category = query_request.category
+    query_strs = query_request.all_query_strs()
+    results: Dict[str, Dict] = {}
+    data_version = await result_cache.data_version(query_request.email, category)
+
+    pending = []
+    for query_str in query_strs:
+        cached = None
+        if query_request.use_cache:
+            cached = await result_cache.get('query', *query_cache_key(query_request, query_str, data_version))
+        if cached is None:
+            pending.append(query_str)
+            continue
+        results[query_str] = cached
+        if on_event:
+            await on_event('query_result', {
+                'category': category, 'query': query_str, 'relay_id': cached['relay_id'], 'result': cached['result'],
+                'cached': True
+            })
+
+    async def poll_dispatch(dispatch: Dict, batch: bool) -> List[Dict]:
+        query_strs, relay_id = dispatch['query_strs'], dispatch['relay_id']
+
+        on_update = None
+        if on_event:
+            for query_str in query_strs:
+                await on_event('query_dispatched', {
+                    'category': category, 'query': query_str, 'relay_id': relay_id, 'node_results': dispatch['results']
+                })
 
-        all_results = {}
-        category_details = []
-
-        # Iterate through all categories and queries
-        for category, queries in QUERIES.items():
-            all_results[category] = {}
-            category_results = []
-
-            for query_str in queries:
-                # Execute query with new relay ID
-                query_request = QueryRequest(
-                    email=request.email,
-                    category=category,
-                    query_str=query_str,
-                    company_name=request.company_name,
-                    year=request.year,
-                    start_date=request.start_date,
-                    end_date=request.end_date,
-                    relay_server_url=relay_server,
-                    mpc_node_urls=node_urls
+            async def on_update(node_statuses: List[Dict]):
+                for query_str in query_strs:
+                    await on_event('node_status', {
+                        'category': category, 'query': query_str, 'relay_id': relay_id, 'node_statuses': node_statuses
+                    })
+
+        # a batch has latency priors (and node time metrics) of its own
+        poll_key = '+'.join(query_strs)
+        callback_id = dispatch['callback_id']
+        with tracer.span(
+            'mpc.poll', relay_id=relay_id, queries=len(query_strs), callback=callback_id is not None
+        ) as span:
+            poll = await poll_tasks(
+                dispatch['results'], query_str=poll_key, callback_id=callback_id, on_update=on_update
+            )
+            if not poll['success']:
+                span.record_error(poll['error'])
+        observe_node_times(dispatch['results'], poll_key if batch else query_strs[0], poll, category=category)
+
+        if not poll['success']:
+            query_results = [{'success': False, 'error': poll['error']} for _ in query_strs]
+        elif batch:
+            query_results = split_batch_result(query_strs, poll['results'][0])
+        else:
+            query_results = [{'success': True, 'data': poll['results'][0]}]
+
+        entries = []
+        for query_str, query_result in zip(query_strs, query_results):
+            entry = {'query_str': query_str, 'relay_id': relay_id, 'result': query_result}
+            if query_result['success']:
+                await result_cache.set(
+                    'query', *query_cache_key(query_request, query_str, data_version), value=entry,
+                    tags=[result_cache.tag(query_request.email, category)], ttl=result_cache.query_ttl
+                )
+            entries.append(entry)
+        return entries
+
+    async def compute() -> Dict[str, Dict]:
+        start = time.perf_counter()
+        outcomes = dict.fromkeys(pending, 'error')
+        try:
+            with (
+                queries_in_flight.track_inprogress(),
+                tracer.span('mpc.query', category=category, queries=len(pending)) as span,
+            ):
+                response = await execute_query(query_request.model_copy(update={'query_strs': pending}))
+                span.set_attribute('batch', response['batch'])
+                polled = await asyncio.gather(
+                    *(poll_dispatch(dispatch, response['batch']) for dispatch in response['dispatches'])
                 )
+            computed = {entry['query_str']: entry for entries in polled for entry in entries}
+            outcomes = {
+                query_str: 'success' if entry['result']['success'] else 'failed'
+                for query_str, entry in computed.items()
+            }
+            return computed
+        except asyncio.CancelledError:
+            outcomes = dict.fromkeys(pending, 'cancelled')
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            for query_str, outcome in outcomes.items():
+                query_duration_seconds.observe(elapsed, category=category, query_str=query_str, outcome=outcome)
+
+    if pending:
+        # The same batch already running elsewhere is shared, like single queries
+        flight_key = query_cache_key(query_request, '+'.join(pending), data_version)
+        computed, shared = await single_flight.run(compute, *flight_key)
+        for query_str in pending:
+            result = results[query_str] = computed[query_str]
+            if on_event:
+                event = {
+                    'category': category, 'query': query_str, 'relay_id': result['relay_id'], 'result': result['result']
+                }
+                if shared:
+                    event['shared'] = True
+                await on_event('query_result', event)
+
+    return [results[query_str] for query_str in query_strs]
+
+async def run_queries(query_request: QueryRequest, on_event: Optional[EventCallback] = None) -> List[Dict]:
+    """run_query or run_batch_query, whichever the request is for: always one result per query"""
+    if query_request.query_strs:
+        return await run_batch_query(query_request, on_event=on_event)
+    return [await run_query(query_request, on_event=on_event)]
+
+def build_query_requests(
+    request: ScoreGenerationRequest, relay_server: str, node_urls: List[str], batch: bool = False
+) -> List[QueryRequest]:
+    """Build one QueryRequest per scoring query, in DISPATCH_PRIORITY order.
+
+    With batch, categories with several queries get a single QueryRequest with all their `query_strs`
+    (categories ordered by their most urgent query).
+    """
+    def query_request(category: str, queries: List[str]) -> QueryRequest:
+        return QueryRequest(
+            email=request.email,
+            category=category,
+            query_str=queries[0] if len(queries) == 1 else None,
+            query_strs=queries if len(queries) > 1 else None,
+            company_name=request.company_name,
+            year=request.year,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            relay_server_url=relay_server,
+            mpc_node_urls=node_urls,
+            use_cache=request.use_cache
+        )
+
+    if batch:
+        query_requests = [query_request(category, queries) for category, queries in QUERIES.items()]
+    else:
+        query_requests = [
+            query_request(category, [query_str]) for category, queries in QUERIES.items() for query_str in queries
+        ]
+    return sorted(query_requests, key=lambda qr: min(DISPATCH_PRIORITY[q] for q in qr.all_query_strs()))
 
-                # Execute the query
-                query_response = await execute_query(query_request)
-                relay_id = query_response['relay_id']
-                task_ids = query_response['results']
+async def run_queries_sequential(
+    query_requests: List[QueryRequest], on_event: Optional[EventCallback] = None
+) -> List[Dict]:
+    """Run queries one after another, pausing briefly between them"""
+    query_results = []
+    for query_request in query_requests:
+        query_results.extend(await run_queries(query_request, on_event=on_event))
 
-                # Poll for results
-                query_result = await poll_query_result(task_ids)
+        # Small delay between queries
+        await asyncio.sleep(1)
 
-                category_results.append({
-                    'query_str': query_str,
-                    'relay_id': relay_id,
-                    'result': query_result
-                })
+    return query_results
 
-                all_results[category][query_str] = query_result['data'] if query_result['success'] else {'error': query_result.get('error')}
+async def run_queries_concurrent(
+    query_requests: List[QueryRequest],
+    max_concurrency: int,
+    on_event: Optional[EventCallback] = None
+) -> List[Dict]:
+    """Run all queries at once (each with its own relay ID), at most max_concurrency in flight.
 
-                # Small delay between queries
-                await asyncio.sleep(1)
+    Results are collected as they complete and returned in the order of query_requests, one per
+    query (a batched request counts once towards max_concurrency).
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
-            # Check if category has valid data
-            category_has_data = check_category_has_data(category_results)
+    async def run_limited(index: int, query_request: QueryRequest):
+        async with semaphore:
+            return index, await run_queries(query_request, on_event=on_event)
 
-            # Build category details for response
-            for result in category_results:
-                detail = {
-                    'category': category,
-                    'query': result['query_str'],
-                    'relay_id': result['relay_id'],
-                    'status': 'success' if result['result']['success'] else 'error',
-                    'has_data': category_has_data
-                }
+    tasks = [asyncio.create_task(run_limited(i, query_request)) for i, query_request in enumerate(query_requests)]
+    query_results: List[Optional[List[Dict]]] = [None] * len(tasks)
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, query_result = await next_done
+            query_results[index] = query_result
+    except BaseException:
+        # One query failed (or we were cancelled): don't leave the others running
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    # every task has finished and filled its slot
+    return [query_result for results in cast(List[List[Dict]], query_results) for query_result in results]
+
+def group_query_results(query_requests: List[QueryRequest], query_results: List[Dict]) -> Dict[str, List[Dict]]:
+    """Group query results (one per query, batched requests expanded) by category,
+    in the order build_score_response expects"""
+    categories = [
+        query_request.category for query_request in query_requests for _ in query_request.all_query_strs()
+    ]
+    category_results: Dict[str, List[Dict]] = {category: [] for category in QUERIES}
+    for category, query_result in zip(categories, query_results):
+        category_results[category].append(query_result)
+    # dispatch order isn't QUERIES order
+    for category, results in category_results.items():
+        results.sort(key=lambda result: QUERIES[category].index(result['query_str']))
+    return category_results
+
+def summarize_score(score_result: Dict[str, Any], card: Scorecard = scorecard) -> Dict[str, Any]:
+    """Rounded score, tier and display breakdown of a calculate_total_score result"""
+    total_score = round(score_result['total_score'], 1)
+    # the rounded score as shown: cut-offs can be fractional, so it isn't truncated to an int
+    tier_info = card.tier(total_score)
+    return {
+        'score': total_score,
+        'tier': tier_info['tier'],
+        'interpretation': tier_info['interpretation'],
+        'recommendation': tier_info['recommendation'],
+        'breakdown': format_breakdown(score_result),
+        'emi_coverage_ratio': round(score_result['emi_coverage_ratio'], 2)
+    }
 
-                if result['result']['success']:
-                    if category_has_data and result['result']['data']:
-                        detail['data'] = result['result']['data']
-                    else:
-                        detail['data'] = None
-                        detail['message'] = 'No output'
+def build_score_response(category_results: Dict[str, List[Dict]]) -> Dict:
+    """Build the generate-score response from per-category query results"""
+    all_results = {}
+    category_details = []
+
+    for category, results in category_results.items():
+        all_results[category] = {}
+        for result in results:
+            query_result = result['result']
+            all_results[category][result['query_str']] = (
+                query_result['data'] if query_result['success'] else {'error': query_result.get('error')}
+            )
+
+        # Check if category has valid data
+        category_has_data = check_category_has_data(results)
+
+        # Build category details for response
+        for result in results:
+            detail = {
+                'category': category,
+                'query': result['query_str'],
+                'relay_id': result['relay_id'],
+                'status': 'success' if result['result']['success'] else 'error',
+                'has_data': category_has_data
+            }
+
+            if result['result']['success']:
+                if category_has_data and result['result']['data']:
+                    detail['data'] = result['result']['data']
                 else:
-                    detail['error'] = result['result'].get('error')
-
-                category_details.append(detail)
-
-        # Calculate total score with breakdown
-        score_result = calculate_total_score(all_results)
-        total_score = round(score_result['total_score'], 1)
-        tier_info = get_tier_rating(int(total_score))
-
-        # Format breakdown for display
-        formatted_breakdown = []
-        for cat_name, cat_data in score_result['category_breakdown'].items():
-            formatted_category = {
-                'category': cat_name,
-                'weight': cat_data['weight'],
-                'score': round(cat_data['score'], 2),
-                'metrics': []
+                    detail['data'] = None
+                    detail['message'] = 'No output'
+            else:
+                detail['error'] = result['result'].get('error')
+
+            category_details.append(detail)
+
+    summary = summarize_score(calculate_total_score(all_results))
+
+    return {
+        'score': summary['score'],
+        'tier': summary['tier'],
+        'interpretation': summary['interpretation'],
+        'recommendation': summary['recommendation'],
+        'details': category_details,
+        'raw_results': all_results,
+        'breakdown': summary['breakdown'],
+        'emi_coverage_ratio': summary['emi_coverage_ratio']
+    }
+
+async def save_score(request: ScoreGenerationRequest, score: Dict, loan_id: Optional[int] = None) -> Optional[int]:
+    """Persist a generated score, raw_results included, so it can be rescored later without MPC.
+
+    Returns the Score ID, or None when the email has no SME (or the database is unavailable).
+    """
+    try:
+        async with local_session() as db:
+            db_user = await user.get_by_email(db=db, email=request.email)
+            if db_user is None or db_user.sme_id is None:
+                return None
+
+            created = await crud_scores.create(db=db, object=ScoreCreate(
+                score=score['score'],
+                tier=score['tier'],
+                year=request.year,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                sme_id=db_user.sme_id,
+                loan_id=loan_id,
+                result=score
+            ))
+            return created.id
+    except Exception as e:
+        # Persisting is a side effect: the caller still gets its score
+        logger.warning(f"Could not persist score for {request.email}: {e}")
+        return None
+
+async def run_score(
+    request: ScoreGenerationRequest,
+    on_event: Optional[EventCallback] = None,
+    loan_id: Optional[int] = None
+) -> Dict:
+    """Execute all queries and build the complete score.
+
+    When on_event is given it receives the per-query events from run_query, plus a
+    `category_complete` event with the running partial score each time a category finishes.
+    From score_graph, `metric_ready` carries each metric score (and the EMI coverage ratio)
+    and `category_subtotal` each scorecard category's subtotal, as soon as their queries are in.
+
+    Freshly computed scores are persisted for the email's SME (against loan_id when given) and
+    carry the stored row's `score_id`. They are cached per (email, company_name, year, start_date,
+    end_date) and data versions of the email's categories when every query succeeded, until the TTL
+    expires or new ciphertext is posted for that email. Rescoring after new ciphertext reuses the cached
+    query results of the other categories, so only the changed categories' queries run on the nodes.
+    """
+    start = time.perf_counter()
+    data_versions = await result_cache.data_versions(request.email, QUERIES)
+    cache_key = (request.email, request.company_name, request.year, request.start_date, request.end_date, data_versions)
+    if request.use_cache:
+        cached: Optional[Dict] = await result_cache.get('score', *cache_key)
+        if cached is not None:
+            score_duration_seconds.observe(time.perf_counter() - start, outcome='success', cached='true')
+            return cached
+
+    outcome = 'error'
+    try:
+        with scores_in_flight.track_inprogress(), tracer.span(
+            'score.generate', year=request.year, concurrent=request.concurrent, loan_id=loan_id or 0
+        ) as span:
+            score = await generate_fresh_score(request, cache_key, on_event=on_event, loan_id=loan_id)
+            span.set_attribute('score', score['score'])
+            span.set_attribute('tier', score['tier'])
+        outcome = 'success'
+        return score
+    except asyncio.CancelledError:
+        outcome = 'cancelled'
+        raise
+    finally:
+        score_duration_seconds.observe(time.perf_counter() - start, outcome=outcome, cached='false')
+
+async def generate_fresh_score(
+    request: ScoreGenerationRequest,
+    cache_key: tuple,
+    on_event: Optional[EventCallback] = None,
+    loan_id: Optional[int] = None
+) -> Dict:
+    """run_score without the cache lookup: run every query, then build, persist and cache the score"""
+    relay_server = request.relay_server_url or RELAY_SERVER_URL
+    default_node_urls = [MPC_NODE_1_URL, MPC_NODE_2_URL, MPC_NODE_3_URL]
+    node_urls = (
+        request.mpc_node_urls if request.mpc_node_urls and len(request.mpc_node_urls) == 3 else default_node_urls
+    )
+
+    # One relay session per category instead of per query when all nodes take batches
+    batch = await node_capabilities.batch_size(node_urls) != 0
+    query_requests = build_query_requests(request, relay_server, node_urls, batch=batch)
+
+    query_event = None
+    if on_event:
+        completed: Dict[str, Dict[str, Dict]] = {category: {} for category in QUERIES}
+        graph_run = score_graph.run()
+
+        async def query_event(event: str, data: Dict):
+            await on_event(event, data)
+            if event != 'query_result':
+                return
+
+            result = data['result']
+            for graph_event, graph_data in graph_run.add(
+                data['query'], result['data'] if result['success'] else {'error': result.get('error')}
+            ):
+                await on_event(graph_event, graph_data)
+
+            category = data['category']
+            completed[category][data['query']] = {
+                'query_str': data['query'], 'relay_id': data['relay_id'], 'result': data['result']
+            }
+            if len(completed[category]) < len(QUERIES[category]):
+                return
+
+            # Score every category finished so far, in QUERIES order
+            done_categories = {
+                cat: [completed[cat][query_str] for query_str in QUERIES[cat]]
+                for cat in QUERIES
+                if len(completed[cat]) == len(QUERIES[cat])
             }
+            partial = build_score_response(done_categories)
+            await on_event('category_complete', {
+                'category': category,
+                'completed_categories': list(done_categories),
+                'details': [detail for detail in partial['details'] if detail['category'] == category],
+                'partial_score': partial['score'],
+                'breakdown': partial['breakdown']
+            })
+
+    if request.concurrent:
+        query_results = await run_queries_concurrent(
+            query_requests, request.max_concurrency or SCORE_QUERY_CONCURRENCY, on_event=query_event
+        )
+    else:
+        query_results = await run_queries_sequential(query_requests, on_event=query_event)
+
+    score = build_score_response(group_query_results(query_requests, query_results))
+    score['score_id'] = await save_score(request, score, loan_id=loan_id)
+
+    # A score built from failed queries would pin the failure until the TTL expires
+    if all(query_result['result']['success'] for query_result in query_results):
+        await result_cache.set(
+            'score', *cache_key, value=score,
+            tags=[result_cache.tag(request.email, category) for category in QUERIES]
+        )
+
+    return score
 
-            for detail in cat_data['details']:
-                formatted_metric = {
-                    'metric': detail['metric'],
-                    'value': detail['value'],
-                    'score': detail['score'],
-                    'weight': detail['weight'],
-                    'multiplier': round(detail['weight'] / 10.0, 1),
-                    'product': round(detail['product'], 2)
-                }
-                formatted_category['metrics'].append(formatted_metric)
+@router.post("/api/generate-score")
+async def generate_score(request: ScoreGenerationRequest, http_request: Request):
+    """Execute all queries and generate complete score (stops, cancelling the node tasks, if the client goes away)"""
+    try:
+        return await cancel_on_disconnect(http_request, run_score(request))
+    except HTTPException:
+        # e.g. 503 while an MPC node is down
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-            formatted_breakdown.append(formatted_category)
+@router.post("/api/generate-score/stream")
+async def generate_score_stream(request: ScoreGenerationRequest):
+    """Generate the score, streaming progress as Server-Sent Events.
 
-        return {
-            'score': total_score,
-            'tier': tier_info['tier'],
-            'interpretation': tier_info['interpretation'],
-            'recommendation': tier_info['recommendation'],
-            'details': category_details,
-            'raw_results': all_results,
-            'breakdown': formatted_breakdown,
-            'emi_coverage_ratio': round(score_result['emi_coverage_ratio'], 2)
-        }
+    Events: `query_dispatched`, `node_status`, `query_result`, `metric_ready`, `category_subtotal`
+    and `category_complete` while running,
+    then `score` with the same body as /api/generate-score (or `error`).
+    """
+    return stream_events(lambda emit: run_score(request, on_event=emit), final_event='score')
 
+@router.post("/api/score-batch")
+async def score_batch(request: BatchScoreRequest):
+    """Score many companies' stored `raw_results` in one call (no MPC queries), for rescoring and backtesting.
+
+    Each entry gets the same score, tier and breakdown /api/generate-score computed from those results.
+    """
+    try:
+        return {'scores': [summarize_score(result) for result in scorecard.score_batch(request.raw_results)]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/api/mpc-health")
+async def mpc_health():
+    """Circuit breaker state of the relay and MPC nodes, prefetched relay IDs, node capabilities,
+    node task cancellations and the server key in use (per worker process)"""
+    return {
+        **node_health.snapshot(),
+        'relay_pool': relay_ids.snapshot(),
+        'capabilities': node_capabilities.snapshot(),
+        'cancellations': task_canceller.snapshot(),
+        'server_key': server_keys.snapshot()
+    }
+
+@router.get("/api/cache-stats")
+async def cache_stats():
+    """Hit/miss counters of the score and query result cache (per worker process)"""
+    return result_cache.stats()
@@ -0,0 +1,115 @@
+from collections.abc import Awaitable, Callable
+from typing import Annotated, Any
+
+from arq.connections import ArqRedis
+from arq.jobs import Job as ArqJob
+from arq.jobs import JobStatus
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core.config import settings
+from ...core.db.database import async_get_db
+from ...core.exceptions.http_exceptions import NotFoundException
+from ...core.tracing import current_traceparent
+from ...core.utils import queue
+from ...crud.crud_loan import crud_loans
+from .query import ScoreGenerationRequest
+
+router = APIRouter(tags=["score-jobs"])
+
+
+class ScoreJobRequest(ScoreGenerationRequest):
+    loan_id: int | None = None
+
+
+@router.post("/api/score-jobs", status_code=201)
+async def create_score_job(
+    request: ScoreJobRequest, db: Annotated[AsyncSession, Depends(async_get_db)]
+) -> dict[str, str]:
+    """Queue score generation on the background worker and return its job ID"""
+    if queue.pool is None:
+        raise HTTPException(status_code=503, detail="Queue is not available")
+
+    if request.loan_id is not None:
+        if await crud_loans.get(db=db, id=request.loan_id) is None:
+            raise NotFoundException("Loan not found")
+        await crud_loans.update(db=db, object={"insights_status": "Queued"}, id=request.loan_id)
+
+    score_request = request.model_dump(exclude={"loan_id"})
+    # the job continues this request's trace, so its spans and log lines share the trace ID
+    job = await queue.pool.enqueue_job(
+        "generate_score_job", score_request, request.loan_id, traceparent=current_traceparent()
+    )
+    if job is None:
+        raise HTTPException(status_code=409, detail="Job already exists")
+
+    return {"job_id": job.job_id}
+
+
+# reads the progress a job reported from Redis, None before it reported any
+ProgressReader = Callable[[ArqRedis, str], Awaitable[dict[str, Any] | None]]
+
+
+async def read_job_status(job_id: str, read_progress: ProgressReader) -> dict[str, Any]:
+    """Return the status of a background job, the progress it reported and its result once complete"""
+    if queue.pool is None:
+        raise HTTPException(status_code=503, detail="Queue is not available")
+
+    job = ArqJob(job_id, queue.pool)
+    status = await job.status()
+    if status == JobStatus.not_found:
+        raise NotFoundException("Job not found")
+
+    response: dict[str, Any] = {
+        "job_id": job_id,
+        "status": status.value,
+        "progress": await read_progress(queue.pool, job_id),
+    }
+
+    if status == JobStatus.complete:
+        job_result = await job.result_info()
+        if job_result is not None:
+            response["success"] = job_result.success
+            if job_result.success:
+                response["result"] = job_result.result
+            else:
+                response["error"] = str(job_result.result)
+
+    return response
+
+
+@router.get("/api/score-jobs/{job_id}")
+async def get_score_job(job_id: str, response: Response) -> dict[str, Any]:
+    """Return the status and progress of a score job, and its result once complete"""
+    # polled for progress: keep ClientCacheMiddleware's max-age off it
+    response.headers["Cache-Control"] = "no-store"
+    return await read_job_status(job_id, queue.read_score_job_progress)
+
+
+async def cancel_job(job_id: str) -> dict[str, str]:
+    """Abort a queued or running background job: ``cancelled`` once the worker has stopped it,
+    ``cancelling`` if it hasn't confirmed within ``SCORE_JOB_ABORT_WAIT`` seconds.
+    """
+    if queue.pool is None:
+        raise HTTPException(status_code=503, detail="Queue is not available")
+
+    job = ArqJob(job_id, queue.pool)
+    status = await job.status()
+    if status == JobStatus.not_found:
+        raise NotFoundException("Job not found")
+    if status == JobStatus.complete:
+        raise HTTPException(status_code=409, detail="Job already finished")
+
+    try:
+        aborted = await job.abort(timeout=settings.SCORE_JOB_ABORT_WAIT)
+    except TimeoutError:
+        return {"job_id": job_id, "status": "cancelling"}
+    if not aborted:
+        raise HTTPException(status_code=409, detail="Job finished before it could be cancelled")
+    return {"job_id": job_id, "status": "cancelled"}
+
+
+@router.delete("/api/score-jobs/{job_id}", status_code=202)
+async def delete_score_job(job_id: str) -> dict[str, str]:
+    """Cancel a score job: it stops, its MPC node tasks are cancelled and its progress reads ``cancelled``"""
+    return await cancel_job(job_id)
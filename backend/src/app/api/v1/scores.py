@@ -0,0 +1,129 @@
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core.db.database import async_get_db
+from ...core.exceptions.http_exceptions import NotFoundException
+from ...core.scorecard import DEFAULT_SPEC, Scorecard
+from ...crud.crud_score import score as crud_score
+from .query import summarize_score
+
+router = APIRouter(tags=["scores"])
+
+RESCORE_PAGE_SIZE = 500
+
+
+class ScorecardOverrides(BaseModel):
+    # metric -> weight, e.g. {"GetProfitMargin": 20}
+    weights: dict[str, float] | None = None
+    # metric -> ascending band thresholds, as many as the metric already has (see GET /api/scorecard)
+    thresholds: dict[str, list[float]] | None = None
+    # tier -> minimum score, e.g. {"A": 80, "B": 65}
+    tier_cutoffs: dict[str, float] | None = None
+
+    def scorecard(self) -> Scorecard:
+        try:
+            spec = DEFAULT_SPEC.override(
+                weights=self.weights, thresholds=self.thresholds, tier_cutoffs=self.tier_cutoffs
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return Scorecard(spec)
+
+
+class RescoreRequest(ScorecardOverrides):
+    sme_ids: list[int] | None = None
+    loan_ids: list[int] | None = None
+    portfolio_job_id: str | None = None
+    # only each SME/loan's most recent score, rather than its whole history
+    latest_only: bool = True
+    include_breakdown: bool = False
+    limit: int | None = Field(default=None, gt=0)
+
+
+def rescore_entry(row: Any, rescored: dict[str, Any], include_breakdown: bool) -> dict[str, Any]:
+    return {
+        "score_id": row.id,
+        "sme_id": row.sme_id,
+        "loan_id": row.loan_id,
+        "original": {"score": row.score, "tier": row.tier},
+        "rescored": rescored if include_breakdown else {"score": rescored["score"], "tier": rescored["tier"]},
+        "score_change": round(rescored["score"] - row.score, 1),
+    }
+
+
+@router.get("/api/scorecard")
+async def read_scorecard() -> dict[str, Any]:
+    """Return the current weights, thresholds and tier cut-offs, in the shape the rescore endpoints accept"""
+    return DEFAULT_SPEC.describe()
+
+
+@router.post("/api/scores/{score_id}/rescore")
+async def rescore_score(
+    score_id: int, overrides: ScorecardOverrides, db: Annotated[AsyncSession, Depends(async_get_db)]
+) -> dict[str, Any]:
+    """Reapply an alternative scorecard to a stored score's raw results, without querying the MPC nodes"""
+    rows = await crud_score.get_for_rescoring(db=db, limit=1, score_ids=[score_id], latest_only=False)
+    if not rows:
+        raise NotFoundException("Score not found")
+    row = rows[0]
+    raw_results = (row.result or {}).get("raw_results")
+    if not raw_results:
+        raise HTTPException(status_code=409, detail="Score has no stored raw results")
+
+    card = overrides.scorecard()
+    return rescore_entry(row, summarize_score(card.score(raw_results), card=card), include_breakdown=True)
+
+@router.post("/api/scores/rescore")
+async def rescore_scores(request: RescoreRequest, db: Annotated[AsyncSession, Depends(async_get_db)]) -> dict[str, Any]:
+    """Reapply an alternative scorecard to every matching stored score, without querying the MPC nodes.
+
+    Returns each score's original and rescored score and tier, plus how many moved between
+    tiers (``tier_changes[original][rescored]``). Scores stored without raw results are skipped.
+    """
+    card = request.scorecard()
+    results: list[dict[str, Any]] = []
+    tier_changes: dict[str, dict[str, int]] = {}
+    skipped: list[int] = []
+
+    after_id = 0
+    while request.limit is None or len(results) < request.limit:
+        page_size = RESCORE_PAGE_SIZE if request.limit is None else min(RESCORE_PAGE_SIZE, request.limit - len(results))
+        rows = await crud_score.get_for_rescoring(
+            db=db,
+            after_id=after_id,
+            limit=page_size,
+            sme_ids=request.sme_ids,
+            loan_ids=request.loan_ids,
+            portfolio_job_id=request.portfolio_job_id,
+            latest_only=request.latest_only,
+        )
+        if not rows:
+            break
+        after_id = rows[-1].id
+
+        scorable = []
+        for row in rows:
+            if (row.result or {}).get("raw_results"):
+                scorable.append(row)
+            else:
+                skipped.append(row.id)
+
+        for row, score_result in zip(scorable, card.score_batch([row.result["raw_results"] for row in scorable])):
+            rescored = summarize_score(score_result, card=card)
+            changes = tier_changes.setdefault(row.tier, {})
+            changes[rescored["tier"]] = changes.get(rescored["tier"], 0) + 1
+            results.append(rescore_entry(row, rescored, request.include_breakdown))
+
+        if len(rows) < page_size:
+            break
+
+    return {
+        "scorecard": card.spec.describe(),
+        "total": len(results),
+        "tier_changes": tier_changes,
+        "skipped": skipped,
+        "results": results,
+    }
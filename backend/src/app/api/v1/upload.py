@@ -1,20 +1,32 @@
-from fastapi import APIRouter, HTTPException, File, UploadFile
+from fastapi import APIRouter, HTTPException, File, Form, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import pandas as pd
-import io
 import json
 import base64
 import hashlib
 import random
-import httpx
+import logging
 import numpy as np
 import os
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 
+from ...core.config import settings
+from ...core.curve25519 import point_compress, point_mul_g
+from ...core.excel import excel_engine, read_sheets
+from ...core.exceptions.mpc_exceptions import NodeUnavailableError
+from ...core.key_material import get_iv, get_session_key, get_xored_nonce, server_keys
+from ...core.mpc.dispatch import dispatch_to_nodes, encode_payload
+from ...core.mpc.health import node_health
+from ...core.plaintext import BANKING, CREDIT, FINANCIAL, TAX
+from ...core.mpc.relay_pool import relay_ids
+from ...core.utils.cache import result_cache
+
 router = APIRouter(tags=["upload"])
+logger = logging.getLogger(__name__)
 
 # Configuration - can be overridden via environment variables
 RELAY_SERVER_URL = os.getenv('RELAY_SERVER_URL', 'http://0.0.0.0:9007')
@@ -47,157 +59,23 @@ def clean_data(obj):
 # Cryptography Functions
 # =========================
 
-FIELD_POWER = 64
-DECIMAL_PRECISION = 10
-p = 2**255 - 19
-q = 2**252 + 27742317777372353535851937790883648493
-d = -121665 * pow(121666, p - 2, p) % p
-
 def sha512(s):
     return hashlib.sha512(s).digest()
 
-def hmac(key: bytes, message: bytes) -> bytes:
-    block_size = hashlib.sha256().block_size
-    if len(key) > block_size:
-        key = hashlib.sha256(key).digest()
-    if len(key) < block_size:
-        key = key + b"\x00" * (block_size - len(key))
-    o_key_pad = bytes((x ^ 0x5C) for x in key)
-    i_key_pad = bytes((x ^ 0x36) for x in key)
-    inner_hash = hashlib.sha256(i_key_pad + message).digest()
-    return hashlib.sha256(o_key_pad + inner_hash).digest()
-
-def hkdf_extract(salt: bytes, input_key_material: bytes) -> bytes:
-    if salt is None or len(salt) == 0:
-        salt = b"\x00" * hashlib.sha256().digest_size
-    return hmac(key=salt, message=input_key_material)
-
-def hkdf_expand(prk: bytes, info: bytes, length: int) -> bytes:
-    hash_len = hashlib.sha256().digest_size
-    if length > 255 * hash_len:
-        raise ValueError("Cannot expand to more than 255 * HashLen bytes of output")
-    okm = b""
-    block = b""
-    block_index = 1
-    while len(okm) < length:
-        block = hmac(key=prk, message=block + info + bytes([block_index]))
-        okm += block
-        block_index += 1
-    return okm[:length]
-
-def modp_inv(x):
-    return pow(x, p - 2, p)
-
-def point_add(P, Q):
-    A, B = (P[1] - P[0]) * (Q[1] - Q[0]) % p, (P[1] + P[0]) * (Q[1] + Q[0]) % p
-    C, D = 2 * P[3] * Q[3] * d % p, 2 * P[2] * Q[2] % p
-    E, F, G, H = B - A, D - C, D + C, B + A
-    return (E * F, G * H, F * G, E * H)
-
-def point_mul(s, P):
-    Q = (0, 1, 1, 0)
-    while s > 0:
-        if s & 1:
-            Q = point_add(Q, P)
-        P = point_add(P, P)
-        s >>= 1
-    return Q
-
-modp_sqrt_m1 = pow(2, (p - 1) // 4, p)
-
-def recover_x(y, sign):
-    if y >= p:
-        return None
-    x2 = (y * y - 1) * modp_inv(d * y * y + 1)
-    if x2 == 0:
-        if sign:
-            return None
-        else:
-            return 0
-    x = pow(x2, (p + 3) // 8, p)
-    if (x * x - x2) % p != 0:
-        x = x * modp_sqrt_m1 % p
-    if (x * x - x2) % p != 0:
-        return None
-    if (x & 1) != sign:
-        x = p - x
-    return x
-
-g_y = 4 * modp_inv(5) % p
-g_x = recover_x(g_y, 0)
-G = (g_x, g_y, 1, g_x * g_y % p)
-
-def point_compress(P):
-    zinv = modp_inv(P[2])
-    x = P[0] * zinv % p
-    y = P[1] * zinv % p
-    return int.to_bytes(y | ((x & 1) << 255), 32, "little")
-
-def point_decompress(s):
-    if len(s) != 32:
-        raise Exception("Invalid input length for decompression")
-    y = int.from_bytes(s, "little")
-    sign = y >> 255
-    y &= (1 << 255) - 1
-    x = recover_x(y, sign)
-    if x is None:
-        return None
-    else:
-        return (x, y, 1, x * y % p)
-
-def convert2wei(P):
-    zinv = modp_inv(P[2])
-    y = P[1] * zinv % p
-    delta = 19298681539552699237261830834781317975544997444273427339909597334652188435537
-    oneplusy = (1 + y) % p
-    oneminusy = (1 - y) % p
-    invoneminusy = modp_inv(oneminusy)
-    t = (oneplusy * invoneminusy) % p
-    x = (t + delta) % p
-    return x
-
 def generate_keys():
     private_key_bytes = random.randbytes(32)
     private_key = int.from_bytes(private_key_bytes[:32], "little")
     private_key &= (1 << 254) - 8
     private_key |= 1 << 254
-    public_key = point_mul(private_key, G)
+    public_key = point_mul_g(private_key)
     compressed_pk = point_compress(public_key)
     nonce = random.randbytes(32)
     return (compressed_pk, private_key, nonce)
 
 def get_shared_key(private_key):
-    server_pk_b64 = "ZzEeC1F+lWB6Qc9HcLtsm3KRNC9gpGdqx0fvhN25rj8="
-    server_nonce_b64 = "bwKOJaOVuaN/B+jL3vneKxI329OmV2oa9ogZrqVXiwU="
-
-    server_pk = base64.b64decode(server_pk_b64)
-    server_nonce = base64.b64decode(server_nonce_b64)
-    remote_public_key = point_decompress(server_pk)
-    if remote_public_key is None:
-        return None
-    mul_val = point_mul(private_key, remote_public_key)
-    shared_key = convert2wei(mul_val).to_bytes(32, "big")
-    return shared_key, server_nonce
-
-def get_xored_nonce(bytes_your_nonce: bytes, bytes_remote_nonce: bytes) -> bytes:
-    out = b""
-    for b1, b2 in zip(bytes_your_nonce, bytes_remote_nonce):
-        out += (b1 ^ b2).to_bytes(length=1, byteorder="big")
-    return out
-
-def get_session_key(xored_nonce: bytes, shared_key: bytes):
-    salt = b""
-    for i in range(20):
-        salt += xored_nonce[i].to_bytes(length=1, byteorder="big")
-    prk = hkdf_extract(salt=salt, input_key_material=shared_key)
-    session_key = hkdf_expand(prk=prk, info=b"", length=32)
-    return session_key
-
-def get_iv(xored_nonce: bytes):
-    iv = b""
-    for i in range(12):
-        iv += xored_nonce[i + 20].to_bytes(length=1, byteorder="big")
-    return iv
+    # decoded and precomputed once per server key, not per request
+    material = server_keys.current()
+    return material.shared_key(private_key), material.nonce
 
 def encrypt_gcm(plaintext, key, iv, associated_data=None):
     encryptor = Cipher(
@@ -214,90 +92,29 @@ def get_ciphertext(data_bytes: bytes, iv: bytes, session_key: bytes):
     ciphertext, _tag = encrypt_gcm(data_bytes, session_key, iv)
     return ciphertext
 
-def get_num_pltext_byte(value):
-    num = int(float(value) * 2**DECIMAL_PRECISION).to_bytes(FIELD_POWER // 8, "big")
-    return num
-
-def get_banking_plaintext(entry):
-    pltext = b""
-    company_name = entry.get("Company Legal Name", "")
-    pltext += company_name.encode("utf-8")
-    pltext += b"\x00" * (60 - len(company_name))
-    pltext += get_num_pltext_byte(str(entry.get("Year", 0)))
-    pltext += get_num_pltext_byte(str(entry.get("Month", 0)))
-
-    primary_bank = entry.get("Primary Bank", "")
-    pltext += primary_bank.encode("utf-8")
-    pltext += b"\x00" * (20 - len(primary_bank))
-
-    banking_fields = [
-        "Monthly POS Transactions",
-        "Monthly POS Sales Amount",
-        "Monthly Digital Transactions",
-        "Monthly Digital Sales Amount",
-        "Monthly Utility Bill Paid",
-        "Monthly Bank Balance",
-        "Monthly EMI",
-        "Monthly Number of Bounced Cheques"
-    ]
-
-    for field in banking_fields:
-        pltext += get_num_pltext_byte(str(entry.get(field, 0)))
-
-    return pltext
-
-def get_financial_plaintext(entry):
-    pltext = b""
-    company_name = entry.get("Company Legal Name", "")
-    pltext += company_name.encode("utf-8")
-    pltext += b"\x00" * (60 - len(company_name))
-    pltext += get_num_pltext_byte(str(entry.get("Year", 0)))
-
-    financial_fields = [
-        "Annual Revenue",
-        "Net Profit",
-        "Total Liabilities",
-        "Total Debt",
-        "Shareholder Equity",
-        "Employees"
-    ]
-
-    for field in financial_fields:
-        pltext += get_num_pltext_byte(str(entry.get(field, 0)))
-
-    return pltext
-
-def get_tax_plaintext(entry):
-    pltext = b""
-    company_name = entry.get("Company Legal Name", "")
-    pltext += company_name.encode("utf-8")
-    pltext += b"\x00" * (60 - len(company_name))
-    pltext += get_num_pltext_byte(str(entry.get("Year", 0)))
-
-    tax_filed = entry.get("Income tax Return Filed", "")
-    if tax_filed == "Yes":
-        pltext += get_num_pltext_byte("1")
-    else:
-        pltext += get_num_pltext_byte("0")
-
-    filing_status = entry.get("Filing Status", "")
-    pltext += filing_status.encode("utf-8")
-    pltext += b"\x00" * (15 - len(filing_status))
-
-    gst_status = entry.get("GST/Tax Filing Status", "")
-    pltext += gst_status.encode("utf-8")
-    pltext += b"\x00" * (10 - len(gst_status))
-
-    return pltext
-
-def get_credit_plaintext(entry):
-    pltext = b""
-    company_name = entry.get("Company Legal Name", "")
-    pltext += company_name.encode("utf-8")
-    pltext += b"\x00" * (60 - len(company_name))
-    pltext += get_num_pltext_byte(str(entry.get("Year", 0)))
-    pltext += get_num_pltext_byte(str(entry.get("Loan Default Count", 0)))
-    return pltext
+def encrypt_category(category: str, plaintext) -> Dict[str, Any]:
+    """Encrypt one category's plaintext under a fresh client key, every other category empty"""
+    self_pk, self_sk, self_nonce = generate_keys()
+
+    # Get shared key and derive session key
+    shared_key, server_nonce = get_shared_key(self_sk)
+    xored_nonce = get_xored_nonce(self_nonce, server_nonce)
+    iv = get_iv(xored_nonce)
+    session_key = get_session_key(xored_nonce, shared_key)
+
+    results = {}
+    for name in CATEGORY_SOURCES:
+        cipher = get_ciphertext(plaintext if name == category else b"", iv, session_key)
+        results[name] = base64.b64encode(cipher).decode('ascii')
+
+    client_info = {
+        "public_key": base64.b64encode(self_pk).decode('ascii'),
+        "nonce": base64.b64encode(self_nonce).decode('ascii')
+    }
+    return {
+        "ciphertext": [results],
+        "client_info": client_info
+    }
 
 # =========================
 # Helper Functions
@@ -321,6 +138,69 @@ def safe_int(value, default=0):
     except (ValueError, TypeError):
         return default
 
+# Per category: key in the generate-json/generate-ciphertext data, workbook sheet, plaintext layout
+CATEGORY_SOURCES = {
+    'banking': ('openBanking', 'Open Banking Data', BANKING),
+    'financial': ('financialStatements', 'Financial statements - SME self', FINANCIAL),
+    'tax': ('taxAuthorities', 'Tax Authorities', TAX),
+    'credit': ('creditBureaus', 'Credit Bureaus', CREDIT),
+}
+
+# How generate_json normalizes each field; any other field is passed through
+INT_FIELDS = {
+    'Year', 'Month', 'Monthly POS Transactions', 'Monthly Digital Transactions',
+    'Monthly Number of Bounced Cheques', 'Employees', 'Loan Default Count'
+}
+FLOAT_FIELDS = {
+    'Monthly POS Sales Amount', 'Monthly Digital Sales Amount', 'Monthly Utility Bill Paid',
+    'Monthly Bank Balance', 'Monthly EMI', 'Annual Revenue', 'Net Profit', 'Total Liabilities',
+    'Total Debt', 'Shareholder Equity'
+}
+
+def safe_int_column(column: pd.Series) -> np.ndarray:
+    """safe_int over a sheet column, whole numeric columns at once"""
+    if pd.api.types.is_bool_dtype(column) or pd.api.types.is_integer_dtype(column):
+        return np.asarray(column, dtype=np.int64)
+    if pd.api.types.is_float_dtype(column):
+        return np.trunc(np.asarray(column.fillna(0), dtype=np.float64))
+    return np.array([safe_int(value) for value in column.tolist()], dtype=np.float64)
+
+def safe_float_column(column: pd.Series) -> np.ndarray:
+    """safe_float over a sheet column, whole numeric columns at once"""
+    if pd.api.types.is_bool_dtype(column) or pd.api.types.is_numeric_dtype(column):
+        return np.asarray(column.fillna(0), dtype=np.float64)
+    return np.array([safe_float(value) for value in column.tolist()], dtype=np.float64)
+
+def company_columns(df: pd.DataFrame, company: str, category: str) -> tuple[dict[str, Any], int]:
+    """A company's rows of a category sheet as the plaintext columns generate_json -> generate-ciphertext
+    would encode, without going through per-row dicts and JSON. Returns (columns, row count)."""
+    codec = CATEGORY_SOURCES[category][2]
+    if 'Company Legal Name' not in df.columns:
+        return {}, 0
+    df = df.replace([np.inf, -np.inf], np.nan)
+    df = df[df['Company Legal Name'] == company]
+
+    columns: dict[str, Any] = {'Company Legal Name': company}
+    for field in codec.fields:
+        name = field.name
+        if name == 'Company Legal Name':
+            continue
+        if name not in df.columns:
+            # a missing column reads as None in every row
+            if name == 'Primary Bank':
+                columns[name] = 'N/A'
+            continue
+        if name in INT_FIELDS:
+            columns[name] = safe_int_column(df[name])
+        elif name in FLOAT_FIELDS:
+            columns[name] = safe_float_column(df[name])
+        else:
+            values = [None if pd.isna(value) else value for value in df[name].tolist()]
+            if name == 'Primary Bank':
+                values = [value if value else 'N/A' for value in values]
+            columns[name] = values
+    return columns, len(df)
+
 # =========================
 # Pydantic Models
 # =========================
@@ -352,30 +232,27 @@ class PostToMPCRequest(BaseModel):
 async def upload_excel(file: UploadFile = File(...)):
     """Upload and process Excel file, return available companies"""
     try:
-        contents = await file.read()
-        print(f"Received file: {file.filename}, size: {len(contents)} bytes")
+        # Load all sheets from one parse of the workbook, straight from the upload's spooled file
+        sheet_names = [sheet_name for _data_key, sheet_name, _codec in CATEGORY_SOURCES.values()]
+        logger.info(f"Received file: {file.filename}, size: {file.size} bytes")
+        sheets = await run_in_threadpool(read_sheets, file.file, sheet_names, excel_engine(settings.EXCEL_ENGINE))
 
-        # Load all sheets
-        sheet_names = ['Open Banking Data', 'Financial statements - SME self', 'Tax Authorities', 'Credit Bureaus']
         sheets_data = {}
         companies = set()
 
         for sheet_name in sheet_names:
-            try:
-                df = pd.read_excel(io.BytesIO(contents), sheet_name=sheet_name, skiprows=1)
-                print(f"Loaded sheet {sheet_name}: {len(df)} rows")
-                # Replace NaN and inf values with None
-                df = df.replace([np.inf, -np.inf], np.nan)
-                sheets_data[sheet_name] = df.to_dict('records')
-
-                # Extract companies
-                if 'Company Legal Name' in df.columns:
-                    companies.update(df['Company Legal Name'].dropna().unique())
-            except Exception as e:
-                print(f"Error reading sheet {sheet_name}: {e}")
-                import traceback
-                traceback.print_exc()
+            df = sheets[sheet_name]
+            if isinstance(df, Exception):
+                logger.error(f"Error reading sheet {sheet_name}: {df}")
                 continue
+            logger.info(f"Loaded sheet {sheet_name}: {len(df)} rows")
+            # Replace NaN and inf values with None
+            df = df.replace([np.inf, -np.inf], np.nan)
+            sheets_data[sheet_name] = df.to_dict('records')
+
+            # Extract companies
+            if 'Company Legal Name' in df.columns:
+                companies.update(df['Company Legal Name'].dropna().unique())
 
         response_data = {
             "status": "success",
@@ -387,9 +264,7 @@ async def upload_excel(file: UploadFile = File(...)):
         cleaned_data = clean_data(response_data)
         return JSONResponse(content=cleaned_data)
     except Exception as e:
-        print(f"Upload error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Upload error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/api/generate-json")  
@@ -471,86 +346,41 @@ async def generate_ciphertext(request: CiphertextRequest):
     """Generate ciphertext for a specific category"""
     try:
         category = request.category
-        data = request.data
-
-        # Generate client keys
-        self_pk, self_sk, self_nonce = generate_keys()
-
-        # Get shared key and derive session key
-        shared_key, server_nonce = get_shared_key(self_sk)
-        xored_nonce = get_xored_nonce(self_nonce, server_nonce)
-        iv = get_iv(xored_nonce)
-        session_key = get_session_key(xored_nonce, shared_key)
-
-        # Process and encrypt the selected category
-        results = {}
-
-        # Banking data
-        if category == "banking":
-            banking_data = data.get("openBanking", [])
-            banking_pltext = b""
-            for entry in banking_data:
-                banking_pltext += get_banking_plaintext(entry)
-            banking_cipher = get_ciphertext(banking_pltext, iv, session_key)
-            ciph_b64 = base64.b64encode(banking_cipher).decode('ascii')
-            results["banking"] = ciph_b64
-        else:
-            empty_cipher = get_ciphertext(b"", iv, session_key)
-            ciph_b64 = base64.b64encode(empty_cipher).decode('ascii')
-            results["banking"] = ciph_b64
-
-        # Financial data
-        if category == "financial":
-            financial_data = data.get("financialStatements", [])
-            financial_pltext = b""
-            for entry in financial_data:
-                financial_pltext += get_financial_plaintext(entry)
-            financial_cipher = get_ciphertext(financial_pltext, iv, session_key)
-            ciph_b64 = base64.b64encode(financial_cipher).decode('ascii')
-            results["financial"] = ciph_b64
-        else:
-            empty_cipher = get_ciphertext(b"", iv, session_key)
-            ciph_b64 = base64.b64encode(empty_cipher).decode('ascii')
-            results["financial"] = ciph_b64
-
-        # Tax data
-        if category == "tax":
-            tax_data = data.get("taxAuthorities", [])
-            tax_pltext = b""
-            for entry in tax_data:
-                tax_pltext += get_tax_plaintext(entry)
-            tax_cipher = get_ciphertext(tax_pltext, iv, session_key)
-            ciph_b64 = base64.b64encode(tax_cipher).decode('ascii')
-            results["tax"] = ciph_b64
-        else:
-            empty_cipher = get_ciphertext(b"", iv, session_key)
-            ciph_b64 = base64.b64encode(empty_cipher).decode('ascii')
-            results["tax"] = ciph_b64
-
-        # Credit data
-        if category == "credit":
-            credit_data = data.get("creditBureaus", [])
-            credit_pltext = b""
-            for entry in credit_data:
-                credit_pltext += get_credit_plaintext(entry)
-            credit_cipher = get_ciphertext(credit_pltext, iv, session_key)
-            ciph_b64 = base64.b64encode(credit_cipher).decode('ascii')
-            results["credit"] = ciph_b64
-        else:
-            empty_cipher = get_ciphertext(b"", iv, session_key)
-            ciph_b64 = base64.b64encode(empty_cipher).decode('ascii')
-            results["credit"] = ciph_b64
+        plaintext: bytes | bytearray = b""
+        if category in CATEGORY_SOURCES:
+            data_key, _sheet_name, codec = CATEGORY_SOURCES[category]
+            plaintext = codec.encode(request.data.get(data_key, []))
 
         # Return both ciphertext and client_info
-        client_info = {
-            "public_key": base64.b64encode(self_pk).decode('ascii'),
-            "nonce": base64.b64encode(self_nonce).decode('ascii')
-        }
+        return encrypt_category(category, plaintext)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return {
-            "ciphertext": [results],
-            "client_info": client_info
-        }
+@router.post("/api/generate-ciphertext/excel")
+async def generate_ciphertext_from_excel(
+    file: UploadFile = File(...),
+    company: str = Form(...),
+    category: str = Form(...)
+):
+    """Generate ciphertext for a company's category straight from the workbook.
+
+    Same result as upload-excel, generate-json and generate-ciphertext in turn, but the sheet's
+    columns are encoded as arrays instead of per-row dicts sent through the browser twice.
+    """
+    if category not in CATEGORY_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown category: {category}")
+    _data_key, sheet_name, codec = CATEGORY_SOURCES[category]
+    try:
+        sheets = await run_in_threadpool(read_sheets, file.file, [sheet_name], excel_engine(settings.EXCEL_ENGINE))
+        df = sheets[sheet_name]
+        if isinstance(df, Exception):
+            raise HTTPException(status_code=400, detail=f"Cannot read sheet {sheet_name}: {df}")
+
+        columns, rows = company_columns(df, company, category)
+        logger.info(f"Encoding {rows} {category} rows of {company} from {file.filename}")
+        return encrypt_category(category, codec.encode_columns(columns, rows))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -559,13 +389,9 @@ async def generate_relay_id(relay_url: Optional[str] = None):
     """Generate a new relay ID by calling the relay server"""
     try:
         relay_server = relay_url or RELAY_SERVER_URL
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{relay_server}/relay')
-            if response.status_code == 200:
-                data = response.json()
-                return {"relay_id": data["relay_id"]}
-            else:
-                raise HTTPException(status_code=response.status_code, detail="Failed to generate relay ID")
+        return {"relay_id": await relay_ids.acquire(relay_server)}
+    except NodeUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -586,58 +412,48 @@ async def post_to_mpc_nodes(request: PostToMPCRequest):
         default_node_urls = [MPC_NODE_1_URL, MPC_NODE_2_URL, MPC_NODE_3_URL]
         node_urls = request.mpc_node_urls if request.mpc_node_urls and len(request.mpc_node_urls) == 3 else default_node_urls
 
-        mpc_nodes = [
-            f'{node_urls[0]}/node/userdata',
-            f'{node_urls[1]}/node/userdata',
-            f'{node_urls[2]}/node/userdata'
-        ]
-
-        results = []
-
-        # Create client with connection pooling disabled to avoid keep-alive issues
-        limits = httpx.Limits(max_keepalive_connections=0, max_connections=10)
-        async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
-            for i, node_url in enumerate(mpc_nodes):
-                payload = {
-                    "email": request.email,
-                    "ciphertext": request.ciphertext,
-                    "relay_server_endpoint": relay_endpoint,
-                    "start_date": request.start_date,
-                    "end_date": request.end_date,
-                    "category": request.category,
-                    "client_info": request.client_info
-                }
-
-                try:
-                    print(f"Sending to node {i+1} at {node_url}")
-                    print(f"Relay endpoint: {relay_endpoint}")
-                    print(f"Payload size: {len(str(payload))} chars")
-                    response = await client.post(node_url, json=payload)
-                    print(f"Node {i+1} response status: {response.status_code}")
-                    if response.status_code in [200, 201]:  # Accept both 200 OK and 201 Created
-                        result = response.json()
-                        print(f"Node {i+1} response: {result}")
-                        results.append({
-                            "node": i + 1,
-                            "status": "success",
-                            "task_id": result.get("task_id"),
-                            "url": node_url.replace('/node/userdata', '')
-                        })
-                    else:
-                        print(f"Node {i+1} error status: {response.status_code}")
-                        results.append({
-                            "node": i + 1,
-                            "status": "error",
-                            "error": f"HTTP {response.status_code}"
-                        })
-                except Exception as e:
-                    print(f"Node {i+1} exception: {e}")
-                    results.append({
-                        "node": i + 1,
-                        "status": "error",
-                        "error": str(e)
-                    })
+        # Ciphertext that reaches only some of the nodes is unusable: refuse while any of them is down
+        node_health.route(node_urls)
+
+        # Every node receives the same payload: serialize it once and share the bytes
+        payload = {
+            "email": request.email,
+            "ciphertext": request.ciphertext,
+            "relay_server_endpoint": relay_endpoint,
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+            "category": request.category,
+            "client_info": request.client_info
+        }
+        body = encode_payload(payload)
+        logger.info(f"Relay endpoint: {relay_endpoint}")
+        logger.info(f"Sending {len(body)} byte payload to {len(node_urls)} nodes")
+
+        # Large ciphertexts can take a while for the nodes to ingest, hence the long timeout
+        results = await dispatch_to_nodes(node_urls, '/node/userdata', [body] * len(node_urls), timeout=120.0)
+
+        for result in results:
+            if result["status"] == "success":
+                logger.info(f"Node {result['node']} accepted task {result['task_id']} in {result['latency_ms']} ms")
+            else:
+                logger.warning(f"Node {result['node']} error after {result['latency_ms']} ms: {result['error']}")
+
+        # Cached scores and query results for this email/category may no longer match the nodes' data:
+        # move it to a new data version (other categories' results stay reusable) and drop the old entries
+        response: Dict[str, Any] = {"results": results}
+        if any(result["status"] == "success" for result in results):
+            version = await result_cache.bump_data_version(request.email, request.category)
+            removed = await result_cache.invalidate(result_cache.tag(request.email, request.category))
+            pair = f"{request.email}/{request.category}"
+            if version is None:
+                # the nodes have the new data, but results computed from the old may still be served
+                logger.error(f"Data version of {pair} not bumped, invalidated {removed} cached results")
+                response["cache_stale"] = True
+            else:
+                logger.info(f"Data version of {pair} is now {version}, invalidated {removed} cached results")
 
-        return {"results": results}
+        return response
+    except NodeUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
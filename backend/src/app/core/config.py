@@ -69,6 +69,19 @@ class RedisCacheSettings(BaseSettings):
     REDIS_CACHE_URL: str = f"redis://{REDIS_CACHE_HOST}:{REDIS_CACHE_PORT}"
 
 
+class ScoreCacheSettings(RedisCacheSettings):
+    SCORE_CACHE_ENABLED: bool = config("SCORE_CACHE_ENABLED", default=True)
+    SCORE_CACHE_TTL: int = config("SCORE_CACHE_TTL", default=300)
+    # query results are keyed on the (email, category) data version, so new uploads never hit them
+    # and they can be kept much longer; rescoring reruns only the categories whose data changed.
+    # Only with the Redis backend: in-process versions aren't shared, so SCORE_CACHE_TTL applies
+    SCORE_CACHE_QUERY_TTL: int = config("SCORE_CACHE_QUERY_TTL", default=86400)
+    # store entries in Redis (REDIS_CACHE_URL) so all workers share them; in-process when disabled or unreachable
+    SCORE_CACHE_REDIS_ENABLED: bool = config("SCORE_CACHE_REDIS_ENABLED", default=True)
+    # upper bound on in-process entries, oldest evicted first
+    SCORE_CACHE_MAX_ENTRIES: int = config("SCORE_CACHE_MAX_ENTRIES", default=1024)
+
+
 class ClientSideCacheSettings(BaseSettings):
     CLIENT_CACHE_MAX_AGE: int = config("CLIENT_CACHE_MAX_AGE", default=60)
 
@@ -78,6 +91,17 @@ class RedisQueueSettings(BaseSettings):
     REDIS_QUEUE_PORT: int = config("REDIS_QUEUE_PORT", default=6379)
 
 
+class ScoreJobSettings(BaseSettings):
+    # how long finished score jobs (result and progress) are kept in Redis
+    SCORE_JOB_RESULT_TTL: int = config("SCORE_JOB_RESULT_TTL", default=3600)
+    SCORE_JOB_TIMEOUT: int = config("SCORE_JOB_TIMEOUT", default=1800)
+    # how long DELETE /api/score-jobs/{job_id} waits for the worker to confirm the abort
+    SCORE_JOB_ABORT_WAIT: float = config("SCORE_JOB_ABORT_WAIT", default=5.0)
+    # MPC queries in flight at once across all portfolio jobs of a worker
+    PORTFOLIO_QUERY_CONCURRENCY: int = config("PORTFOLIO_QUERY_CONCURRENCY", default=32)
+    PORTFOLIO_JOB_TIMEOUT: int = config("PORTFOLIO_JOB_TIMEOUT", default=6 * 3600)
+
+
 class RedisRateLimiterSettings(BaseSettings):
     REDIS_RATE_LIMIT_HOST: str = config("REDIS_RATE_LIMIT_HOST", default="localhost")
     REDIS_RATE_LIMIT_PORT: int = config("REDIS_RATE_LIMIT_PORT", default=6379)
@@ -116,6 +140,104 @@ class GoogleOAuthSettings(BaseSettings):
     GOOGLE_REDIRECT_URI: str = config("GOOGLE_REDIRECT_URI", default="http://localhost:3000")
 
 
+class MPCClientSettings(BaseSettings):
+    MPC_HTTP_MAX_CONNECTIONS_PER_HOST: int = config("MPC_HTTP_MAX_CONNECTIONS_PER_HOST", default=50)
+    MPC_HTTP_MAX_KEEPALIVE_PER_HOST: int = config("MPC_HTTP_MAX_KEEPALIVE_PER_HOST", default=20)
+    # keep below the nodes' idle timeout (uvicorn closes idle connections after 5s)
+    MPC_HTTP_KEEPALIVE_EXPIRY: float = config("MPC_HTTP_KEEPALIVE_EXPIRY", default=4.0)
+    MPC_HTTP_CONNECT_TIMEOUT: float = config("MPC_HTTP_CONNECT_TIMEOUT", default=5.0)
+    MPC_HTTP_READ_TIMEOUT: float = config("MPC_HTTP_READ_TIMEOUT", default=30.0)
+    MPC_HTTP_WRITE_TIMEOUT: float = config("MPC_HTTP_WRITE_TIMEOUT", default=30.0)
+    MPC_HTTP_POOL_TIMEOUT: float = config("MPC_HTTP_POOL_TIMEOUT", default=10.0)
+    MPC_HTTP2: bool = config("MPC_HTTP2", default=False)
+
+
+class MPCCallbackSettings(BaseSettings):
+    MPC_CALLBACK_ENABLED: bool = config("MPC_CALLBACK_ENABLED", default=False)
+    # public base URL of this backend, as reachable from the MPC nodes
+    MPC_CALLBACK_BASE_URL: str = config("MPC_CALLBACK_BASE_URL", default="")
+    # share callbacks between workers; in-process only when unset
+    MPC_CALLBACK_REDIS_URL: str | None = config("MPC_CALLBACK_REDIS_URL", default=None)
+    MPC_CALLBACK_TTL: int = config("MPC_CALLBACK_TTL", default=600)
+
+
+class MPCSingleFlightSettings(BaseSettings):
+    # coalesce identical in-flight queries into a single MPC computation
+    MPC_SINGLEFLIGHT_ENABLED: bool = config("MPC_SINGLEFLIGHT_ENABLED", default=True)
+    # coordinate across workers through a Redis lock and result channel; per-worker only when unset
+    MPC_SINGLEFLIGHT_REDIS_URL: str | None = config("MPC_SINGLEFLIGHT_REDIS_URL", default=None)
+    # refreshed while the query runs, so this only bounds how long a crashed worker blocks others
+    MPC_SINGLEFLIGHT_LOCK_TTL: int = config("MPC_SINGLEFLIGHT_LOCK_TTL", default=30)
+
+
+class MPCHealthSettings(BaseSettings):
+    # probe the relay and MPC nodes in the background and fail fast while one is down
+    MPC_HEALTH_ENABLED: bool = config("MPC_HEALTH_ENABLED", default=True)
+    MPC_HEALTH_PROBE_INTERVAL: float = config("MPC_HEALTH_PROBE_INTERVAL", default=5.0)
+    MPC_HEALTH_PROBE_TIMEOUT: float = config("MPC_HEALTH_PROBE_TIMEOUT", default=2.0)
+    # any response below 500 counts as alive, so a path the nodes don't serve is fine
+    MPC_HEALTH_PROBE_PATH: str = config("MPC_HEALTH_PROBE_PATH", default="/")
+    # consecutive failures (requests or probes) that open a node's circuit
+    MPC_BREAKER_FAILURE_THRESHOLD: int = config("MPC_BREAKER_FAILURE_THRESHOLD", default=3)
+    # how long an open circuit rejects requests before letting a trial request through
+    MPC_BREAKER_RESET_TIMEOUT: float = config("MPC_BREAKER_RESET_TIMEOUT", default=15.0)
+    # standby triplets holding the same data, "url1,url2,url3;url4,url5,url6"; used in order when a default node is down
+    MPC_STANDBY_NODE_URLS: str = config("MPC_STANDBY_NODE_URLS", default="")
+
+
+class MPCRelayPoolSettings(BaseSettings):
+    # allocate relay IDs ahead of time in the background, so queries don't wait on the relay server
+    MPC_RELAY_POOL_ENABLED: bool = config("MPC_RELAY_POOL_ENABLED", default=True)
+    # IDs kept per relay server and worker process; a concurrent score takes 16 at once
+    MPC_RELAY_POOL_SIZE: int = config("MPC_RELAY_POOL_SIZE", default=32)
+    # a pool that drops below this is refilled right away rather than at the next maintenance pass
+    MPC_RELAY_POOL_LOW_WATER: int = config("MPC_RELAY_POOL_LOW_WATER", default=16)
+    # prefetched IDs unused for this long are discarded in case the relay has expired them; 0 keeps them
+    MPC_RELAY_POOL_ID_TTL: float = config("MPC_RELAY_POOL_ID_TTL", default=300.0)
+    # allocation requests in flight per relay server while refilling
+    MPC_RELAY_POOL_REFILL_CONCURRENCY: int = config("MPC_RELAY_POOL_REFILL_CONCURRENCY", default=4)
+    # how often expired IDs are dropped and every pool is topped up
+    MPC_RELAY_POOL_MAINTENANCE_INTERVAL: float = config("MPC_RELAY_POOL_MAINTENANCE_INTERVAL", default=10.0)
+
+
+class MPCBatchQuerySettings(BaseSettings):
+    # send all queries of a category to the nodes as one batch (one relay session) when every node supports it
+    MPC_BATCH_QUERIES_ENABLED: bool = config("MPC_BATCH_QUERIES_ENABLED", default=True)
+    # how long a node's advertised capabilities are trusted before asking again
+    MPC_CAPABILITIES_TTL: float = config("MPC_CAPABILITIES_TTL", default=300.0)
+
+
+class MPCServerKeySettings(BaseSettings):
+    # base64 compressed public key and 32-byte nonce of the MPC server key; the built-in development key when unset
+    MPC_SERVER_PUBLIC_KEY: str = config("MPC_SERVER_PUBLIC_KEY", default="")
+    MPC_SERVER_NONCE: str = config("MPC_SERVER_NONCE", default="")
+    # JSON {"public_key": ..., "nonce": ...} taking precedence over the above, re-read in the background when it
+    # changes: rotates the key without a restart
+    MPC_SERVER_KEY_FILE: str | None = config("MPC_SERVER_KEY_FILE", default=None)
+    MPC_SERVER_KEY_CHECK_INTERVAL: float = config("MPC_SERVER_KEY_CHECK_INTERVAL", default=5.0)
+    # also precompute the server key's fixed-window multiples (~40 ms per key load): only used where X25519 isn't
+    MPC_SERVER_KEY_TABLE: bool = config("MPC_SERVER_KEY_TABLE", default=False)
+
+
+class ExcelUploadSettings(BaseSettings):
+    # pandas engine for uploaded workbooks: "auto" uses calamine when python-calamine is installed, else openpyxl
+    EXCEL_ENGINE: str = config("EXCEL_ENGINE", default="auto")
+
+
+class MetricsSettings(BaseSettings):
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED: bool = config("METRICS_ENABLED", default=True)
+    # when set, scrapes must send "Authorization: Bearer <token>"
+    METRICS_TOKEN: str | None = config("METRICS_TOKEN", default=None)
+
+
+class TracingSettings(BaseSettings):
+    # where finished spans go, as OTLP/JSON lines: "none", "console" (stdout) or "file"
+    TRACING_EXPORTER: str = config("TRACING_EXPORTER", default="none")
+    TRACING_FILE: str = config("TRACING_FILE", default="logs/traces.jsonl")
+    TRACING_SERVICE_NAME: str = config("TRACING_SERVICE_NAME", default="sl-compute-backend")
+
+
 class EnvironmentOption(Enum):
     LOCAL = "local"
     STAGING = "staging"
@@ -132,9 +254,22 @@ class Settings(
     CryptSettings,
     TestSettings,
     ClientSideCacheSettings,
+    ScoreCacheSettings,
+    RedisQueueSettings,
+    ScoreJobSettings,
     DefaultRateLimitSettings,
     CRUDAdminSettings,
     GoogleOAuthSettings,
+    MPCClientSettings,
+    MPCCallbackSettings,
+    MPCSingleFlightSettings,
+    MPCHealthSettings,
+    MPCRelayPoolSettings,
+    MPCBatchQuerySettings,
+    MPCServerKeySettings,
+    ExcelUploadSettings,
+    MetricsSettings,
+    TracingSettings,
     EnvironmentSettings,
 ):
     pass
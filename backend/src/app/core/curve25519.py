@@ -0,0 +1,176 @@
+"""Edwards25519 arithmetic for the client side of the MPC key agreement.
+
+Points are extended coordinates ``(X, Y, Z, T)``. A client key pair is ``(sk, point_mul(sk, G))``
+and the key it shares with the server is ``convert2wei(point_mul(sk, server_point))`` as 32
+bytes big-endian, which is what the MPC nodes derive on their side.
+
+``point_mul`` is ~400 interpreted big-int point additions per call. The same keys, byte for
+byte, come from:
+
+- fixed-window tables of a point's multiples, ``table[i][j] = j * 16**i * P`` in affine form as
+  ``(y - x, y + x, 2dxy)``, so ``s * P`` is at most 64 additions and no doublings (``G_TABLE``
+  is built at import, a server point's table by ``key_material`` on request)
+- X25519 (cryptography) for the ECDH: it computes the Montgomery u = (1 + y) / (1 - y) of
+  ``sk * P`` from the u of ``P``, and ``convert2wei`` is that u plus ``WEI_DELTA``
+"""
+
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+
+# extended coordinates (X, Y, Z, T)
+Point = tuple[int, int, int, int]
+# a table entry, a point in affine form as (y - x, y + x, 2dxy)
+Precomputed = tuple[int, int, int]
+Table = list[list[Precomputed]]
+
+p = 2**255 - 19
+q = 2**252 + 27742317777372353535851937790883648493
+d = -121665 * pow(121666, p - 2, p) % p
+
+# convert2wei adds this to the Montgomery u
+WEI_DELTA = 19298681539552699237261830834781317975544997444273427339909597334652188435537
+
+
+def modp_inv(x: int) -> int:
+    # pow(x, p - 2, p) without the 255-bit exponentiation, including 0 for multiples of p
+    return pow(x, -1, p) if x % p else 0
+
+
+def point_add(P: Point, Q: Point) -> Point:
+    A, B = (P[1] - P[0]) * (Q[1] - Q[0]) % p, (P[1] + P[0]) * (Q[1] + Q[0]) % p
+    C, D = 2 * P[3] * Q[3] * d % p, 2 * P[2] * Q[2] % p
+    E, F, G, H = B - A, D - C, D + C, B + A
+    return (E * F, G * H, F * G, E * H)
+
+
+def point_mul(s: int, P: Point) -> Point:
+    Q: Point = (0, 1, 1, 0)
+    while s > 0:
+        if s & 1:
+            Q = point_add(Q, P)
+        P = point_add(P, P)
+        s >>= 1
+    return Q
+
+
+modp_sqrt_m1 = pow(2, (p - 1) // 4, p)
+
+
+def recover_x(y: int, sign: int) -> int | None:
+    if y >= p:
+        return None
+    x2 = (y * y - 1) * modp_inv(d * y * y + 1)
+    if x2 == 0:
+        if sign:
+            return None
+        else:
+            return 0
+    x = pow(x2, (p + 3) // 8, p)
+    if (x * x - x2) % p != 0:
+        x = x * modp_sqrt_m1 % p
+    if (x * x - x2) % p != 0:
+        return None
+    if (x & 1) != sign:
+        x = p - x
+    return x
+
+
+g_y = 4 * modp_inv(5) % p
+g_x = recover_x(g_y, 0)
+assert g_x is not None
+G: Point = (g_x, g_y, 1, g_x * g_y % p)
+
+
+def point_compress(P: Point) -> bytes:
+    zinv = modp_inv(P[2])
+    x = P[0] * zinv % p
+    y = P[1] * zinv % p
+    return int.to_bytes(y | ((x & 1) << 255), 32, "little")
+
+
+def point_decompress(s: bytes) -> Point | None:
+    if len(s) != 32:
+        raise Exception("Invalid input length for decompression")
+    y = int.from_bytes(s, "little")
+    sign = y >> 255
+    y &= (1 << 255) - 1
+    x = recover_x(y, sign)
+    if x is None:
+        return None
+    else:
+        return (x, y, 1, x * y % p)
+
+
+def convert2wei(P: Point) -> int:
+    zinv = modp_inv(P[2])
+    y = P[1] * zinv % p
+    oneplusy = (1 + y) % p
+    oneminusy = (1 - y) % p
+    invoneminusy = modp_inv(oneminusy)
+    t = (oneplusy * invoneminusy) % p
+    x = (t + WEI_DELTA) % p
+    return x
+
+
+def add_precomputed(P: Point, N: Precomputed) -> Point:
+    """point_add(P, Q) for Q taken from a fixed-window table"""
+    A, B = (P[1] - P[0]) * N[0] % p, (P[1] + P[0]) * N[1] % p
+    C, D = P[3] * N[2] % p, 2 * P[2] % p
+    E, F, G, H = B - A, D - C, D + C, B + A
+    return (E * F, G * H, F * G, E * H)
+
+
+def build_table(P: Point) -> Table:
+    """Fixed-window table of P for point_mul_table: 64 rows of j * 16**i * P, j = 1..15"""
+    table = []
+    base = P
+    for _ in range(64):
+        # j = 0, the identity: never looked up, point_mul_table skips zero digits
+        row: list[Precomputed] = [(1, 1, 0)]
+        M = base
+        for _ in range(15):
+            zinv = modp_inv(M[2])
+            x, y = M[0] * zinv % p, M[1] * zinv % p
+            row.append(((y - x) % p, (y + x) % p, 2 * d * x * y % p))
+            M = point_add(M, base)
+        table.append(row)
+        # 16 * base
+        base = M
+    return table
+
+
+def point_mul_table(s: int, table: Table) -> Point:
+    """point_mul(s, P) for 0 <= s < 2**256, with table = build_table(P)"""
+    Q: Point = (0, 1, 1, 0)
+    for row in table:
+        if not s:
+            break
+        if s & 15:
+            Q = add_precomputed(Q, row[s & 15])
+        s >>= 4
+    return Q
+
+
+G_TABLE = build_table(G)
+
+
+def point_mul_g(s: int) -> Point:
+    """point_mul(s, G) for 0 <= s < 2**256"""
+    return point_mul_table(s, G_TABLE)
+
+
+def montgomery_u(P: Point) -> int:
+    zinv = modp_inv(P[2])
+    y = P[1] * zinv % p
+    return (1 + y) * modp_inv(1 - y) % p
+
+
+def is_clamped(private_key: int) -> bool:
+    # X25519 clamps its scalar the way client keys are generated: other scalars must take point_mul
+    return private_key & 7 == 0 and private_key >> 254 == 1
+
+
+def x25519_shared_key(private_key: int, remote_u: int) -> bytes:
+    """convert2wei(point_mul(private_key, P)).to_bytes(32, "big") for the point P with Montgomery u remote_u"""
+    peer = X25519PublicKey.from_public_bytes(remote_u.to_bytes(32, "little"))
+    shared_u = X25519PrivateKey.from_private_bytes(private_key.to_bytes(32, "little")).exchange(peer)
+    return ((int.from_bytes(shared_u, "little") + WEI_DELTA) % p).to_bytes(32, "big")
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from collections.abc import Awaitable
+from typing import TypeVar
+
+from fastapi import HTTPException, Request
+
+from .metrics import client_disconnects_total
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# nginx's "client closed request": nobody reads it, but it shows up in logs and traces
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _disconnected(request: Request) -> None:
+    # the body has been read by the time the endpoint runs, so the next message is the disconnect
+    try:
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+    except Exception as e:
+        # can't tell: never report a disconnect rather than cancel work a client may be waiting for
+        logger.debug(f"Not watching for client disconnect: {e}")
+        await asyncio.Future()
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """Await ``work``, cancelling it if the client disconnects first.
+
+    For long-running endpoints that answer with one response (``/api/generate-score``,
+    ``/api/poll-results``): without this, a closed browser tab leaves the handler polling the
+    MPC nodes until its queries finish or time out. Streaming endpoints get the same from
+    ``stream_events``. Raises ``HTTPException(499)`` once the work has been cancelled.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_disconnected(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # the client went away, or our own caller was cancelled
+        disconnected = watcher.done() and not task.done()
+        for pending in (watcher, task):
+            pending.cancel()
+        await asyncio.gather(watcher, task, return_exceptions=True)
+
+    if disconnected:
+        client_disconnects_total.inc(path=request.url.path)
+        logger.info(f"Client disconnected from {request.url.path}, cancelled its work")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    return task.result()
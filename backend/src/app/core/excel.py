@@ -0,0 +1,42 @@
+import importlib.util
+import logging
+from typing import IO
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def excel_engine(configured: str = "auto") -> str | None:
+    """The pandas engine for ``configured``: "auto" is calamine (Rust, about ten times faster than
+    openpyxl in scripts/bench_excel_parse.py) when python-calamine is installed, otherwise
+    pandas' default, openpyxl's read-only reader. Any other value is passed to pandas as is."""
+    if configured != "auto":
+        return configured or None
+    return "calamine" if importlib.util.find_spec("python_calamine") is not None else None
+
+
+def read_sheets(
+    source: str | IO[bytes], sheet_names: list[str], engine: str | None = None, skiprows: int = 1
+) -> dict[str, pd.DataFrame | Exception]:
+    """Parse ``sheet_names`` from one opening of the workbook at ``source``, a path or binary file.
+
+    ``pd.read_excel`` per sheet unzips the workbook and parses its shared strings and styles
+    every time; one ``ExcelFile`` does that once and then only reads each sheet's rows. A sheet
+    that is missing or fails to parse maps to its exception, so the others are still returned;
+    a file that isn't a workbook at all raises.
+
+    A file is read from its start. For an upload that is ``UploadFile.file``, Starlette's own
+    spooled temporary file, so the workbook is never copied or held in memory as one ``bytes``;
+    like any blocking read, call this in the threadpool.
+    """
+    if not isinstance(source, str):
+        source.seek(0)
+    sheets: dict[str, pd.DataFrame | Exception] = {}
+    with pd.ExcelFile(source, engine=engine) as workbook:
+        for sheet_name in sheet_names:
+            try:
+                sheets[sheet_name] = workbook.parse(sheet_name, skiprows=skiprows)
+            except Exception as e:
+                sheets[sheet_name] = e
+    return sheets
@@ -0,0 +1,16 @@
+class SingleFlightError(Exception):
+    def __init__(self, message: str = "Shared MPC computation failed.") -> None:
+        self.message = message
+        super().__init__(self.message)
+
+
+class NodeUnavailableError(Exception):
+    def __init__(self, message: str = "MPC node is unavailable.") -> None:
+        self.message = message
+        super().__init__(self.message)
+
+
+class RelayError(Exception):
+    def __init__(self, message: str = "Failed to generate relay ID") -> None:
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,307 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from cryptography.exceptions import UnsupportedAlgorithm
+from fastapi.concurrency import run_in_threadpool
+
+from .config import MPCServerKeySettings
+from .curve25519 import (
+    Point,
+    Table,
+    build_table,
+    convert2wei,
+    is_clamped,
+    montgomery_u,
+    point_compress,
+    point_decompress,
+    point_mul,
+    point_mul_g,
+    point_mul_table,
+    x25519_shared_key,
+)
+
+logger = logging.getLogger(__name__)
+
+# The development key pair's public half and nonce, used unless MPC_SERVER_PUBLIC_KEY is set
+BUILT_IN_SERVER_PUBLIC_KEY = "ZzEeC1F+lWB6Qc9HcLtsm3KRNC9gpGdqx0fvhN25rj8="
+BUILT_IN_SERVER_NONCE = "bwKOJaOVuaN/B+jL3vneKxI329OmV2oa9ogZrqVXiwU="
+
+# (private key, compressed public key, shared key with the built-in server key) from point_mul/convert2wei
+KEY_AGREEMENT_KNOWN_ANSWERS = [
+    (
+        "4000000000000000000000000000000000000000000000000000000000000000",
+        "693e47972caf527c7883ad1b39822f026f47db2ab0e1919955b8993aa04411d1",
+        "1f2df5363f8f07e0fffb842a318adbc19157a59d102c1f734633b7a14368fdc2",
+    ),
+    (
+        "7ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff8",
+        "12e9a68b73fd5aacdbcaf3e88c46fea6ebedb1aa84eed1842f07f8edab65e3a7",
+        "525b4041382c7cd6655c552c25d4f8ccda27cfa093a334d6816a78429477c7ed",
+    ),
+    (
+        "5dfd8b3c176381ca07c995888fed43b97d537ed096ea87332c418c0d90e2dce8",
+        "a3922d66235c20987397f2dbd2a20520cf771d2c7a18ab29730254c3fba57285",
+        "5d5135fe8e81e24df2e54b2f57737d1344d761ef75314be79e2b61aee0232c37",
+    ),
+    (
+        "640c52fe895727c17e5351f4adf0bdfef59fdd46ce1dbd77224d3e39fce469d8",
+        "57af9966e303b4ef3170c84c032829e7f23e1a85fd55dfb48c3bcf59f1ced9e7",
+        "647d3ea85ff901151979c62382e7e3bdf84ae9c4d029cd7b9025b7c4e7293772",
+    ),
+]
+
+
+def check_fast_key_agreement() -> bool:
+    """Whether X25519 is available for the key agreement.
+
+    point_mul_g and x25519_shared_key must reproduce KEY_AGREEMENT_KNOWN_ANSWERS: a wrong answer
+    raises RuntimeError, failing the import, rather than encrypting to keys the nodes can't derive.
+    Only an OpenSSL build without X25519 falls back to point_mul for the shared key.
+    """
+    for private_key, public_key, _ in KEY_AGREEMENT_KNOWN_ANSWERS:
+        if point_compress(point_mul_g(int(private_key, 16))).hex() != public_key:
+            raise RuntimeError(f"point_mul_g disagrees with point_mul for the known-answer key {private_key}")
+
+    server_point = point_decompress(base64.b64decode(BUILT_IN_SERVER_PUBLIC_KEY))
+    assert server_point is not None
+    server_u = montgomery_u(server_point)
+    for private_key, _, shared_key in KEY_AGREEMENT_KNOWN_ANSWERS:
+        try:
+            result = x25519_shared_key(int(private_key, 16), server_u).hex()
+        except UnsupportedAlgorithm as e:
+            logger.warning(f"X25519 unavailable, using point_mul for shared keys: {e}")
+            return False
+        except ValueError as e:
+            result = f"an error ({e})"
+        if result != shared_key:
+            raise RuntimeError(f"X25519 disagrees with point_mul for the known-answer key {private_key}: {result}")
+    return True
+
+
+FAST_KEY_AGREEMENT = check_fast_key_agreement()
+
+
+# =========================
+# Session key derivation
+# =========================
+# The nodes derive the same: the XOR of both nonces, HKDF-SHA256 salted with its first
+# 20 bytes for the AES-GCM key and the next 12 bytes as the IV
+
+
+def hkdf_extract(salt: bytes, input_key_material: bytes) -> bytes:
+    if not salt:
+        salt = b"\x00" * hashlib.sha256().digest_size
+    return hmac.digest(salt, input_key_material, "sha256")
+
+
+def hkdf_expand(prk: bytes, info: bytes, length: int) -> bytes:
+    hash_len = hashlib.sha256().digest_size
+    if length > 255 * hash_len:
+        raise ValueError("Cannot expand to more than 255 * HashLen bytes of output")
+    blocks = []
+    block = b""
+    for block_index in range(1, -(-length // hash_len) + 1):
+        block = hmac.digest(prk, block + info + bytes([block_index]), "sha256")
+        blocks.append(block)
+    return b"".join(blocks)[:length]
+
+
+def get_xored_nonce(bytes_your_nonce: bytes, bytes_remote_nonce: bytes) -> bytes:
+    return bytes(b1 ^ b2 for b1, b2 in zip(bytes_your_nonce, bytes_remote_nonce))
+
+
+def get_session_key(xored_nonce: bytes, shared_key: bytes) -> bytes:
+    prk = hkdf_extract(salt=xored_nonce[:20], input_key_material=shared_key)
+    return hkdf_expand(prk=prk, info=b"", length=32)
+
+
+def get_iv(xored_nonce: bytes) -> bytes:
+    return xored_nonce[20:32]
+
+
+# =========================
+# Server key material
+# =========================
+
+# clamped, so the load-time cross-check exercises the X25519 path
+CHECK_SCALAR = int(KEY_AGREEMENT_KNOWN_ANSWERS[2][0], 16)
+
+
+@dataclass(frozen=True)
+class KeyMaterial:
+    """Everything derived from one server public key and nonce, computed once per key.
+
+    ``u`` (the point's Montgomery u, for X25519) is only set when X25519 passed its
+    known-answer check and agrees with ``point_mul`` on this point; ``table`` holds the
+    point's fixed-window multiples when ``MPC_SERVER_KEY_TABLE`` is on, for the scalars
+    X25519 can't take.
+    """
+
+    key_id: str
+    point: Point
+    nonce: bytes
+    source: str
+    u: int | None = None
+    table: Table | None = field(default=None, repr=False)
+    loaded_at: float = field(default_factory=time.time)
+
+    def shared_key(self, private_key: int) -> bytes:
+        """convert2wei(point_mul(private_key, point)) as 32 bytes big-endian"""
+        if self.u is not None and is_clamped(private_key):
+            try:
+                return x25519_shared_key(private_key, self.u)
+            except ValueError:
+                # X25519 refuses an all-zero result (a low-order product), which point_mul handles
+                pass
+        if self.table is not None and private_key >> 256 == 0:
+            product = point_mul_table(private_key, self.table)
+        else:
+            product = point_mul(private_key, self.point)
+        return convert2wei(product).to_bytes(32, "big")
+
+
+def load_key_material(public_key: str, nonce: str, source: str, with_table: bool = False) -> KeyMaterial:
+    """Decode and precompute a server key (both base64); raises ValueError for an unusable one."""
+    compressed = base64.b64decode(public_key, validate=True)
+    nonce_bytes = base64.b64decode(nonce, validate=True)
+    if len(compressed) != 32:
+        raise ValueError(f"server public key is {len(compressed)} bytes, expected 32")
+    if len(nonce_bytes) != 32:
+        raise ValueError(f"server nonce is {len(nonce_bytes)} bytes, expected 32")
+    point = point_decompress(compressed)
+    if point is None:
+        raise ValueError("server public key is not a point on the curve")
+
+    table = build_table(point) if with_table else None
+    expected = convert2wei(point_mul_table(CHECK_SCALAR, table) if table else point_mul(CHECK_SCALAR, point))
+    u = None
+    if FAST_KEY_AGREEMENT:
+        try:
+            u = montgomery_u(point)
+            if x25519_shared_key(CHECK_SCALAR, u) != expected.to_bytes(32, "big"):
+                logger.warning(f"X25519 disagrees with point_mul on the server key from {source}, using point_mul")
+                u = None
+        except ValueError:
+            u = None
+
+    key_id = hashlib.sha256(compressed + nonce_bytes).hexdigest()[:12]
+    return KeyMaterial(key_id=key_id, point=point, nonce=nonce_bytes, source=source, u=u, table=table)
+
+
+class ServerKeyStore:
+    """The server key material ciphertext requests encrypt to, decoded once rather than per request.
+
+    It comes from ``MPC_SERVER_PUBLIC_KEY``/``MPC_SERVER_NONCE`` (the built-in development key
+    when unset), or from ``MPC_SERVER_KEY_FILE`` when that is set: a JSON object with
+    ``public_key`` and ``nonce``. While started, a background task checks the file every
+    ``MPC_SERVER_KEY_CHECK_INTERVAL`` seconds and reloads it in the threadpool when it changed,
+    swapping in the new material in one assignment, so the key can be rotated without a restart
+    and ``current()`` never touches the disk. A file that is missing or doesn't hold a usable key
+    leaves the current key in place.
+    """
+
+    def __init__(self) -> None:
+        self.public_key = BUILT_IN_SERVER_PUBLIC_KEY
+        self.nonce = BUILT_IN_SERVER_NONCE
+        self.key_file: str | None = None
+        self.check_interval = 5.0
+        self.with_table = False
+        self.rotations = 0
+        self._material: KeyMaterial | None = None
+        self._file_stamp: tuple[int, int] | None = None
+        self._watch_task: asyncio.Task | None = None
+
+    async def start(self, key_settings: MPCServerKeySettings) -> None:
+        self.public_key = key_settings.MPC_SERVER_PUBLIC_KEY or BUILT_IN_SERVER_PUBLIC_KEY
+        self.nonce = key_settings.MPC_SERVER_NONCE or BUILT_IN_SERVER_NONCE
+        self.key_file = key_settings.MPC_SERVER_KEY_FILE or None
+        self.check_interval = key_settings.MPC_SERVER_KEY_CHECK_INTERVAL
+        self.with_table = key_settings.MPC_SERVER_KEY_TABLE
+        self._material = None
+        self._file_stamp = None
+        if self.key_file:
+            await run_in_threadpool(self._check_key_file, self.key_file, None)
+            if self._watch_task is None:
+                self._watch_task = asyncio.create_task(self._watch_loop())
+        # a configured key that doesn't decode fails startup rather than the first upload
+        material = self.current()
+        logger.info(f"Server key {material.key_id} from {material.source}")
+
+    async def stop(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+    def current(self) -> KeyMaterial:
+        material = self._material
+        if material is None:
+            source = "built-in" if self.public_key == BUILT_IN_SERVER_PUBLIC_KEY else "MPC_SERVER_PUBLIC_KEY"
+            material = self._material = load_key_material(self.public_key, self.nonce, source, self.with_table)
+        return material
+
+    def snapshot(self) -> dict[str, Any]:
+        material = self.current()
+        return {
+            "key_id": material.key_id,
+            "source": material.source,
+            "loaded_at": material.loaded_at,
+            "x25519": material.u is not None,
+            "table": material.table is not None,
+            "key_file": self.key_file,
+            "rotations": self.rotations,
+        }
+
+    async def _watch_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            if not self.key_file:
+                continue
+            try:
+                await run_in_threadpool(self._check_key_file, self.key_file, self.current())
+            except Exception as e:
+                logger.error(f"Server key file check failed: {e}")
+
+    def _check_key_file(self, key_file: str, current: KeyMaterial | None) -> KeyMaterial | None:
+        """Load ``key_file`` if it changed since the last check, making it current; runs in the threadpool.
+
+        Returns the new material, or None when the file is unchanged or unusable.
+        """
+        keeping = f"keeping key {current.key_id}" if current is not None else "using the configured key"
+        try:
+            stat = os.stat(key_file)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            if self._file_stamp is not None or current is None:
+                logger.warning(f"Server key file unreadable, {keeping}: {e}")
+            self._file_stamp = None
+            return None
+        if stamp == self._file_stamp:
+            return None
+        self._file_stamp = stamp
+
+        try:
+            with open(key_file, encoding="utf-8") as f:
+                data = json.load(f)
+            material = load_key_material(data["public_key"], data["nonce"], key_file, self.with_table)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Could not load server key from {key_file}, {keeping}: {e}")
+            return None
+
+        if current is not None and material.key_id != current.key_id:
+            self.rotations += 1
+            logger.info(f"Server key rotated from {current.key_id} to {material.key_id} ({key_file})")
+        # requests read the old material or the new one, never a mix
+        self._material = material
+        return material
+
+
+server_keys = ServerKeyStore()
@@ -0,0 +1,221 @@
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# request-sized latencies: relay allocation, node dispatch
+FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# MPC computations: query time-to-complete, node-reported time_taken, whole scores
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """A labelled metric family. Label values are passed as keyword arguments on every update."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        registry.register(self)
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        # without labels there is a single series, exported as 0 until first updated
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        # without labels there is a single series, exported as 0 until first updated
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = FAST_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: count per bucket (the last one is +Inf), sum
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = ([0] * (len(self.buckets) + 1), [0.0])
+            self._values[key] = entry
+        counts, total = entry
+        # le buckets are inclusive, so a value equal to a bound lands in that bucket
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the block, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = 'le="' + bound + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total[0])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Every metric of the process, rendered in the Prometheus text exposition format.
+
+    Metrics are per worker process: with several API workers each scrape sees the one
+    that answered, so scrape the workers individually (or run a single worker) when
+    exact totals matter.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# -------------- MPC pipeline --------------
+relay_allocation_seconds = Histogram(
+    "mpc_relay_allocation_seconds", "Time to allocate a relay ID from the relay server.", ("outcome",)
+)
+node_dispatch_seconds = Histogram(
+    "mpc_node_dispatch_seconds", "Time for an MPC node to accept a task.", ("node", "path", "outcome")
+)
+query_duration_seconds = Histogram(
+    "mpc_query_duration_seconds",
+    "Time from dispatching a query to having every node's result.",
+    ("category", "query_str", "outcome"),
+    buckets=SLOW_BUCKETS,
+)
+node_time_taken_seconds = Histogram(
+    "mpc_node_time_taken_seconds",
+    "Computation time reported by the MPC nodes (time_taken).",
+    ("category", "query_str", "node"),
+    buckets=SLOW_BUCKETS,
+)
+poll_attempts_total = Counter("mpc_poll_attempts_total", "Task status polls sent to MPC nodes.", ("node",))
+poll_timeouts_total = Counter(
+    "mpc_poll_timeouts_total", "Node tasks still pending when polling gave up.", ("node",)
+)
+node_tasks_cancelled_total = Counter(
+    "mpc_node_tasks_cancelled_total", "Abandoned node tasks the MPC nodes accepted a cancellation for.", ("node",)
+)
+client_disconnects_total = Counter(
+    "http_client_disconnects_total", "Requests whose work was cancelled because the client went away.", ("path",)
+)
+node_errors_total = Counter(
+    "mpc_node_errors_total", "Errors from MPC nodes, by stage (dispatch or poll).", ("node", "stage")
+)
+relay_pool_hits_total = Counter(
+    "mpc_relay_pool_hits_total", "Relay IDs served from the prefetch pool.", ("relay",)
+)
+relay_pool_misses_total = Counter(
+    "mpc_relay_pool_misses_total",
+    "Relay IDs allocated on the request path because the prefetch pool had none.",
+    ("relay",),
+)
+relay_pool_expired_total = Counter(
+    "mpc_relay_pool_expired_total", "Prefetched relay IDs discarded unused after MPC_RELAY_POOL_ID_TTL.", ("relay",)
+)
+relay_pool_size = Gauge("mpc_relay_pool_size", "Relay IDs currently prefetched.", ("relay",))
+queries_in_flight = Gauge("mpc_queries_in_flight", "MPC queries dispatched and not yet complete.")
+scores_in_flight = Gauge("score_generations_in_flight", "Score generations running in this process.")
+score_duration_seconds = Histogram(
+    "score_generation_seconds", "Time to generate a complete score.", ("outcome", "cached"), buckets=SLOW_BUCKETS
+)
+score_jobs = Gauge("score_jobs", "Background jobs in the arq queue, read at scrape time.", ("state",))
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Any
+
+import httpx
+
+from ..exceptions.mpc_exceptions import NodeUnavailableError
+from ..metrics import node_tasks_cancelled_total
+from ..tracing import SpanKind, tracer
+from .capabilities import node_capabilities
+from .clients import origin
+from .health import node_health
+
+logger = logging.getLogger(__name__)
+
+
+class TaskCanceller:
+    """Asks MPC nodes to stop tasks nobody is waiting for any more.
+
+    Polling hands over the tasks it abandons (its caller was cancelled, it timed out, or
+    another party failed) and the nodes that advertise ``cancel_query`` get a
+    ``DELETE /node/query/{task_id}`` for each, in the background, so it also works from a
+    coroutine that is itself being cancelled. Other nodes finish the task and the result is
+    discarded, as before.
+    """
+
+    def __init__(self) -> None:
+        self.requested = 0
+        self.cancelled = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    def cancel_soon(self, tasks: list[dict[str, Any]]) -> None:
+        if not tasks:
+            return
+        task = asyncio.create_task(self.cancel(tasks))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def cancel(self, tasks: list[dict[str, Any]]) -> int:
+        """Cancel ``tasks`` (dispatch results with ``url`` and ``task_id``), returning how many nodes accepted."""
+        outcomes = await asyncio.gather(*(self._cancel_task(task) for task in tasks))
+        return sum(outcomes)
+
+    async def drain(self) -> None:
+        """Let cancellations already requested reach the nodes (on shutdown)."""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"requested": self.requested, "cancelled": self.cancelled, "in_flight": len(self._tasks)}
+
+    async def _cancel_task(self, task: dict[str, Any]) -> bool:
+        url, task_id = task.get("url"), task.get("task_id")
+        if not url or task_id is None or not node_health.available(url):
+            return False
+        if not (await node_capabilities.get(url)).cancel_query:
+            return False
+
+        self.requested += 1
+        with tracer.span("mpc.node.cancel", SpanKind.CLIENT, node=task.get("node"), url=url, task_id=task_id) as span:
+            try:
+                response = await node_health.request("DELETE", f"{url}/node/query/{task_id}", timeout=5.0)
+            except (httpx.HTTPError, NodeUnavailableError) as e:
+                span.record_error(e)
+                logger.warning(f"Could not cancel task {task_id} on MPC node {url}: {e}")
+                return False
+            span.set_attribute("http.status_code", response.status_code)
+
+        # 404/409: the task is gone or already finished, nothing left to stop
+        if response.status_code >= 400:
+            return False
+        self.cancelled += 1
+        node_tasks_cancelled_total.inc(node=origin(url))
+        return True
+
+
+task_canceller = TaskCanceller()
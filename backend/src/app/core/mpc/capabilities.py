@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from ..config import MPCBatchQuerySettings
+from ..exceptions.mpc_exceptions import NodeUnavailableError
+from .clients import origin
+from .health import node_health
+
+logger = logging.getLogger(__name__)
+
+CAPABILITIES_PATH = "/node/capabilities"
+BATCH_QUERY_PATH = "/node/query-batch"
+
+
+@dataclass(frozen=True)
+class NodeCapabilities:
+    # node accepts POST /node/query-batch: several query_strs over one relay session, one task
+    batch_query: bool = False
+    # most query_strs per batch the node accepts; 0 means no limit
+    max_batch_size: int = 0
+    # node stops a running task on DELETE /node/query/{task_id}
+    cancel_query: bool = False
+
+
+class NodeCapabilityRegistry:
+    """What each MPC node advertises at ``GET /node/capabilities``, cached per origin.
+
+    Nodes that don't serve the endpoint (or answer anything but a JSON object) are
+    treated as supporting single, uncancellable queries only. Answers are cached for
+    ``MPC_CAPABILITIES_TTL`` seconds, failures for a tenth of that so a node that was
+    briefly down is asked again soon.
+    """
+
+    def __init__(self) -> None:
+        self.batch_enabled = True
+        self.ttl = 300.0
+        self._cache: dict[str, tuple[float, NodeCapabilities]] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+
+    def configure(self, batch_settings: MPCBatchQuerySettings) -> None:
+        self.batch_enabled = batch_settings.MPC_BATCH_QUERIES_ENABLED
+        self.ttl = batch_settings.MPC_CAPABILITIES_TTL
+        self._cache.clear()
+
+    async def get(self, url: str) -> NodeCapabilities:
+        key = origin(url)
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() < cached[0]:
+            return cached[1]
+        # concurrent queries to a node share one capabilities request
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def batch_size(self, node_urls: list[str]) -> int:
+        """How many queries can go in one batch to all of ``node_urls``: 0 when any of them can't
+        take batches (or batching is disabled), -1 when there is no limit.
+        """
+        if not self.batch_enabled:
+            return 0
+        capabilities = await asyncio.gather(*(self.get(url) for url in node_urls))
+        if not all(c.batch_query for c in capabilities):
+            return 0
+        limits = [c.max_batch_size for c in capabilities if c.max_batch_size > 0]
+        return min(limits) if limits else -1
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "batch_enabled": self.batch_enabled,
+            "nodes": {
+                key: {"batch_query": c.batch_query, "max_batch_size": c.max_batch_size, "cancel_query": c.cancel_query}
+                for key, (_, c) in self._cache.items()
+            },
+        }
+
+    async def _fetch(self, key: str) -> NodeCapabilities:
+        try:
+            response = await node_health.request("GET", f"{key}{CAPABILITIES_PATH}", timeout=5.0)
+            content = response.json() if response.status_code == 200 else None
+            capabilities = NodeCapabilities()
+            if isinstance(content, dict):
+                capabilities = NodeCapabilities(
+                    batch_query=bool(content.get("batch_query", False)),
+                    max_batch_size=int(content.get("max_batch_size") or 0),
+                    cancel_query=bool(content.get("cancel_query", False)),
+                )
+        except (httpx.HTTPError, NodeUnavailableError, TypeError, ValueError) as e:
+            logger.warning(f"Could not read capabilities of MPC node {key}: {e}")
+            self._cache[key] = (time.monotonic() + self.ttl / 10, NodeCapabilities())
+            return NodeCapabilities()
+
+        self._cache[key] = (time.monotonic() + self.ttl, capabilities)
+        return capabilities
+
+
+node_capabilities = NodeCapabilityRegistry()
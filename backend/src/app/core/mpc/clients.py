@@ -0,0 +1,73 @@
+import importlib.util
+import logging
+
+import httpx
+
+from ..config import MPCClientSettings
+
+logger = logging.getLogger(__name__)
+
+
+def origin(url: str) -> str:
+    """Scheme, host and port of ``url``, e.g. ``http://10.0.0.5:9000``."""
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.netloc.decode('ascii')}"
+
+
+class HTTPClientRegistry:
+    """Long-lived, pooled ``httpx.AsyncClient`` instances for relay and MPC node traffic.
+
+    One client is kept per origin (scheme, host and port), so the connection
+    limits from :class:`MPCClientSettings` apply per host and keep-alive
+    connections are reused across requests and poll iterations.
+
+    The registry is configured and closed by the application lifespan. Clients
+    are created lazily on first use, so code running outside the app (the arq
+    worker, scripts) can use it as well.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._settings = MPCClientSettings()
+
+    def configure(self, settings: MPCClientSettings) -> None:
+        self._settings = settings
+
+    def _build_client(self) -> httpx.AsyncClient:
+        s = self._settings
+        http2 = s.MPC_HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("MPC_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=s.MPC_HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=s.MPC_HTTP_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=s.MPC_HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            connect=s.MPC_HTTP_CONNECT_TIMEOUT,
+            read=s.MPC_HTTP_READ_TIMEOUT,
+            write=s.MPC_HTTP_WRITE_TIMEOUT,
+            pool=s.MPC_HTTP_POOL_TIMEOUT,
+        )
+        # retries only covers failed connection attempts, never a request that reached the node
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2, retries=1)
+        return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Return the pooled client for the origin of ``url``."""
+        key = origin(url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._build_client()
+            self._clients[key] = client
+        return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from collections.abc import Awaitable
+from typing import Any, cast
+
+from redis.asyncio import Redis
+
+from ..config import MPCCallbackSettings, settings
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_PATH = "/api/v1/api/mpc-callback"
+CHANNEL_PREFIX = "mpc-callback:"
+
+
+class CallbackSession:
+    def __init__(self) -> None:
+        self.updates: dict[str, dict[str, Any]] = {}
+        self.event = asyncio.Event()
+        self.created_at = time.monotonic()
+
+
+class CompletionRegistry:
+    """Receives task completion callbacks pushed by MPC nodes and wakes up whoever is waiting on them.
+
+    Every dispatched query gets a ``callback_id``; nodes POST their task result to
+    ``{MPC_CALLBACK_BASE_URL}/api/v1/api/mpc-callback/{callback_id}`` with the
+    per-task token in ``X-Callback-Token``. Tokens are an HMAC of the callback ID,
+    so any worker can verify them without shared state.
+
+    When ``MPC_CALLBACK_REDIS_URL`` is set, callbacks are also stored in Redis and
+    published on a channel, so a waiter on another gunicorn worker is notified too.
+    Otherwise delivery is in-process only.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.base_url = ""
+        self.ttl = 600
+        self._sessions: dict[str, CallbackSession] = {}
+        self._redis: Redis | None = None
+        self._subscriber: asyncio.Task | None = None
+
+    async def start(self, callback_settings: MPCCallbackSettings) -> None:
+        self.enabled = callback_settings.MPC_CALLBACK_ENABLED and bool(callback_settings.MPC_CALLBACK_BASE_URL)
+        self.base_url = callback_settings.MPC_CALLBACK_BASE_URL.rstrip("/")
+        self.ttl = callback_settings.MPC_CALLBACK_TTL
+        if self.enabled and callback_settings.MPC_CALLBACK_REDIS_URL:
+            self._redis = Redis.from_url(callback_settings.MPC_CALLBACK_REDIS_URL)
+            self._subscriber = asyncio.create_task(self._subscribe())
+
+    async def stop(self) -> None:
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            await asyncio.gather(self._subscriber, return_exceptions=True)
+            self._subscriber = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    # -------------- tokens --------------
+    @staticmethod
+    def token_for(callback_id: str) -> str:
+        key = settings.SECRET_KEY.get_secret_value().encode("utf-8")
+        return hmac.new(key, f"mpc-callback:{callback_id}".encode(), hashlib.sha256).hexdigest()
+
+    def verify(self, callback_id: str, token: str) -> bool:
+        return hmac.compare_digest(self.token_for(callback_id), token)
+
+    # -------------- sessions --------------
+    def _expire_sessions(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        for callback_id in [k for k, s in self._sessions.items() if s.created_at < cutoff]:
+            del self._sessions[callback_id]
+
+    def _session(self, callback_id: str) -> CallbackSession:
+        session = self._sessions.get(callback_id)
+        if session is None:
+            self._expire_sessions()
+            session = self._sessions[callback_id] = CallbackSession()
+        return session
+
+    def open(self) -> dict[str, str] | None:
+        """Start a callback session for a query about to be dispatched.
+
+        Returns the ``callback_id`` plus the ``callback_url``/``callback_token``
+        fields to add to the node payload, or None when callbacks are disabled.
+        """
+        if not self.enabled:
+            return None
+        callback_id = secrets.token_hex(16)
+        self._session(callback_id)
+        return {
+            "callback_id": callback_id,
+            "callback_url": f"{self.base_url}{CALLBACK_PATH}/{callback_id}",
+            "callback_token": self.token_for(callback_id),
+        }
+
+    def close(self, callback_id: str) -> None:
+        self._sessions.pop(callback_id, None)
+
+    # -------------- delivery --------------
+    def _store(self, callback_id: str, payload: dict[str, Any], create: bool = True) -> None:
+        if not create and callback_id not in self._sessions:
+            return
+        session = self._session(callback_id)
+        task_id = str(payload["task_id"])
+        # the same callback comes back from Redis (updates(), our own publish): only news wakes waiters,
+        # or a waiter with another node still pending would spin on wait()/updates()
+        if session.updates.get(task_id) == payload:
+            return
+        session.updates[task_id] = payload
+        session.event.set()
+
+    async def deliver(self, callback_id: str, payload: dict[str, Any]) -> None:
+        """Record a node callback and notify waiters on this and (through Redis) other workers."""
+        self._store(callback_id, payload)
+        if self._redis is not None:
+            key = f"{CHANNEL_PREFIX}{callback_id}"
+            data = json.dumps(payload)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hset(key, str(payload["task_id"]), data)
+                pipe.expire(key, self.ttl)
+                pipe.publish(key, data)
+                await pipe.execute()
+
+    async def _subscribe(self) -> None:
+        assert self._redis is not None
+        pubsub = self._redis.pubsub()
+        await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    channel = message["channel"]
+                    channel = channel.decode() if isinstance(channel, bytes) else channel
+                    # only keep callbacks somebody on this worker is waiting for
+                    self._store(channel[len(CHANNEL_PREFIX) :], json.loads(message["data"]), create=False)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"MPC callback subscriber error: {e}")
+                    await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+    async def updates(self, callback_id: str) -> dict[str, dict[str, Any]]:
+        """Return the callbacks received so far for a session, keyed by node task ID."""
+        session = self._session(callback_id)
+        if self._redis is not None:
+            # callbacks may have landed on another worker before we started waiting
+            stored = await cast(Awaitable[dict[bytes, bytes]], self._redis.hgetall(f"{CHANNEL_PREFIX}{callback_id}"))
+            for data in stored.values():
+                self._store(callback_id, json.loads(data))
+        return dict(session.updates)
+
+    async def wait(self, callback_id: str, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for a new callback. Returns True if one arrived."""
+        session = self._session(callback_id)
+        try:
+            await asyncio.wait_for(session.event.wait(), timeout=max(0.0, timeout))
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            session.event.clear()
+
+
+completions = CompletionRegistry()
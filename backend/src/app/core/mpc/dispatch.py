@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+from typing import Any
+
+from ..exceptions.mpc_exceptions import RelayError
+from ..metrics import node_dispatch_seconds, node_errors_total, relay_allocation_seconds
+from ..tracing import SpanKind, tracer
+from .clients import origin
+from .health import node_health
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def encode_payload(payload: dict[str, Any]) -> bytes:
+    """Serialize a node payload to JSON bytes once, so it can be reused for every node."""
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+async def post_to_node(
+    node: int, base_url: str, path: str, body: bytes, timeout: float | None = None
+) -> dict[str, Any]:
+    """POST a pre-serialized payload to a single MPC node.
+
+    Returns the node result entry used by the query/upload endpoints, with the
+    time spent on the request in ``latency_ms``. Errors are reported in the
+    entry instead of being raised, including the immediate one for a node whose
+    circuit is open.
+    """
+    kwargs: dict[str, Any] = {"content": body, "headers": JSON_HEADERS}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+
+    start = time.perf_counter()
+    with tracer.span("mpc.node.dispatch", SpanKind.CLIENT, node=node, url=base_url, path=path) as span:
+        try:
+            response = await node_health.request("POST", f"{base_url}{path}", **kwargs)
+            if response.status_code in [200, 201]:
+                result = response.json()
+                entry = {"node": node, "status": "success", "task_id": result.get("task_id"), "url": base_url}
+                span.set_attribute("task_id", entry["task_id"])
+            else:
+                entry = {"node": node, "status": "error", "error": f"HTTP {response.status_code}"}
+            span.set_attribute("http.status_code", response.status_code)
+        except Exception as e:
+            entry = {"node": node, "status": "error", "error": str(e) or type(e).__name__}
+        if entry["status"] == "error":
+            span.record_error(entry["error"])
+
+    elapsed = time.perf_counter() - start
+    entry["latency_ms"] = round(elapsed * 1000, 2)
+    node_dispatch_seconds.observe(elapsed, node=origin(base_url), path=path, outcome=entry["status"])
+    if entry["status"] == "error":
+        node_errors_total.inc(node=origin(base_url), stage="dispatch")
+    return entry
+
+
+async def dispatch_to_nodes(
+    node_urls: list[str], path: str, bodies: list[bytes], timeout: float | None = None
+) -> list[dict[str, Any]]:
+    """POST to all MPC nodes concurrently.
+
+    ``bodies[i]`` is sent to ``node_urls[i]``; pass the same bytes object for
+    every node when the payload is identical. Results come back in node order.
+    """
+    return await asyncio.gather(
+        *(
+            post_to_node(i + 1, node_url, path, body, timeout=timeout)
+            for i, (node_url, body) in enumerate(zip(node_urls, bodies))
+        )
+    )
+
+
+async def request_relay_id(relay_server: str) -> str:
+    """Allocate a relay ID for one computation from the relay server, raising ``RelayError`` on failure."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with tracer.span("relay.allocate", SpanKind.CLIENT, url=relay_server) as span:
+            response = await node_health.request("POST", f"{relay_server}/relay")
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code != 200:
+                raise RelayError(f"Failed to generate relay ID (HTTP {response.status_code})")
+            relay_id: str = response.json()["relay_id"]
+            span.set_attribute("relay_id", relay_id)
+        outcome = "success"
+        return relay_id
+    finally:
+        relay_allocation_seconds.observe(time.perf_counter() - start, outcome=outcome)
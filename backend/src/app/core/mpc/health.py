@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Any
+
+import httpx
+
+from ..config import MPCHealthSettings
+from ..exceptions.mpc_exceptions import NodeUnavailableError
+from ..tracing import inject_headers
+from .clients import http_clients, origin
+
+logger = logging.getLogger(__name__)
+
+# gateway errors mean the node (or its proxy) is down; other 5xx are answers from a live node
+UNAVAILABLE_STATUSES = frozenset({502, 503, 504})
+# origins seen only in requests are forgotten (and no longer probed) after this long without traffic
+IDLE_AFTER = 600.0
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Failure tracking for one relay or MPC node origin.
+
+    ``failure_threshold`` consecutive failures open the circuit, and requests are then
+    rejected without touching the network. After ``reset_timeout`` one trial request at
+    a time is let through (half-open): success closes the circuit, failure opens it for
+    another ``reset_timeout``. Background probes feed the same counters, so a node that
+    comes back is usually closed again before any request needs it.
+    """
+
+    def __init__(self, url: str, failure_threshold: int, reset_timeout: float) -> None:
+        self.url = url
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.last_error: str | None = None
+        self.opened_at = 0.0
+        self.last_used = time.monotonic()
+        self._trial_started_at: float | None = None
+
+    def available(self) -> bool:
+        """Whether a request would be let through, without claiming the half-open trial."""
+        now = time.monotonic()
+        if self.state is CircuitState.CLOSED:
+            return True
+        if self.state is CircuitState.OPEN:
+            return now - self.opened_at >= self.reset_timeout
+        # a trial that never reported back (cancelled) stops blocking after reset_timeout
+        return self._trial_started_at is None or now - self._trial_started_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """Claim permission for one request; False means fail fast."""
+        self.last_used = time.monotonic()
+        if not self.available():
+            self.rejected += 1
+            return False
+        if self.state is not CircuitState.CLOSED:
+            self.state = CircuitState.HALF_OPEN
+            self._trial_started_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        if self.state is not CircuitState.CLOSED:
+            logger.info(f"MPC circuit for {self.url} closed")
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self._trial_started_at = None
+
+    def record_failure(self, error: Any) -> None:
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        self.last_error = str(error) or type(error).__name__
+        self._trial_started_at = None
+        if self.state is CircuitState.HALF_OPEN or (
+            self.state is CircuitState.CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            logger.warning(
+                f"MPC circuit for {self.url} opened after {self.consecutive_failures} failures: {self.last_error}"
+            )
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+        elif self.state is CircuitState.OPEN:
+            self.opened_at = time.monotonic()
+
+    def retry_in(self) -> float:
+        if self.state is CircuitState.CLOSED:
+            return 0.0
+        started = self.opened_at if self.state is CircuitState.OPEN else self._trial_started_at or 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - started))
+
+    def describe(self) -> str:
+        return (
+            f"{self.url} is unavailable (circuit {self.state.value} after {self.consecutive_failures} failures: "
+            f"{self.last_error}), retry in {self.retry_in():.0f}s"
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+            "retry_in": round(self.retry_in(), 1),
+        }
+
+
+class NodeHealthRegistry:
+    """Per-origin circuit breakers for the relay and MPC nodes, kept current by background probes.
+
+    Requests go through ``request`` (or call ``check`` and ``record_*`` themselves), so a node
+    that stops answering is rejected in microseconds after ``MPC_BREAKER_FAILURE_THRESHOLD``
+    failures instead of costing every query its HTTP timeouts and poll attempts. ``route``
+    picks the node triplet for a query, failing over to the ``MPC_STANDBY_NODE_URLS``
+    triplets when allowed.
+
+    Breakers are per worker process; each worker runs its own probes.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.failure_threshold = 3
+        self.reset_timeout = 15.0
+        self.probe_interval = 5.0
+        self.probe_timeout = 2.0
+        self.probe_path = "/"
+        self.standby_triplets: list[list[str]] = []
+        self.failovers = 0
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._watched: set[str] = set()
+        self._probe_task: asyncio.Task | None = None
+
+    async def start(self, health_settings: MPCHealthSettings) -> None:
+        self.enabled = health_settings.MPC_HEALTH_ENABLED
+        self.failure_threshold = health_settings.MPC_BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = health_settings.MPC_BREAKER_RESET_TIMEOUT
+        self.probe_interval = health_settings.MPC_HEALTH_PROBE_INTERVAL
+        self.probe_timeout = health_settings.MPC_HEALTH_PROBE_TIMEOUT
+        self.probe_path = health_settings.MPC_HEALTH_PROBE_PATH
+        self.standby_triplets = [
+            [url.strip() for url in triplet.split(",")]
+            for triplet in health_settings.MPC_STANDBY_NODE_URLS.split(";")
+            if triplet.strip()
+        ]
+        for triplet in self.standby_triplets:
+            if len(triplet) != 3:
+                raise ValueError(f"MPC_STANDBY_NODE_URLS entries need exactly 3 node URLs, got {triplet}")
+            self.watch(*triplet)
+
+        # settings may have changed since the breakers were created
+        for breaker in self._breakers.values():
+            breaker.failure_threshold = self.failure_threshold
+            breaker.reset_timeout = self.reset_timeout
+
+        if self.enabled and self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    def watch(self, *urls: str) -> None:
+        """Probe these URLs for as long as the process runs, even before any request uses them."""
+        for url in urls:
+            self._watched.add(self.breaker(url).url)
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        key = origin(url)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, self.failure_threshold, self.reset_timeout)
+            self._breakers[key] = breaker
+        return breaker
+
+    # -------------- requests --------------
+    def available(self, url: str) -> bool:
+        return not self.enabled or self.breaker(url).available()
+
+    def check(self, url: str) -> None:
+        """Raise ``NodeUnavailableError`` instead of sending a request to a node whose circuit is open."""
+        if not self.enabled:
+            return
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise NodeUnavailableError(breaker.describe())
+
+    def record_success(self, url: str) -> None:
+        if self.enabled:
+            self.breaker(url).record_success()
+
+    def record_failure(self, url: str, error: Any) -> None:
+        if self.enabled:
+            self.breaker(url).record_failure(error)
+
+    def record_response(self, url: str, status_code: int) -> None:
+        if status_code in UNAVAILABLE_STATUSES:
+            self.record_failure(url, f"HTTP {status_code}")
+        else:
+            self.record_success(url)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request on the pooled client for ``url``, guarded by and reported to its breaker.
+
+        The current trace context is added to the headers, so the relay and nodes can log against it.
+        """
+        self.check(url)
+        kwargs["headers"] = inject_headers(kwargs.get("headers"))
+        try:
+            response = await http_clients.get(url).request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            self.record_failure(url, e)
+            raise
+        self.record_response(url, response.status_code)
+        return response
+
+    def route(self, node_urls: list[str], failover: bool = False) -> list[str]:
+        """Return the node triplet to query: ``node_urls`` while all of them are available, otherwise
+        (with ``failover``) the first fully available standby triplet. Raises ``NodeUnavailableError``
+        when there is none, since a computation cannot complete without all of its parties.
+        """
+        if not self.enabled:
+            return node_urls
+
+        unavailable = [url for url in node_urls if not self.breaker(url).available()]
+        if not unavailable:
+            return node_urls
+
+        if failover:
+            for triplet in self.standby_triplets:
+                if all(self.breaker(url).available() for url in triplet):
+                    self.failovers += 1
+                    logger.warning(f"Failing over from {node_urls} to standby MPC nodes {triplet}")
+                    return triplet
+
+        raise NodeUnavailableError("; ".join(self.breaker(url).describe() for url in unavailable))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "failovers": self.failovers,
+            "standby_triplets": self.standby_triplets,
+            "nodes": [breaker.snapshot() for breaker in self._breakers.values()],
+        }
+
+    # -------------- probes --------------
+    async def probe(self, url: str) -> None:
+        try:
+            response = await http_clients.get(url).get(f"{url}{self.probe_path}", timeout=self.probe_timeout)
+        except httpx.HTTPError as e:
+            self.record_failure(url, e)
+            return
+        self.record_response(url, response.status_code)
+
+    async def _probe_loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            idle = [
+                url
+                for url, breaker in self._breakers.items()
+                if url not in self._watched and now - breaker.last_used >= IDLE_AFTER
+            ]
+            for url in idle:
+                del self._breakers[url]
+            await asyncio.gather(*(self.probe(url) for url in list(self._breakers)), return_exceptions=True)
+            await asyncio.sleep(self.probe_interval)
+
+
+node_health = NodeHealthRegistry()
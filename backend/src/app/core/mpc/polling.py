@@ -0,0 +1,240 @@
+import asyncio
+import copy
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from ..metrics import node_errors_total, poll_attempts_total, poll_timeouts_total
+from ..tracing import SpanKind, tracer
+from .cancellation import task_canceller
+from .clients import origin
+from .completion import completions
+from .health import node_health
+
+
+@dataclass(frozen=True)
+class PollStrategy:
+    """Backoff schedule for polling MPC node tasks (all values in seconds).
+
+    The first probe happens after ``first_probe``, or after ``prior_fraction``
+    of the typical completion time when one is known for the query. Later
+    attempts back off exponentially from ``base_delay`` up to ``max_delay``,
+    with +/- ``jitter`` (a fraction of the delay) so concurrent pollers spread out.
+    Polling gives up once ``timeout`` has elapsed.
+    """
+
+    first_probe: float = 0.25
+    base_delay: float = 0.5
+    multiplier: float = 1.5
+    max_delay: float = 5.0
+    jitter: float = 0.2
+    timeout: float = 120.0
+    prior_fraction: float = 0.8
+
+    def initial_delay(self, prior: float | None = None) -> float:
+        if prior is None:
+            return self.first_probe
+        return min(max(self.first_probe, prior * self.prior_fraction), self.timeout / 2)
+
+    def delays(self, prior: float | None = None) -> Iterator[float]:
+        yield self.initial_delay(prior)
+        delay = self.base_delay
+        while True:
+            spread = delay * self.jitter
+            yield max(0.0, delay + random.uniform(-spread, spread))
+            delay = min(self.max_delay, delay * self.multiplier)
+
+
+DEFAULT_POLL_STRATEGY = PollStrategy()
+
+# nodes are expected to call back; polling only catches nodes that don't
+CALLBACK_FALLBACK_POLL_STRATEGY = PollStrategy(first_probe=2.0, base_delay=2.0, max_delay=10.0)
+
+
+class LatencyPriors:
+    """Exponentially weighted moving average of node-reported ``time_taken`` per ``query_str``."""
+
+    def __init__(self, alpha: float = 0.3) -> None:
+        self.alpha = alpha
+        self._estimates: dict[str, float] = {}
+
+    def get(self, query_str: str | None) -> float | None:
+        if query_str is None:
+            return None
+        return self._estimates.get(query_str)
+
+    def observe(self, query_str: str | None, time_taken: Any) -> None:
+        try:
+            seconds = float(time_taken)
+        except (TypeError, ValueError):
+            return
+        if query_str is None or seconds < 0:
+            return
+
+        previous = self._estimates.get(query_str)
+        self._estimates[query_str] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def snapshot(self) -> dict[str, float]:
+        return dict(self._estimates)
+
+
+latency_priors = LatencyPriors()
+
+
+async def fetch_task_status(task: dict[str, Any]) -> dict[str, Any]:
+    poll_attempts_total.inc(node=origin(task["url"]))
+    with tracer.span(
+        "mpc.node.poll", SpanKind.CLIENT, node=task.get("node"), url=task["url"], task_id=task["task_id"]
+    ) as span:
+        response = await node_health.request("GET", f"{task['url']}/node/query/{task['task_id']}", timeout=10.0)
+        status: dict[str, Any] = response.json()
+        span.set_attribute("task_status", status.get("status", "unknown"))
+        if status.get("error"):
+            span.record_error(status["error"])
+        return status
+
+
+def _apply_status(node_status: dict[str, Any], result: Any) -> bool:
+    """Update ``node_status`` from a poll response, returning True once the node has succeeded."""
+    if isinstance(result, BaseException):
+        node_status["status"] = "error"
+        node_status["error"] = str(result)
+        return False
+
+    if result.get("status") == "success" and result.get("error") is None:
+        node_status["status"] = "success"
+        node_status["time_taken"] = result.get("time_taken")
+        node_status.pop("error", None)
+        return True
+
+    if result.get("error"):
+        node_status["status"] = "error"
+        node_status["error"] = result.get("error")
+    else:
+        node_status["status"] = result.get("status", "pending")
+    return False
+
+
+def _record_latency(query_str: str | None, node_statuses: list[dict[str, Any]]) -> None:
+    # the query is only as fast as its slowest party
+    times = []
+    for node_status in node_statuses:
+        try:
+            times.append(float(node_status["time_taken"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    if times:
+        latency_priors.observe(query_str, max(times))
+
+
+async def poll_tasks(
+    task_ids: list[dict[str, Any]],
+    query_str: str | None = None,
+    strategy: PollStrategy | None = None,
+    callback_id: str | None = None,
+    on_update: Callable[[list[dict[str, Any]]], Awaitable[None]] | None = None,
+) -> dict[str, Any]:
+    """Wait for the MPC node tasks of one query to complete.
+
+    With a ``callback_id``, results pushed by the nodes to the callback endpoint
+    are picked up as soon as they arrive, and polling only continues (on the
+    slower ``CALLBACK_FALLBACK_POLL_STRATEGY``) for nodes that don't call back.
+
+    Nodes that already returned success are not polled again, and polling stops
+    with an error as soon as a pending node's circuit opens. Returns a dict with
+    ``success``, the per-node ``node_statuses`` and, on success, the node
+    ``results`` in node order. ``timeout`` is True when ``strategy.timeout`` ran
+    out. A task that was never dispatched cannot complete, so that case fails
+    immediately with ``error`` set.
+
+    Whenever polling ends without every result (including when the caller is
+    cancelled), the tasks still running are handed to ``task_canceller``.
+    """
+    if strategy is None:
+        strategy = CALLBACK_FALLBACK_POLL_STRATEGY if callback_id else DEFAULT_POLL_STRATEGY
+
+    node_statuses = [{"node": task.get("node"), "status": "pending"} for task in task_ids]
+    for task, node_status in zip(task_ids, node_statuses):
+        if task.get("status") != "success":
+            node_status["status"] = "error"
+            node_status["error"] = task.get("error", "Task failed")
+
+    failed = [s for s in node_statuses if s["status"] == "error"]
+    if not task_ids or failed:
+        # the other parties can't finish the computation without it
+        task_canceller.cancel_soon([task for task in task_ids if task.get("status") == "success"])
+        error = "; ".join(f"node {s['node']}: {s['error']}" for s in failed) or "No tasks to poll"
+        return {"success": False, "timeout": False, "node_statuses": node_statuses, "error": error}
+
+    results: dict[int, Any] = {}
+    pending = list(range(len(task_ids)))
+
+    async def apply(responses: list[Any], indexes: list[int]) -> None:
+        nonlocal pending
+        before = copy.deepcopy(node_statuses)
+        done = set()
+        for i, response in zip(indexes, responses):
+            if _apply_status(node_statuses[i], response):
+                results[i] = response.get("result")
+                done.add(i)
+            elif node_statuses[i]["status"] == "error":
+                node_errors_total.inc(node=origin(task_ids[i]["url"]), stage="poll")
+        pending = [i for i in pending if i not in done]
+        if on_update is not None and node_statuses != before:
+            await on_update(copy.deepcopy(node_statuses))
+
+    delays = strategy.delays(latency_priors.get(query_str))
+    deadline = time.monotonic() + strategy.timeout
+    next_poll = time.monotonic() + next(delays)
+
+    try:
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            # a party whose node went down can't finish the computation: stop waiting for it
+            down = [i for i in pending if not node_health.available(task_ids[i]["url"])]
+            if down:
+                for i in down:
+                    node_statuses[i]["status"] = "error"
+                    node_statuses[i]["error"] = node_health.breaker(task_ids[i]["url"]).describe()
+                if on_update is not None:
+                    await on_update(copy.deepcopy(node_statuses))
+                error = "; ".join(f"node {node_statuses[i]['node']}: {node_statuses[i]['error']}" for i in down)
+                return {"success": False, "timeout": False, "node_statuses": node_statuses, "error": error}
+
+            if callback_id:
+                await completions.wait(callback_id, min(next_poll, deadline) - now)
+                pushed = await completions.updates(callback_id)
+                indexes = [i for i in pending if str(task_ids[i]["task_id"]) in pushed]
+                await apply([pushed[str(task_ids[i]["task_id"])] for i in indexes], indexes)
+                if not pending or time.monotonic() < next_poll:
+                    continue
+            else:
+                await asyncio.sleep(max(0.0, min(next_poll, deadline) - now))
+
+            polled = list(pending)
+            responses = await asyncio.gather(*(fetch_task_status(task_ids[i]) for i in polled), return_exceptions=True)
+            await apply(list(responses), polled)
+            next_poll = time.monotonic() + next(delays)
+    finally:
+        if callback_id:
+            completions.close(callback_id)
+        # timed out, a party failed, or nobody is waiting any more: stop the nodes' work
+        task_canceller.cancel_soon([task_ids[i] for i in pending])
+
+    if pending:
+        for i in pending:
+            poll_timeouts_total.inc(node=origin(task_ids[i]["url"]))
+        return {"success": False, "timeout": True, "node_statuses": node_statuses, "error": "Polling timeout"}
+
+    _record_latency(query_str, node_statuses)
+    return {
+        "success": True,
+        "timeout": False,
+        "node_statuses": node_statuses,
+        "results": [results[i] for i in range(len(task_ids))],
+    }
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any
+
+from ..config import MPCRelayPoolSettings
+from ..metrics import relay_pool_expired_total, relay_pool_hits_total, relay_pool_misses_total, relay_pool_size
+from ..tracing import current_span, tracer
+from .clients import origin
+from .dispatch import request_relay_id
+from .health import node_health
+
+logger = logging.getLogger(__name__)
+
+# pools of relay servers that are not watched are dropped after this long without a request
+IDLE_AFTER = 600.0
+
+
+class RelayIdPool:
+    """Relay IDs allocated ahead of time, per relay server, so queries don't wait on the relay.
+
+    ``acquire`` hands out the oldest prefetched ID (each ID is used once) and only falls
+    back to allocating one on the request path, counted in ``mpc_relay_pool_misses_total``,
+    when the pool is empty. A pool that drops below ``MPC_RELAY_POOL_LOW_WATER`` is refilled
+    to ``MPC_RELAY_POOL_SIZE`` in the background straight away; a maintenance pass every
+    ``MPC_RELAY_POOL_MAINTENANCE_INTERVAL`` discards IDs older than ``MPC_RELAY_POOL_ID_TTL``
+    and tops up every pool.
+
+    While the relay's circuit is open its pool is emptied, since a relay that restarted
+    has forgotten the IDs it handed out. Pools are per worker process.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.size = 32
+        self.low_water = 16
+        self.id_ttl = 300.0
+        self.refill_concurrency = 4
+        self.maintenance_interval = 10.0
+        # per relay server: (allocated_at, relay_id), oldest first
+        self._pools: dict[str, deque[tuple[float, str]]] = {}
+        self._last_used: dict[str, float] = {}
+        self._watched: set[str] = set()
+        self._refills: dict[str, asyncio.Task] = {}
+        self._maintenance_task: asyncio.Task | None = None
+
+    async def start(self, relay_pool_settings: MPCRelayPoolSettings) -> None:
+        self.enabled = relay_pool_settings.MPC_RELAY_POOL_ENABLED
+        self.size = relay_pool_settings.MPC_RELAY_POOL_SIZE
+        self.low_water = relay_pool_settings.MPC_RELAY_POOL_LOW_WATER
+        self.id_ttl = relay_pool_settings.MPC_RELAY_POOL_ID_TTL
+        self.refill_concurrency = relay_pool_settings.MPC_RELAY_POOL_REFILL_CONCURRENCY
+        self.maintenance_interval = relay_pool_settings.MPC_RELAY_POOL_MAINTENANCE_INTERVAL
+        if self.low_water > self.size:
+            raise ValueError(
+                f"MPC_RELAY_POOL_LOW_WATER ({self.low_water}) must not exceed MPC_RELAY_POOL_SIZE ({self.size})"
+            )
+
+        if self.enabled:
+            for key in self._watched:
+                self._schedule_refill(key)
+            if self._maintenance_task is None:
+                self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self) -> None:
+        tasks = [task for task in [self._maintenance_task, *self._refills.values()] if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._maintenance_task = None
+        self._refills.clear()
+        self._pools.clear()
+
+    def watch(self, *relay_servers: str) -> None:
+        """Keep a pool for these relay servers from startup, even before any query uses them."""
+        for relay_server in relay_servers:
+            key = relay_server.rstrip("/")
+            self._watched.add(key)
+            self._pools.setdefault(key, deque())
+
+    async def acquire(self, relay_server: str) -> str:
+        """Return an unused relay ID on ``relay_server``, allocating one now only when none is prefetched.
+
+        Raises like ``request_relay_id`` when it has to allocate and the relay fails.
+        """
+        if not self.enabled:
+            return await request_relay_id(relay_server)
+
+        key = relay_server.rstrip("/")
+        self._last_used[key] = time.monotonic()
+        pool = self._pools.setdefault(key, deque())
+
+        relay_id = None
+        if node_health.available(key):
+            self._expire(key)
+            if pool:
+                relay_id = pool.popleft()[1]
+        elif pool:
+            # the relay may have restarted and forgotten them
+            pool.clear()
+        relay_pool_size.set(len(pool), relay=origin(key))
+
+        if len(pool) < self.low_water:
+            self._schedule_refill(key)
+
+        if relay_id is not None:
+            relay_pool_hits_total.inc(relay=origin(key))
+            return relay_id
+        relay_pool_misses_total.inc(relay=origin(key))
+        return await request_relay_id(key)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "low_water": self.low_water,
+            "pools": {key: len(pool) for key, pool in self._pools.items()},
+        }
+
+    # -------------- refills --------------
+    def _expire(self, key: str) -> None:
+        if not self.id_ttl:
+            return
+        pool = self._pools[key]
+        cutoff = time.monotonic() - self.id_ttl
+        expired = 0
+        while pool and pool[0][0] <= cutoff:
+            pool.popleft()
+            expired += 1
+        if expired:
+            relay_pool_expired_total.inc(expired, relay=origin(key))
+
+    def _schedule_refill(self, key: str) -> None:
+        task = self._refills.get(key)
+        if (task is None or task.done()) and node_health.available(key):
+            self._refills[key] = asyncio.create_task(self._refill(key))
+
+    async def _refill(self, key: str) -> None:
+        pool = self._pools.setdefault(key, deque())
+        # prefetching belongs to no request, even when one triggered it: give it a trace of its own
+        current_span.set(None)
+        with tracer.span("relay.pool.refill", relay=key) as span:
+            added = 0
+            while node_health.available(key) and len(pool) < self.size:
+                batch = min(self.size - len(pool), self.refill_concurrency)
+                results = await asyncio.gather(*(request_relay_id(key) for _ in range(batch)), return_exceptions=True)
+                allocated_at = time.monotonic()
+                allocated = [result for result in results if isinstance(result, str)]
+                pool.extend((allocated_at, relay_id) for relay_id in allocated)
+                added += len(allocated)
+                relay_pool_size.set(len(pool), relay=origin(key))
+                if len(allocated) < batch:
+                    error = next(result for result in results if not isinstance(result, str))
+                    span.record_error(error)
+                    logger.warning(f"Could not prefetch relay IDs from {key}: {error}")
+                    break
+            span.set_attribute("added", added)
+
+    async def _maintenance_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            now = time.monotonic()
+            for key in list(self._pools):
+                if key not in self._watched and now - self._last_used.get(key, now) >= IDLE_AFTER:
+                    del self._pools[key]
+                    self._last_used.pop(key, None)
+                    relay_pool_size.set(0, relay=origin(key))
+                    continue
+                self._expire(key)
+                relay_pool_size.set(len(self._pools[key]), relay=origin(key))
+                if len(self._pools[key]) < self.size:
+                    self._schedule_refill(key)
+
+
+relay_ids = RelayIdPool()
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi import HTTPException
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError, RedisError
+
+from ..config import MPCSingleFlightSettings
+from ..exceptions.mpc_exceptions import NodeUnavailableError, RelayError, SingleFlightError
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "mpc-singleflight:"
+# how long a finished result stays readable for followers that subscribed too late to see it published
+RESULT_TTL = 30
+# a leader's failure of one of these types is raised as the same type on followers in other workers
+SHARED_ERRORS: dict[str, type[Exception]] = {
+    cls.__name__: cls for cls in (NodeUnavailableError, RelayError, SingleFlightError)
+}
+
+
+def error_outcome(e: Exception) -> dict[str, Any]:
+    """The outcome a failed leader publishes: enough to raise an equivalent error on its followers."""
+    if isinstance(e, HTTPException):
+        return {"error": e.detail, "error_type": "HTTPException", "status_code": e.status_code}
+    return {"error": str(e), "error_type": type(e).__name__}
+
+
+def load_outcome(data: bytes | str) -> dict[str, Any]:
+    outcome: dict[str, Any] = json.loads(data)
+    return outcome
+
+
+def raise_outcome_error(outcome: dict[str, Any]) -> None:
+    """Raise the leader's failure from ``outcome``, as ``SingleFlightError`` if its type isn't shared."""
+    if "status_code" in outcome:
+        raise HTTPException(status_code=outcome["status_code"], detail=outcome["error"])
+    raise SHARED_ERRORS.get(outcome.get("error_type", ""), SingleFlightError)(outcome["error"])
+
+
+class SingleFlight:
+    """Coalesces identical MPC computations that are in flight at the same time.
+
+    The first caller for a key runs the computation; concurrent callers with the same key
+    wait for it and get the same result (or the same error). Within a worker this is a
+    shared future.
+
+    When ``MPC_SINGLEFLIGHT_REDIS_URL`` is set, the worker running a key also holds a
+    Redis lock for it, refreshed while the computation runs. Callers on other workers
+    that fail to take the lock subscribe to the key's result channel instead. If the
+    lock disappears without a result (the leader was cancelled or died), a waiter
+    takes over and runs the computation itself.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock_ttl = 30
+        self.leaders = 0
+        self.followers = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._redis: Redis | None = None
+
+    async def start(self, singleflight_settings: MPCSingleFlightSettings) -> None:
+        self.enabled = singleflight_settings.MPC_SINGLEFLIGHT_ENABLED
+        self.lock_ttl = singleflight_settings.MPC_SINGLEFLIGHT_LOCK_TTL
+        if self.enabled and singleflight_settings.MPC_SINGLEFLIGHT_REDIS_URL:
+            self._redis = Redis.from_url(singleflight_settings.MPC_SINGLEFLIGHT_REDIS_URL)
+
+    async def stop(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], *parts: Any) -> tuple[Any, bool]:
+        """Run ``fn`` unless an identical computation (same ``parts``) is already in flight.
+
+        Returns the result and whether it was shared from another caller's computation.
+        """
+        if not self.enabled:
+            return await fn(), False
+
+        key = hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            try:
+                result = await asyncio.shield(future)
+                self.followers += 1
+                return result, True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # the caller running it went away: take over below
+
+        future = asyncio.get_running_loop().create_future()
+        # mark the outcome as retrieved so a failure nobody waited for is not reported as unhandled
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result, shared = await self._run_shared(key, fn)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, shared
+        finally:
+            self._inflight.pop(key, None)
+
+    # -------------- across workers --------------
+    async def _run_shared(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        if self._redis is None:
+            self.leaders += 1
+            return await fn(), False
+
+        lock = self._redis.lock(f"{KEY_PREFIX}lock:{key}", timeout=self.lock_ttl)
+        while True:
+            try:
+                acquired = await lock.acquire(blocking=False)
+                outcome = None if acquired else await self._follow(key)
+            except RedisError as e:
+                logger.warning(f"Single-flight coordination unavailable, running query locally: {e}")
+                self.leaders += 1
+                return await fn(), False
+
+            if acquired:
+                self.leaders += 1
+                return await self._lead(key, lock, fn), False
+            if outcome is not None:
+                self.followers += 1
+                if "error" in outcome:
+                    raise_outcome_error(outcome)
+                return outcome["result"], True
+
+    async def _lead(self, key: str, lock: Lock, fn: Callable[[], Awaitable[Any]]) -> Any:
+        assert self._redis is not None
+        try:
+            # a result left over from an earlier run of this key must not reach our followers
+            await self._redis.delete(f"{KEY_PREFIX}result:{key}")
+        except RedisError:
+            pass
+
+        keepalive = asyncio.create_task(self._keep_lock(lock))
+        try:
+            try:
+                result = await fn()
+            except Exception as e:
+                await self._publish(key, error_outcome(e))
+                raise
+            await self._publish(key, {"result": result})
+            return result
+        finally:
+            keepalive.cancel()
+            await asyncio.gather(keepalive, return_exceptions=True)
+            try:
+                await lock.release()
+            except (LockError, RedisError):
+                # expired or unreachable: it times out on its own
+                pass
+
+    async def _keep_lock(self, lock: Lock) -> None:
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            try:
+                await lock.reacquire()
+            except (LockError, RedisError) as e:
+                logger.warning(f"Could not refresh single-flight lock: {e}")
+
+    async def _publish(self, key: str, outcome: dict[str, Any]) -> None:
+        assert self._redis is not None
+        data = json.dumps(outcome, default=str)
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.set(f"{KEY_PREFIX}result:{key}", data, ex=RESULT_TTL)
+                pipe.publish(f"{KEY_PREFIX}done:{key}", data)
+                await pipe.execute()
+        except RedisError as e:
+            # followers notice the released lock and run the query themselves
+            logger.warning(f"Could not publish single-flight result: {e}")
+
+    async def _follow(self, key: str) -> dict[str, Any] | None:
+        """Wait for the lock holder's outcome. Returns None if it released the lock without one."""
+        assert self._redis is not None
+        result_key = f"{KEY_PREFIX}result:{key}"
+        lock_key = f"{KEY_PREFIX}lock:{key}"
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(f"{KEY_PREFIX}done:{key}")
+        try:
+            while True:
+                # subscribed first, so a result published from here on is not missed
+                stored = await self._redis.get(result_key)
+                if stored is not None:
+                    return load_outcome(stored)
+                if not await self._redis.exists(lock_key):
+                    stored = await self._redis.get(result_key)
+                    return load_outcome(stored) if stored is not None else None
+
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    return load_outcome(message["data"])
+        finally:
+            await pubsub.aclose()
+
+
+single_flight = SingleFlight()
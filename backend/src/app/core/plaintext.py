@@ -0,0 +1,213 @@
+"""Plaintext record layouts of the four data categories, as the MPC nodes parse them.
+
+A category's plaintext is its records back to back, each one fixed-width: strings are UTF-8
+padded with NULs to their width and numbers are 64-bit big-endian fixed point with
+``DECIMAL_PRECISION`` fractional bits. Each layout is declared once as a list of fields and
+compiled into a ``struct.Struct``; encoding packs every record straight into one preallocated
+buffer, and ``decode`` reads a buffer back into records. The same layout as a NumPy structured
+dtype encodes whole columns at once (``encode_columns``), byte for byte what ``encode`` makes
+of the equivalent records.
+"""
+
+import struct
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+FIELD_POWER = 64
+DECIMAL_PRECISION = 10
+FIXED_POINT_SCALE = 2**DECIMAL_PRECISION
+
+TEXT = "text"
+FIXED = "fixed"
+FLAG = "flag"
+
+
+@dataclass(frozen=True)
+class Field:
+    # key of the field in a record (the spreadsheet column)
+    name: str
+    kind: str
+    # bytes in the record; strings are NUL-padded to it
+    width: int = FIELD_POWER // 8
+    # FLAG: the value encoded as 1 (in fixed point, like every number), anything else is 0
+    true_value: str = "Yes"
+    false_value: str = "No"
+
+    @property
+    def format(self) -> str:
+        return f"{self.width}s" if self.kind == TEXT else "Q"
+
+    @property
+    def numpy_format(self) -> str:
+        return f"S{self.width}" if self.kind == TEXT else ">u8"
+
+
+def text(name: str, width: int) -> Field:
+    return Field(name, TEXT, width)
+
+
+def fixed(name: str) -> Field:
+    return Field(name, FIXED)
+
+
+def flag(name: str, true_value: str = "Yes", false_value: str = "No") -> Field:
+    return Field(name, FLAG, true_value=true_value, false_value=false_value)
+
+
+class RecordCodec:
+    """Encodes records of one category to its plaintext layout and decodes them back.
+
+    Records are mappings keyed by field name, as the frontend sends them; a missing field
+    encodes as an empty string or zero. A string longer than its width (in UTF-8 bytes) or a
+    number outside the unsigned fixed-point range raises ``ValueError`` rather than shifting
+    every record after it.
+    """
+
+    def __init__(self, category: str, fields: list[Field]) -> None:
+        self.category = category
+        self.fields = fields
+        self.struct = struct.Struct(">" + "".join(f.format for f in fields))
+        self.size = self.struct.size
+        self.dtype = np.dtype([(f.name, f.numpy_format) for f in fields])
+        self._converters = [(f.name, self._converter(f)) for f in fields]
+
+    def encode(self, records: Iterable[Mapping[str, Any]]) -> bytearray:
+        """The plaintext of ``records``: ``size`` bytes per record, in one allocation."""
+        records = records if isinstance(records, list) else list(records)
+        buffer = bytearray(self.size * len(records))
+        pack_into, size, converters = self.struct.pack_into, self.size, self._converters
+        for i, record in enumerate(records):
+            try:
+                pack_into(buffer, i * size, *[convert(record.get(name)) for name, convert in converters])
+            except (struct.error, ValueError, TypeError) as e:
+                raise ValueError(f"{self.category} record {i}: {e}") from e
+        return buffer
+
+    def encode_columns(self, columns: Mapping[str, Any], length: int) -> memoryview:
+        """The plaintext of ``length`` records given column-wise, in one structured array.
+
+        Each column is an array-like of ``length`` values, or a single value for all rows; a
+        missing one is empty strings or zeros. Numeric columns must already be numbers (no
+        NaN): the fixed-point scaling runs on the whole column as float64, as ``encode`` does
+        per value. Strings are still UTF-8 encoded one by one but padded as a column.
+        """
+        records = np.zeros(length, dtype=self.dtype)
+        for f in self.fields:
+            if f.name not in columns:
+                continue
+            values = columns[f.name]
+            if f.kind == TEXT:
+                records[f.name] = self._text_column(f, values, length)
+            elif f.kind == FLAG:
+                records[f.name] = np.where(np.asarray(values, dtype=object) == f.true_value, FIXED_POINT_SCALE, 0)
+            else:
+                records[f.name] = self._fixed_column(f, values)
+        return records.view(np.uint8).data
+
+    def _text_column(self, f: Field, values: Any, length: int) -> np.ndarray:
+        if values is None or isinstance(values, str):
+            values = [values]
+        encoded = [("" if value is None else str(value)).encode("utf-8") for value in values]
+        for i, value in enumerate(encoded):
+            if len(value) > f.width:
+                raise ValueError(f"{self.category} record {i}: {f.name} is {len(value)} bytes, at most {f.width} fit")
+        column = np.array(encoded, dtype=f"S{f.width}")
+        return np.broadcast_to(column, (length,)) if len(column) == 1 else column
+
+    def _fixed_column(self, f: Field, values: Any) -> np.ndarray:
+        try:
+            scaled = np.asarray(values, dtype=np.float64) * FIXED_POINT_SCALE
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{self.category}: {f.name} is not numeric: {e}") from None
+        # int() truncates toward zero, so (-1, 0) still encodes as 0
+        invalid = ~(np.isfinite(scaled) & (scaled > -1) & (scaled < 2.0**FIELD_POWER))
+        if invalid.any():
+            i = int(np.argmax(invalid)) if invalid.ndim else 0
+            raise ValueError(f"{self.category} record {i}: {f.name} is out of range or not a number")
+        column: np.ndarray = np.trunc(scaled).astype(">u8")
+        return column
+
+    def decode(self, data: bytes | bytearray | memoryview) -> list[dict[str, Any]]:
+        """Records from a plaintext: strings without their padding, numbers as floats."""
+        if len(data) % self.size:
+            raise ValueError(f"{self.category} plaintext of {len(data)} bytes is not a multiple of {self.size}")
+        records = []
+        for values in self.struct.iter_unpack(data):
+            record = {}
+            for f, value in zip(self.fields, values):
+                if f.kind == TEXT:
+                    record[f.name] = value.rstrip(b"\x00").decode("utf-8")
+                elif f.kind == FLAG:
+                    record[f.name] = f.true_value if value else f.false_value
+                else:
+                    record[f.name] = value / FIXED_POINT_SCALE
+            records.append(record)
+        return records
+
+    @staticmethod
+    def _converter(f: Field):
+        if f.kind == TEXT:
+            def convert_text(value):
+                encoded = ("" if value is None else str(value)).encode("utf-8")
+                if len(encoded) > f.width:
+                    raise ValueError(f"{f.name} is {len(encoded)} bytes, at most {f.width} fit")
+                return encoded
+            return convert_text
+        if f.kind == FLAG:
+            return lambda value: FIXED_POINT_SCALE if value == f.true_value else 0
+
+        def convert_fixed(value):
+            try:
+                number = int(float(0 if value is None else value) * FIXED_POINT_SCALE)
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"{f.name} is not a number: {value!r}") from None
+            if not 0 <= number < 1 << FIELD_POWER:
+                raise ValueError(f"{f.name} is out of range: {value!r}")
+            return number
+        return convert_fixed
+
+
+BANKING = RecordCodec("banking", [
+    text("Company Legal Name", 60),
+    fixed("Year"),
+    fixed("Month"),
+    text("Primary Bank", 20),
+    fixed("Monthly POS Transactions"),
+    fixed("Monthly POS Sales Amount"),
+    fixed("Monthly Digital Transactions"),
+    fixed("Monthly Digital Sales Amount"),
+    fixed("Monthly Utility Bill Paid"),
+    fixed("Monthly Bank Balance"),
+    fixed("Monthly EMI"),
+    fixed("Monthly Number of Bounced Cheques"),
+])
+
+FINANCIAL = RecordCodec("financial", [
+    text("Company Legal Name", 60),
+    fixed("Year"),
+    fixed("Annual Revenue"),
+    fixed("Net Profit"),
+    fixed("Total Liabilities"),
+    fixed("Total Debt"),
+    fixed("Shareholder Equity"),
+    fixed("Employees"),
+])
+
+TAX = RecordCodec("tax", [
+    text("Company Legal Name", 60),
+    fixed("Year"),
+    flag("Income tax Return Filed"),
+    text("Filing Status", 15),
+    text("GST/Tax Filing Status", 10),
+])
+
+CREDIT = RecordCodec("credit", [
+    text("Company Legal Name", 60),
+    fixed("Year"),
+    fixed("Loan Default Count"),
+])
+
+RECORD_CODECS = {codec.category: codec for codec in (BANKING, FINANCIAL, TAX, CREDIT)}
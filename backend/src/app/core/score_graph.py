@@ -0,0 +1,155 @@
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from .scorecard import Scorecard, format_breakdown
+
+
+@dataclass(frozen=True)
+class GraphNode:
+    name: str
+    # "query" (an MPC query), "metric" (a scored query or the EMI coverage ratio) or "category" (a subtotal)
+    kind: str
+    # names of the nodes this one is computed from
+    inputs: tuple[str, ...] = ()
+
+
+class ScoreGraph:
+    """The score as a dependency graph: MPC queries feed metric scores, which feed category subtotals.
+
+    Nodes are declared from the query list and the scorecard: one ``query`` node per MPC
+    query, one ``metric`` node per scored query plus the EMI coverage ratio (fed by its four
+    banking queries), and one ``category`` node per scorecard category, fed by the queries and
+    metrics mapped to it. ``dispatch_order`` ranks the queries so the derived nodes complete
+    as early as possible, and a ``ScoreGraphRun`` computes each derived node the moment its
+    last input arrives. Values are computed by the same ``Scorecard`` as the final score, so
+    they equal its breakdown.
+    """
+
+    def __init__(self, queries: Mapping[str, Sequence[str]], card: Scorecard) -> None:
+        self.card = card
+        spec = card.spec
+        # query_str -> the category it is dispatched (and stored in raw_results) under
+        self.query_categories = {
+            query_str: category for category, query_strs in queries.items() for query_str in query_strs
+        }
+
+        nodes: list[GraphNode] = [GraphNode(query_str, "query") for query_str in self.query_categories]
+        emi_names = (spec.emi_denominator, *spec.emi_numerators)
+        emi_inputs = tuple(name for name in emi_names if name in self.query_categories)
+        nodes.append(GraphNode(spec.emi_weight_key, "metric", emi_inputs))
+        for query_str in self.query_categories:
+            if query_str in card.category_mapping and query_str not in card.emi_inputs:
+                nodes.append(GraphNode(f"metric:{query_str}", "metric", (query_str,)))
+        for category in spec.categories:
+            inputs = [f"metric:{query_str}" for query_str, mapped in card.category_mapping.items()
+                      if mapped == category and query_str in self.query_categories and query_str not in card.emi_inputs]
+            if category == spec.emi_category:
+                inputs.insert(0, spec.emi_weight_key)
+            nodes.append(GraphNode(f"category:{category}", "category", tuple(inputs)))
+
+        self.nodes = {node.name: node for node in nodes}
+        # derived nodes in declaration order, which is also a topological order
+        self.derived = [node for node in nodes if node.kind != "query"]
+        self.base_inputs = {node.name: self._base_inputs(node.name) for node in self.derived}
+        self.dependents: dict[str, list[GraphNode]] = {name: [] for name in self.query_categories}
+        for node in self.derived:
+            for query_str in self.base_inputs[node.name]:
+                self.dependents[query_str].append(node)
+
+    def _base_inputs(self, name: str) -> tuple[str, ...]:
+        node = self.nodes[name]
+        if node.kind == "query":
+            return (name,)
+        seen: dict[str, None] = {}
+        for input_name in node.inputs:
+            seen.update(dict.fromkeys(self._base_inputs(input_name)))
+        return tuple(seen)
+
+    def dispatch_order(self) -> list[str]:
+        """Every query, ranked so derived nodes finish early: repeatedly the subtotals and the EMI
+        coverage ratio with the fewest queries still to dispatch go first (ties in declaration order),
+        then queries nothing derives from.
+        """
+        order: dict[str, None] = {}
+        emi_weight_key = self.card.spec.emi_weight_key
+        targets = [node for node in self.derived if node.kind == "category" or node.name == emi_weight_key]
+        while targets:
+            target = min(targets, key=lambda node: sum(1 for q in self.base_inputs[node.name] if q not in order))
+            order.update(dict.fromkeys(self.base_inputs[target.name]))
+            targets.remove(target)
+        order.update(dict.fromkeys(self.query_categories))
+        return list(order)
+
+    def describe(self) -> list[dict[str, Any]]:
+        return [{"name": node.name, "kind": node.kind, "inputs": list(node.inputs)} for node in self.nodes.values()]
+
+    def run(self) -> "ScoreGraphRun":
+        return ScoreGraphRun(self)
+
+
+class ScoreGraphRun:
+    """One score's progress through a ``ScoreGraph``: feed it query results as they arrive."""
+
+    def __init__(self, graph: ScoreGraph) -> None:
+        self.graph = graph
+        # query_str -> data as stored in raw_results ({"error": ...} for a failed query)
+        self.results: dict[str, Any] = {}
+        self.done: set[str] = set()
+
+    def add(self, query_str: str, data: Any) -> list[tuple[str, dict[str, Any]]]:
+        """Record a query's result; returns the ``(event, data)`` of every node it completed,
+        ``metric_ready`` for metrics and ``category_subtotal`` for categories, in dependency order.
+        """
+        if query_str not in self.graph.query_categories:
+            return []
+        self.results[query_str] = data
+        ready = [
+            node for node in self.graph.dependents[query_str]
+            if node.name not in self.done and all(q in self.results for q in self.graph.base_inputs[node.name])
+        ]
+        events = []
+        for node in ready:
+            self.done.add(node.name)
+            events.append(self._compute(node))
+        return events
+
+    def _raw_results(self, query_strs: Sequence[str]) -> dict[str, dict[str, Any]]:
+        # nested and ordered like generate-score's raw_results, so scorecard sums add up identically
+        raw: dict[str, dict[str, Any]] = {}
+        wanted = set(query_strs)
+        for query_str, category in self.graph.query_categories.items():
+            if query_str in wanted:
+                raw.setdefault(category, {})[query_str] = self.results[query_str]
+        return raw
+
+    def _compute(self, node: GraphNode) -> tuple[str, dict[str, Any]]:
+        card = self.graph.card
+        spec = card.spec
+        score_result = card.score(self._raw_results(self.graph.base_inputs[node.name]))
+        breakdown = score_result["category_breakdown"]
+
+        if node.kind == "category":
+            category = node.name.removeprefix("category:")
+            subtotal = format_breakdown({"category_breakdown": {category: breakdown[category]}})[0]
+            return "category_subtotal", subtotal
+
+        if node.name == spec.emi_weight_key:
+            detail = next(d for d in breakdown[spec.emi_category]["details"] if d["metric"] == spec.emi_label)
+            category = spec.emi_category
+        else:
+            metric = node.name.removeprefix("metric:")
+            category = card.category_mapping[metric]
+            detail = next((d for d in breakdown[category]["details"] if d["metric"] == metric), None)
+            if detail is None:
+                # failed or empty query: it contributes nothing to the score
+                weight = card.weights.get(metric, 0.0)
+                detail = {"metric": metric, "value": None, "score": 0.0, "weight": weight, "product": 0.0}
+        return "metric_ready", {
+            "metric": detail["metric"],
+            "category": category,
+            "value": detail["value"],
+            "score": detail["score"],
+            "weight": detail["weight"],
+            "product": round(detail["product"], 2),
+        }
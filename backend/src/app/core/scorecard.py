@@ -0,0 +1,446 @@
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, replace
+from typing import Any, TypedDict
+
+import numpy as np
+
+
+# -------------- rules --------------
+@dataclass(frozen=True)
+class LadderRule:
+    """Numeric score by band: ``scores[i]`` applies below ``thresholds[i]``, ``scores[-1]`` from the last one up."""
+
+    thresholds: tuple[float, ...]
+    scores: tuple[float, ...]
+
+    def __post_init__(self) -> None:
+        if len(self.scores) != len(self.thresholds) + 1:
+            raise ValueError("A ladder needs exactly one more score than thresholds")
+        if list(self.thresholds) != sorted(self.thresholds):
+            raise ValueError("Ladder thresholds must be ascending")
+
+
+@dataclass(frozen=True)
+class ExactRule:
+    """Numeric score by exact value, ``default`` for anything else (counts such as bounced cheques)."""
+
+    values: tuple[float, ...]
+    scores: tuple[float, ...]
+    default: float = 0.0
+
+
+@dataclass(frozen=True)
+class TextRule:
+    """Score of a non-numeric value: the first pattern contained in the lowercased value wins."""
+
+    patterns: tuple[tuple[str, float], ...]
+    default: float = 0.0
+
+
+@dataclass(frozen=True)
+class Tier:
+    min_score: float
+    tier: str
+    interpretation: str
+    recommendation: str
+
+
+@dataclass(frozen=True)
+class ScorecardSpec:
+    """Everything the score depends on; compiled once into a ``Scorecard``."""
+
+    numeric_rules: Mapping[str, LadderRule | ExactRule]
+    text_rules: Mapping[str, TextRule]
+    weights: Mapping[str, float]
+    # category name -> category weight, in breakdown order
+    categories: Mapping[str, float]
+    category_mapping: Mapping[str, str]
+    emi_rule: LadderRule
+    # highest cutoff first; the last tier applies to every lower score
+    tiers: Sequence[Tier]
+    emi_category: str = "Liquidity & Repayment"
+    emi_numerators: tuple[str, ...] = ("AnnualDigitalSalesAmt", "AnnualDigitalTxn", "AnnualPOSSalesAmt")
+    emi_denominator: str = "AnnualEmi"
+    emi_weight_key: str = "EMICoverageRatio"
+    emi_label: str = "EMI Coverage Ratio"
+
+    def override(
+        self,
+        *,
+        weights: Mapping[str, float] | None = None,
+        thresholds: Mapping[str, Sequence[float]] | None = None,
+        tier_cutoffs: Mapping[str, float] | None = None,
+    ) -> "ScorecardSpec":
+        """Copy of this spec with some metric weights, ladder thresholds or tier cut-offs replaced.
+
+        ``thresholds`` keeps each ladder's band scores, so it needs as many values as the ladder
+        has; ``emi_weight_key`` addresses the EMI coverage ladder. Category weights are recomputed
+        from the metric weights when those change. Raises ``ValueError`` for unknown metrics or
+        tiers and for inconsistent values.
+        """
+        spec = self
+        if weights:
+            unknown = set(weights) - set(self.weights)
+            if unknown:
+                raise ValueError(f"Unknown metrics in weights: {', '.join(sorted(unknown))}")
+            if any(weight < 0 for weight in weights.values()):
+                raise ValueError("Weights must not be negative")
+            new_weights = {**self.weights, **weights}
+            categories = dict.fromkeys(self.categories, 0.0)
+            for metric, category in self.category_mapping.items():
+                categories[category] += new_weights.get(metric, 0.0)
+            categories[self.emi_category] += new_weights.get(self.emi_weight_key, 0.0)
+            spec = replace(spec, weights=new_weights, categories=categories)
+
+        if thresholds:
+            numeric_rules = dict(spec.numeric_rules)
+            emi_rule = spec.emi_rule
+            for metric, values in thresholds.items():
+                rule = emi_rule if metric == self.emi_weight_key else numeric_rules.get(metric)
+                if not isinstance(rule, LadderRule):
+                    raise ValueError(f"{metric} has no thresholds to override")
+                if len(values) != len(rule.thresholds):
+                    raise ValueError(f"{metric} needs exactly {len(rule.thresholds)} thresholds")
+                ladder = LadderRule(tuple(float(value) for value in values), rule.scores)
+                if metric == self.emi_weight_key:
+                    emi_rule = ladder
+                else:
+                    numeric_rules[metric] = ladder
+            spec = replace(spec, numeric_rules=numeric_rules, emi_rule=emi_rule)
+
+        if tier_cutoffs:
+            # the last tier catches every lower score, so it has no cut-off of its own
+            adjustable = {tier.tier for tier in self.tiers[:-1]}
+            unknown = set(tier_cutoffs) - adjustable
+            if unknown:
+                raise ValueError(f"Tiers without an adjustable cut-off: {', '.join(sorted(unknown))}")
+            tiers = [replace(tier, min_score=float(tier_cutoffs.get(tier.tier, tier.min_score))) for tier in self.tiers]
+            cutoffs = [tier.min_score for tier in tiers]
+            if cutoffs != sorted(cutoffs, reverse=True):
+                raise ValueError("Tier cut-offs must decrease from the best tier to the worst")
+            spec = replace(spec, tiers=tuple(tiers))
+
+        return spec
+
+    def describe(self) -> dict[str, Any]:
+        """The overridable parts of the spec, in the shape ``override`` accepts."""
+        thresholds = {
+            metric: list(rule.thresholds) for metric, rule in self.numeric_rules.items() if isinstance(rule, LadderRule)
+        }
+        thresholds[self.emi_weight_key] = list(self.emi_rule.thresholds)
+        return {
+            "weights": dict(self.weights),
+            "thresholds": thresholds,
+            "tier_cutoffs": {tier.tier: tier.min_score for tier in self.tiers[:-1]},
+            "categories": dict(self.categories),
+        }
+
+
+_FIVE_BANDS = (0.0, 2.5, 5.0, 7.5, 10.0)
+_COUNT_RULE = ExactRule(values=(0.0, 1.0, 2.0), scores=(10.0, 7.5, 5.0))
+
+DEFAULT_SPEC = ScorecardSpec(
+    numeric_rules={
+        # Financial Health (values are already percentages: 12.62 means 12.62%)
+        "GetProfitMargin": LadderRule((0.0, 5.0, 10.0, 20.0), _FIVE_BANDS),
+        "GetDebtToEquity": LadderRule((0.5, 1.0, 1.5, 2.0), _FIVE_BANDS[::-1]),
+        "GetRevenueGrowthRate": LadderRule((2.5, 5.0, 10.0, 15.0), _FIVE_BANDS),
+        # Liquidity & Repayment
+        "AvgBankBalance": LadderRule((5000.0, 10000.0, 15000.0, 20000.0), _FIVE_BANDS),
+        "AnnualBouncedCheques": _COUNT_RULE,
+        # Compliance Behavior
+        "GetLoanDefaultCounts": _COUNT_RULE,
+        # Operational Size & Stability
+        "GetEmployeeCount": LadderRule((50.0, 100.0), (5.0, 7.5, 10.0)),
+        "AnnualUtilityBillPaid": LadderRule((20000.0, 35000.0, 45000.0, 55000.0), _FIVE_BANDS),
+        "AnnualPOSTnx": LadderRule((30000.0, 45000.0, 60000.0, 75000.0), _FIVE_BANDS),
+    },
+    text_rules={
+        "GetFilingStatus": TextRule((("filed on time", 10.0), ("filed late", 2.5), ("filed", 10.0))),
+        "GetITRFiled": TextRule((("filed on time", 10.0), ("filed late", 2.5), ("filed", 10.0))),
+        "GetGSTTaxFilingStatus": TextRule((("filed", 10.0),)),
+    },
+    weights={
+        "GetProfitMargin": 15.0,
+        "GetDebtToEquity": 10.0,
+        "GetRevenueGrowthRate": 10.0,
+        "AvgBankBalance": 10.0,
+        "EMICoverageRatio": 10.0,
+        "AnnualBouncedCheques": 5.0,
+        "GetFilingStatus": 10.0,
+        "GetGSTTaxFilingStatus": 5.0,
+        "GetLoanDefaultCounts": 5.0,
+        "GetEmployeeCount": 5.0,
+        "AnnualUtilityBillPaid": 5.0,
+        "AnnualPOSTnx": 10.0,
+    },
+    categories={
+        "Financial Health": 35.0,
+        "Liquidity & Repayment": 25.0,
+        "Compliance Behavior": 20.0,
+        "Operational Size & Stability": 20.0,
+    },
+    category_mapping={
+        "GetProfitMargin": "Financial Health",
+        "GetDebtToEquity": "Financial Health",
+        "GetRevenueGrowthRate": "Financial Health",
+        "AvgBankBalance": "Liquidity & Repayment",
+        "AnnualBouncedCheques": "Liquidity & Repayment",
+        "GetFilingStatus": "Compliance Behavior",
+        "GetITRFiled": "Compliance Behavior",
+        "GetGSTTaxFilingStatus": "Compliance Behavior",
+        "GetLoanDefaultCounts": "Compliance Behavior",
+        "GetEmployeeCount": "Operational Size & Stability",
+        "AnnualUtilityBillPaid": "Operational Size & Stability",
+        "AnnualPOSTnx": "Operational Size & Stability",
+    },
+    emi_rule=LadderRule((15.0, 25.0, 35.0, 45.0), _FIVE_BANDS),
+    tiers=(
+        Tier(75, "A", "Strong financials & low risk", "Eligible for full credit approval"),
+        Tier(60, "B", "Moderate strength; some flags", "Lending with collateral or limits"),
+        Tier(float("-inf"), "C", "High concerns or weak fundamentals", "Deprioritize or decline"),
+    ),
+)
+
+
+def _parse(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+# -------------- breakdown --------------
+class MetricScore(TypedDict):
+    metric: str
+    value: Any
+    score: float
+    weight: float
+    product: float
+
+
+class CategoryScore(TypedDict):
+    score: float
+    weight: float
+    details: list[MetricScore]
+
+
+# -------------- compiled scorecard --------------
+class Scorecard:
+    """A ``ScorecardSpec`` compiled into lookup tables.
+
+    ``score`` scores one company's ``raw_results`` (``{category: {query: data}}``);
+    ``score_batch`` scores many at once, running each metric's rule over all companies'
+    values with a single ``np.searchsorted``. Both give exactly what the original
+    per-metric ``if`` ladders gave: values are parsed with ``float()`` as before, bands
+    are right-closed (``value < threshold``), NaN falls through to the last band, and
+    category totals are accumulated in the same order.
+    """
+
+    def __init__(self, spec: ScorecardSpec = DEFAULT_SPEC) -> None:
+        self.spec = spec
+        self.weights = dict(spec.weights)
+        self.category_mapping = dict(spec.category_mapping)
+        self.text_rules = dict(spec.text_rules)
+        self.numeric_rules = dict(spec.numeric_rules)
+        self.emi_inputs = frozenset((*spec.emi_numerators, spec.emi_denominator))
+        self.emi_weight = self.weights.get(spec.emi_weight_key, 0.0)
+        self._ladders = {
+            metric: (np.asarray(rule.thresholds, dtype=np.float64), np.asarray(rule.scores, dtype=np.float64))
+            for metric, rule in self.numeric_rules.items()
+            if isinstance(rule, LadderRule)
+        }
+        self._emi_ladder = (
+            np.asarray(spec.emi_rule.thresholds, dtype=np.float64),
+            np.asarray(spec.emi_rule.scores, dtype=np.float64),
+        )
+
+    # -------------- single values --------------
+    def metric_score(self, metric: str, value: Any) -> float:
+        """Score of one metric value (0-10)."""
+        if value is None or value == "":
+            return 0.0
+
+        val = _parse(value)
+        if val is None:
+            return self._text_score(metric, value)
+
+        rule = self.numeric_rules.get(metric)
+        if isinstance(rule, LadderRule):
+            return rule.scores[bisect_right(rule.thresholds, val)]
+        if isinstance(rule, ExactRule):
+            for match, score in zip(rule.values, rule.scores):
+                if val == match:
+                    return score
+            return rule.default
+        return 0.0
+
+    def _text_score(self, metric: str, value: Any) -> float:
+        rule = self.text_rules.get(metric)
+        if rule is None:
+            return 0.0
+        text = str(value).lower()
+        for pattern, score in rule.patterns:
+            if pattern in text:
+                return score
+        return rule.default
+
+    def emi_coverage_ratio(self, all_results: Mapping[str, Mapping[str, Any]]) -> float:
+        """(digital sales + digital transactions + POS sales) / annual EMI, 0 when unavailable."""
+        try:
+            inputs = dict.fromkeys(self.emi_inputs, 0.0)
+            for query_name, data in all_results.get("banking", {}).items():
+                if query_name in inputs and isinstance(data, dict) and "error" not in data:
+                    for key, value in data.items():
+                        if key != "query" and value is not None:
+                            inputs[query_name] = float(value)
+
+            denominator = inputs[self.spec.emi_denominator]
+            if denominator > 0:
+                # summed left to right, like the original (a + b + c) / emi
+                first, *rest = self.spec.emi_numerators
+                numerator = inputs[first]
+                for name in rest:
+                    numerator = numerator + inputs[name]
+                return numerator / denominator
+            return 0.0
+        except Exception:
+            return 0.0
+
+    def emi_coverage_score(self, ratio: float) -> float:
+        return self.spec.emi_rule.scores[bisect_right(self.spec.emi_rule.thresholds, ratio)]
+
+    def tier(self, score: float) -> dict[str, str]:
+        for tier in self.spec.tiers:
+            if score >= tier.min_score:
+                break
+        return {"tier": tier.tier, "interpretation": tier.interpretation, "recommendation": tier.recommendation}
+
+    # -------------- whole companies --------------
+    def score(self, all_results: Mapping[str, Mapping[str, Any]]) -> dict[str, Any]:
+        """Weighted score of one company with its per-category breakdown."""
+        return self.score_batch([all_results])[0]
+
+    def score_batch(self, results: Sequence[Mapping[str, Mapping[str, Any]]]) -> list[dict[str, Any]]:
+        """Score many companies' ``raw_results`` in one pass; same output as ``score`` for each."""
+        # One row per scored metric value, in the order the breakdown lists them
+        row_company: list[int] = []
+        row_metric: list[str] = []
+        row_value: list[Any] = []
+        for index, all_results in enumerate(results):
+            for queries in all_results.values():
+                for query_name, data in queries.items():
+                    if query_name in self.emi_inputs or query_name not in self.category_mapping:
+                        continue
+                    if not isinstance(data, dict) or "error" in data:
+                        continue
+                    for key, value in data.items():
+                        if key != "query":
+                            row_company.append(index)
+                            row_metric.append(query_name)
+                            row_value.append(value)
+
+        row_scores = self._score_rows(row_metric, row_value)
+        row_weights = np.fromiter(
+            (self.weights.get(metric, 0.0) for metric in row_metric), dtype=np.float64, count=len(row_metric)
+        )
+        row_products = (row_scores / 10.0) * row_weights
+
+        ratios = np.fromiter(
+            (self.emi_coverage_ratio(all_results) for all_results in results), dtype=np.float64, count=len(results)
+        )
+        emi_scores = self._emi_ladder[1][np.searchsorted(self._emi_ladder[0], ratios, side="right")]
+        emi_products = (emi_scores / 10.0) * self.emi_weight
+
+        scored: list[tuple[dict[str, CategoryScore], float]] = []
+        for index in range(len(results)):
+            category_scores: dict[str, CategoryScore] = {
+                name: {"score": 0.0, "weight": weight, "details": []} for name, weight in self.spec.categories.items()
+            }
+            emi_category = category_scores[self.spec.emi_category]
+            emi_category["details"].append({
+                "metric": self.spec.emi_label,
+                "value": float(ratios[index]),
+                "score": float(emi_scores[index]),
+                "weight": self.emi_weight,
+                "product": float(emi_products[index]),
+            })
+            emi_category["score"] += float(emi_products[index])
+            scored.append((category_scores, float(ratios[index])))
+
+        # Accumulate in row order so category totals match the sequential single-company sums
+        for row, index in enumerate(row_company):
+            metric = row_metric[row]
+            category = scored[index][0][self.category_mapping[metric]]
+            product = float(row_products[row])
+            category["details"].append({
+                "metric": metric,
+                "value": row_value[row],
+                "score": float(row_scores[row]),
+                "weight": float(row_weights[row]),
+                "product": product,
+            })
+            category["score"] += product
+
+        return [
+            {
+                "total_score": round(sum(category["score"] for category in category_scores.values()), 2),
+                "category_breakdown": category_scores,
+                "emi_coverage_ratio": ratio,
+            }
+            for category_scores, ratio in scored
+        ]
+
+    def _score_rows(self, metrics: list[str], values: list[Any]) -> np.ndarray:
+        scores = np.zeros(len(values), dtype=np.float64)
+        numeric: dict[str, tuple[list[int], list[float]]] = {}
+        for row, (metric, value) in enumerate(zip(metrics, values)):
+            if value is None or value == "":
+                continue
+            val = _parse(value)
+            if val is None:
+                scores[row] = self._text_score(metric, value)
+            elif metric in self.numeric_rules:
+                rows, vals = numeric.setdefault(metric, ([], []))
+                rows.append(row)
+                vals.append(val)
+
+        for metric, (rows, vals) in numeric.items():
+            rule = self.numeric_rules[metric]
+            array = np.asarray(vals, dtype=np.float64)
+            if isinstance(rule, LadderRule):
+                thresholds, ladder_scores = self._ladders[metric]
+                scores[rows] = ladder_scores[np.searchsorted(thresholds, array, side="right")]
+            else:
+                metric_scores = np.full(len(array), rule.default, dtype=np.float64)
+                for match, score in zip(rule.values, rule.scores):
+                    metric_scores[array == match] = score
+                scores[rows] = metric_scores
+        return scores
+
+
+scorecard = Scorecard()
+
+
+def format_breakdown(score_result: Mapping[str, Any]) -> list[dict[str, Any]]:
+    """Format a ``category_breakdown`` for API responses."""
+    return [
+        {
+            "category": cat_name,
+            "weight": cat_data["weight"],
+            "score": round(cat_data["score"], 2),
+            "metrics": [
+                {
+                    "metric": detail["metric"],
+                    "value": detail["value"],
+                    "score": detail["score"],
+                    "weight": detail["weight"],
+                    "multiplier": round(detail["weight"] / 10.0, 1),
+                    "product": round(detail["product"], 2),
+                }
+                for detail in cat_data["details"]
+            ],
+        }
+        for cat_name, cat_data in score_result["category_breakdown"].items()
+    ]
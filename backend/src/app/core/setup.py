@@ -1,3 +1,5 @@
+import logging
+import secrets
 from collections.abc import AsyncGenerator, Callable
 from contextlib import _AsyncGeneratorContextManager, asynccontextmanager
 from typing import Any
@@ -6,12 +8,14 @@ import anyio
 import fastapi
 from arq import create_pool
 from arq.connections import RedisSettings
-from fastapi import APIRouter, Depends, FastAPI
+from arq.constants import default_queue_name, in_progress_key_prefix
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Response
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 
 from ..api.dependencies import get_current_superuser
 from ..middleware.client_cache_middleware import ClientCacheMiddleware
+from ..middleware.tracing_middleware import TracingMiddleware
 from ..models import *  # noqa: F403
 from .config import (
     AppSettings,
@@ -19,10 +23,35 @@ from .config import (
     DatabaseSettings,
     EnvironmentOption,
     EnvironmentSettings,
+    MetricsSettings,
+    MPCBatchQuerySettings,
+    MPCCallbackSettings,
+    MPCClientSettings,
+    MPCHealthSettings,
+    MPCRelayPoolSettings,
+    MPCServerKeySettings,
+    MPCSingleFlightSettings,
+    RedisQueueSettings,
+    ScoreCacheSettings,
+    TracingSettings,
     settings,
 )
 from .db.database import Base
 from .db.database import async_engine as engine
+from .key_material import server_keys
+from .metrics import CONTENT_TYPE, registry, score_jobs
+from .mpc.cancellation import task_canceller
+from .mpc.capabilities import node_capabilities
+from .mpc.clients import http_clients
+from .mpc.completion import completions
+from .mpc.health import node_health
+from .mpc.relay_pool import relay_ids
+from .mpc.singleflight import single_flight
+from .tracing import tracer
+from .utils import queue
+from .utils.cache import result_cache
+
+logger = logging.getLogger(__name__)
 
 
 # -------------- database --------------
@@ -31,6 +60,56 @@ async def create_tables() -> None:
         await conn.run_sync(Base.metadata.create_all)
 
 
+# -------------- queue --------------
+async def create_redis_queue_pool() -> None:
+    try:
+        queue.pool = await create_pool(
+            RedisSettings(host=settings.REDIS_QUEUE_HOST, port=settings.REDIS_QUEUE_PORT, conn_retries=1)
+        )
+    except Exception as e:
+        # background jobs are optional: the rest of the API works without Redis
+        logger.warning(f"Redis queue unavailable, background jobs disabled: {e}")
+        queue.pool = None
+
+
+async def close_redis_queue_pool() -> None:
+    if queue.pool is not None:
+        await queue.pool.aclose()
+        queue.pool = None
+
+
+# -------------- metrics --------------
+async def collect_score_job_metrics() -> None:
+    """Read the arq queue depth into the ``score_jobs`` gauge; jobs run in the worker, so this is shared state."""
+    if queue.pool is None:
+        return
+    try:
+        in_progress = 0
+        async for _ in queue.pool.scan_iter(match=f"{in_progress_key_prefix}*", count=1000):
+            in_progress += 1
+        # running jobs stay in the queue until they finish
+        total = await queue.pool.zcard(default_queue_name)
+    except Exception as e:
+        logger.warning(f"Could not read queue depth for metrics: {e}")
+        return
+    score_jobs.set(max(0, total - in_progress), state="queued")
+    score_jobs.set(in_progress, state="in_progress")
+
+
+def create_metrics_router(metrics_settings: MetricsSettings) -> APIRouter:
+    metrics_router = APIRouter()
+
+    @metrics_router.get("/metrics", include_in_schema=False)
+    async def metrics(authorization: str | None = Header(default=None)) -> Response:
+        token = metrics_settings.METRICS_TOKEN
+        if token and not secrets.compare_digest(authorization or "", f"Bearer {token}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+        await collect_score_job_metrics()
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    return metrics_router
+
+
 # -------------- application --------------
 async def set_threadpool_tokens(number_of_tokens: int = 100) -> None:
     limiter = anyio.to_thread.current_default_thread_limiter()
@@ -43,6 +122,16 @@ def lifespan_factory(
         | AppSettings
         | ClientSideCacheSettings
         | EnvironmentSettings
+        | MPCClientSettings
+        | MPCCallbackSettings
+        | MPCSingleFlightSettings
+        | MPCHealthSettings
+        | MPCRelayPoolSettings
+        | MPCBatchQuerySettings
+        | MetricsSettings
+        | RedisQueueSettings
+        | ScoreCacheSettings
+        | TracingSettings
     ),
     create_tables_on_start: bool = False,
 ) -> Callable[[FastAPI], _AsyncGeneratorContextManager[Any]]:
@@ -60,10 +149,53 @@ def lifespan_factory(
         if create_tables_on_start:
             await create_tables()
 
+        if isinstance(settings, TracingSettings):
+            tracer.configure(settings)
+
+        if isinstance(settings, MPCClientSettings):
+            http_clients.configure(settings)
+
+        if isinstance(settings, MPCBatchQuerySettings):
+            node_capabilities.configure(settings)
+
+        if isinstance(settings, MPCServerKeySettings):
+            await server_keys.start(settings)
+
+        if isinstance(settings, MPCCallbackSettings):
+            await completions.start(settings)
+
+        if isinstance(settings, MPCSingleFlightSettings):
+            await single_flight.start(settings)
+
+        if isinstance(settings, MPCHealthSettings):
+            await node_health.start(settings)
+
+        if isinstance(settings, MPCRelayPoolSettings):
+            await relay_ids.start(settings)
+
+        if isinstance(settings, RedisQueueSettings):
+            await create_redis_queue_pool()
+
+        if isinstance(settings, ScoreCacheSettings):
+            await result_cache.start(settings)
+
         initialization_complete.set()
 
         yield
-        
+
+        if isinstance(settings, RedisQueueSettings):
+            await close_redis_queue_pool()
+
+        await result_cache.stop()
+        await task_canceller.drain()
+        await relay_ids.stop()
+        await node_health.stop()
+        await single_flight.stop()
+        await completions.stop()
+        await server_keys.stop()
+        await http_clients.aclose()
+        tracer.close()
+
     return lifespan
 
 
@@ -75,6 +207,16 @@ def create_application(
         | AppSettings
         | ClientSideCacheSettings
         | EnvironmentSettings
+        | MPCClientSettings
+        | MPCCallbackSettings
+        | MPCSingleFlightSettings
+        | MPCHealthSettings
+        | MPCRelayPoolSettings
+        | MPCBatchQuerySettings
+        | MetricsSettings
+        | RedisQueueSettings
+        | ScoreCacheSettings
+        | TracingSettings
     ),
     create_tables_on_start: bool = True,
     lifespan: Callable[[FastAPI], _AsyncGeneratorContextManager[Any]] | None = None,
@@ -102,6 +244,25 @@ def create_application(
         - RedisRateLimiterSettings: Sets up event handlers for creating and closing a Redis rate limiter pool.
         - EnvironmentSettings: Conditionally sets documentation URLs and integrates custom routes for API documentation
           based on the environment type.
+        - MPCClientSettings: Configures the pooled HTTP clients used for relay and MPC node traffic, which are
+          closed on shutdown.
+        - MPCCallbackSettings: Enables MPC node completion callbacks and, when configured, the Redis subscriber
+          that shares them between workers.
+        - MPCSingleFlightSettings: Coalesces identical in-flight MPC queries, across workers when a Redis URL is
+          configured.
+        - MPCHealthSettings: Probes the relay and MPC nodes in the background and opens per-node circuit breakers,
+          so requests to a node that is down fail fast (or fail over to standby nodes).
+        - MPCRelayPoolSettings: Keeps a pool of relay IDs allocated ahead of time per relay server, refilled in the
+          background, so MPC queries don't wait on the relay.
+        - MPCBatchQuerySettings: Sends all queries of a category to the MPC nodes as one batch over one relay session,
+          when every node advertises batch support.
+        - MPCServerKeySettings: Decodes the MPC server key ciphertexts are encrypted to once, and re-reads the key
+          file in the background when it changes so the key can be rotated without a restart.
+        - MetricsSettings: Serves Prometheus metrics of the MPC pipeline at /metrics, optionally behind a bearer token.
+        - ScoreCacheSettings: Starts the score and query result cache, in Redis when reachable and in-process
+          otherwise.
+        - TracingSettings: Runs every request in a trace propagated to the relay and MPC nodes, returns its ID in
+          X-Trace-Id, log lines and error responses, and exports the spans as OTLP/JSON to the console or a file.
 
     create_tables_on_start : bool
         A flag to indicate whether to create database tables on application startup.
@@ -140,9 +301,15 @@ def create_application(
     application = FastAPI(lifespan=lifespan, **kwargs)
     application.include_router(router)
 
+    if isinstance(settings, MetricsSettings) and settings.METRICS_ENABLED:
+        application.include_router(create_metrics_router(settings))
+
     if isinstance(settings, ClientSideCacheSettings):
         application.add_middleware(ClientCacheMiddleware, max_age=settings.CLIENT_CACHE_MAX_AGE)
 
+    if isinstance(settings, TracingSettings):
+        application.add_middleware(TracingMiddleware)
+
     if isinstance(settings, EnvironmentSettings):
         if settings.ENVIRONMENT != EnvironmentOption.PRODUCTION:
             docs_router = APIRouter()
@@ -0,0 +1,60 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from .tracing import current_trace_id
+
+EventCallback = Callable[[str, dict[str, Any]], Awaitable[None]]
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_events(
+    run: Callable[[EventCallback], Coroutine[Any, Any, Any]], final_event: str, heartbeat: float = 15.0
+) -> StreamingResponse:
+    """Run ``run(emit)`` in the background and stream every emitted event as Server-Sent Events.
+
+    The return value of ``run`` is sent as ``final_event`` and an exception as an
+    ``error`` event carrying the request's ``trace_id``. A comment line is sent
+    every ``heartbeat`` seconds without events so proxies keep the connection
+    open. If the client goes away the background run is cancelled.
+    """
+    queue: asyncio.Queue[tuple[str, Any] | None] = asyncio.Queue()
+
+    async def emit(event: str, data: dict[str, Any]) -> None:
+        await queue.put((event, data))
+
+    async def events() -> AsyncIterator[str]:
+        task = asyncio.create_task(run(emit))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield format_sse(*item)
+
+            exc = task.exception()
+            if exc is None:
+                yield format_sse(final_event, task.result())
+            else:
+                detail = exc.detail if isinstance(exc, HTTPException) else str(exc)
+                yield format_sse("error", {"detail": detail, "trace_id": current_trace_id()})
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import IO, Any
+
+from .config import TracingSettings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+TRACE_ID_HEADER = "X-Trace-Id"
+
+
+class SpanKind(IntEnum):
+    # OTLP SpanKind values
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+    CONSUMER = 5
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None = None
+    kind: SpanKind = SpanKind.INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def traceparent(self) -> str:
+        """W3C Trace Context header value naming this span as the parent."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: Any) -> None:
+        self.error = str(error) or type(error).__name__
+
+    def to_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": int(self.kind),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error is not None else {"code": 0},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    """The remote parent from a ``traceparent`` header, or None when absent or malformed."""
+    match = TRACEPARENT_RE.match((value or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, _ = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id)
+
+
+def current_trace_id() -> str | None:
+    span = current_span.get()
+    return span.trace_id if span is not None else None
+
+
+def current_traceparent() -> str | None:
+    span = current_span.get()
+    return span.traceparent if span is not None else None
+
+
+def inject_headers(headers: dict[str, str] | None = None) -> dict[str, str]:
+    """``headers`` plus the current trace context, for a request to the relay or an MPC node."""
+    span = current_span.get()
+    if span is None:
+        return headers or {}
+    return {**(headers or {}), "traceparent": span.traceparent, TRACE_ID_HEADER: span.trace_id}
+
+
+class Tracer:
+    """Spans for requests, relay allocation, node calls and polls, correlated by trace ID.
+
+    Every incoming request gets a trace (continuing the caller's ``traceparent`` when sent),
+    its ID is returned in ``X-Trace-Id``, added to log lines and error responses, and
+    propagated to the relay and MPC nodes. Finished spans are written as OTLP/JSON lines
+    (one ``TracesData`` object per line, the format of the OpenTelemetry collector's file
+    exporter) to stdout or ``TRACING_FILE`` depending on ``TRACING_EXPORTER``, and dropped
+    when it is ``none``.
+    """
+
+    def __init__(self) -> None:
+        self.exporter = "none"
+        self.service_name = "sl-compute-backend"
+        self._out: IO[str] | None = None
+        self._resource: dict[str, Any] = {}
+
+    def configure(self, tracing_settings: TracingSettings) -> None:
+        self.close()
+        self.exporter = tracing_settings.TRACING_EXPORTER
+        self.service_name = tracing_settings.TRACING_SERVICE_NAME
+        self._resource = {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]}
+        if self.exporter == "console":
+            self._out = sys.stdout
+        elif self.exporter == "file":
+            os.makedirs(os.path.dirname(os.path.abspath(tracing_settings.TRACING_FILE)), exist_ok=True)
+            self._out = open(tracing_settings.TRACING_FILE, "a", buffering=1, encoding="utf-8")
+        elif self.exporter != "none":
+            raise ValueError(f"Unknown TRACING_EXPORTER {self.exporter!r}, expected none, console or file")
+
+    def close(self) -> None:
+        if self._out is not None and self._out is not sys.stdout:
+            self._out.close()
+        self._out = None
+
+    @contextmanager
+    def span(
+        self, name: str, kind: SpanKind = SpanKind.INTERNAL, parent: SpanContext | None = None, **attributes: Any
+    ) -> Iterator[Span]:
+        """Run the block in a new span, a child of ``parent`` or else of the current span.
+
+        An exception escaping the block marks the span as failed and is re-raised.
+        """
+        context: SpanContext | Span | None = parent if parent is not None else current_span.get()
+        span = Span(
+            name=name,
+            trace_id=context.trace_id if context is not None else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_span_id=context.span_id if context is not None else None,
+            kind=kind,
+            attributes=attributes,
+        )
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if span.error is None:
+                span.record_error(e)
+            raise
+        finally:
+            current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.export(span)
+
+    def export(self, span: Span) -> None:
+        if self._out is None:
+            return
+        scope_spans = [{"scope": {"name": "app"}, "spans": [span.to_otlp()]}]
+        data = {"resourceSpans": [{"resource": self._resource, "scopeSpans": scope_spans}]}
+        try:
+            self._out.write(json.dumps(data, separators=(",", ":"), default=str) + "\n")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not export span {span.name}: {e}")
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds ``trace_id`` and ``span_id`` of the current span (``-`` outside one) to every log record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = current_span.get()
+        record.trace_id = span.trace_id if span is not None else "-"
+        record.span_id = span.span_id if span is not None else "-"
+        return True
+
+
+tracer = Tracer()
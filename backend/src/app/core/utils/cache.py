@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Iterable
+from typing import Any, cast
+
+from redis.asyncio import Redis
+
+from ..config import ScoreCacheSettings
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "result-cache:"
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """TTL cache for MPC query and score results.
+
+    Entries are stored under ``result-cache:{kind}:{hash of the parts}`` and tagged with the
+    ``(email, category)`` pairs whose data they were computed from. Posting new ciphertext for
+    a pair calls ``invalidate``, which drops every entry carrying its tag, and ``bump_data_version``.
+    Callers put the pairs' ``data_versions`` in their keys, so results computed from data that has
+    since changed are never read even if their invalidation was missed or raced with the
+    computation; that is what lets query results live for ``SCORE_CACHE_QUERY_TTL``.
+
+    Entries live in Redis (``REDIS_CACHE_URL``) so all workers share them and their
+    invalidations. When Redis is disabled or unreachable at startup the cache is kept
+    in-process instead, and invalidation only reaches the current worker; data versions are
+    per process too, so query results are then kept no longer than ``SCORE_CACHE_TTL``.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.ttl = 300
+        self.query_ttl = 86400
+        self.max_entries = 1024
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.invalidations = 0
+        self._redis: Redis | None = None
+        self._entries: dict[str, tuple[float, str]] = {}
+        self._tags: dict[str, set[str]] = {}
+        self._versions: dict[str, int] = {}
+
+    async def start(self, cache_settings: ScoreCacheSettings) -> None:
+        self.enabled = cache_settings.SCORE_CACHE_ENABLED
+        self.ttl = cache_settings.SCORE_CACHE_TTL
+        self.query_ttl = cache_settings.SCORE_CACHE_QUERY_TTL
+        self.max_entries = cache_settings.SCORE_CACHE_MAX_ENTRIES
+        if not (self.enabled and cache_settings.SCORE_CACHE_REDIS_ENABLED):
+            self._use_local()
+            return
+
+        redis = Redis.from_url(cache_settings.REDIS_CACHE_URL, socket_connect_timeout=2)
+        try:
+            await redis.ping()
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable, caching results in-process: {e}")
+            await redis.aclose()
+            self._use_local()
+            return
+        self._redis = redis
+
+    def _use_local(self) -> None:
+        # another worker's upload bumps only its own data versions, so a long-lived query result
+        # here could be served for data that changed elsewhere: no longer than the score TTL
+        if self.query_ttl > self.ttl:
+            logger.info(f"Query results cached in-process for {self.ttl}s instead of {self.query_ttl}s")
+            self.query_ttl = self.ttl
+
+    async def stop(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis is not None else "memory"
+
+    @staticmethod
+    def tag(email: str, category: str) -> str:
+        return f"{CACHE_PREFIX}tag:{_digest(email, category)}"
+
+    # -------------- data versions --------------
+    async def data_versions(self, email: str, categories: Iterable[str]) -> dict[str, int | str]:
+        """Version of ``email``'s data in each of ``categories``, bumped whenever new ciphertext is posted.
+
+        When the versions can't be read each category gets a one-off version no entry was stored
+        under, so the lookup misses instead of returning a result for data that may have changed.
+        """
+        categories = list(categories)
+        keys = [f"{CACHE_PREFIX}version:{_digest(email, category)}" for category in categories]
+        if self._redis is None:
+            return {category: self._versions.get(key, 0) for category, key in zip(categories, keys)}
+
+        try:
+            values = await self._redis.mget(keys)
+        except Exception as e:
+            logger.warning(f"Result cache version read failed: {e}")
+            return {category: f"unversioned:{uuid.uuid4()}" for category in categories}
+        return {category: int(value or 0) for category, value in zip(categories, values)}
+
+    async def data_version(self, email: str, category: str) -> int | str:
+        return (await self.data_versions(email, [category]))[category]
+
+    async def bump_data_version(self, email: str, category: str) -> int | None:
+        """Move ``(email, category)`` to a new data version, returning it (``None`` if that failed)."""
+        key = f"{CACHE_PREFIX}version:{_digest(email, category)}"
+        if self._redis is None:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return self._versions[key]
+
+        try:
+            # no expiry: a version must outlive every entry keyed on it
+            return int(await self._redis.incr(key))
+        except Exception as e:
+            logger.error(f"Result cache version bump failed: {e}")
+            return None
+
+    # -------------- entries --------------
+    async def get(self, kind: str, *parts: Any) -> Any | None:
+        if not self.enabled:
+            return None
+
+        key = f"{CACHE_PREFIX}{kind}:{_digest(*parts)}"
+        try:
+            raw = await self._redis.get(key) if self._redis is not None else self._get_local(key)
+        except Exception as e:
+            logger.warning(f"Result cache read failed: {e}")
+            raw = None
+
+        if raw is None:
+            self.misses[kind] += 1
+            return None
+        self.hits[kind] += 1
+        return json.loads(raw)
+
+    async def set(self, kind: str, *parts: Any, value: Any, tags: Iterable[str], ttl: int | None = None) -> None:
+        """Store ``value`` for ``ttl`` seconds (``SCORE_CACHE_TTL`` by default)."""
+        if not self.enabled:
+            return
+
+        key = f"{CACHE_PREFIX}{kind}:{_digest(*parts)}"
+        raw = json.dumps(value, default=str)
+        ttl = ttl or self.ttl
+        if self._redis is None:
+            self._set_local(key, raw, tags, ttl)
+            return
+
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, raw, ex=ttl)
+                for tag in tags:
+                    pipe.sadd(tag, key)
+                    # a tag must outlive the longest-lived entry it may carry
+                    pipe.expire(tag, max(self.ttl, self.query_ttl))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Result cache write failed: {e}")
+
+    async def invalidate(self, tag: str) -> int:
+        """Drop every entry carrying ``tag``, returning how many were removed."""
+        self.invalidations += 1
+        if self._redis is None:
+            keys = self._tags.pop(tag, set())
+            return sum(self._entries.pop(key, None) is not None for key in keys)
+
+        try:
+            members = await cast(Awaitable[set[bytes]], self._redis.smembers(tag))
+            if not members:
+                return 0
+            removed = await self._redis.delete(*members)
+            await self._redis.delete(tag)
+            return int(removed)
+        except Exception as e:
+            # entries left behind still expire after the TTL
+            logger.error(f"Result cache invalidation failed: {e}")
+            return 0
+
+    def stats(self) -> dict[str, Any]:
+        kinds = sorted(set(self.hits) | set(self.misses))
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend,
+            "ttl": self.ttl,
+            "query_ttl": self.query_ttl,
+            "hits": {kind: self.hits[kind] for kind in kinds},
+            "misses": {kind: self.misses[kind] for kind in kinds},
+            "hit_ratio": {
+                kind: round(self.hits[kind] / (self.hits[kind] + self.misses[kind]), 4) for kind in kinds
+            },
+            "invalidations": self.invalidations,
+        }
+
+    # -------------- in-process backend --------------
+    def _get_local(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, raw = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return raw
+
+    def _set_local(self, key: str, raw: str, tags: Iterable[str], ttl: int) -> None:
+        self._entries.pop(key, None)
+        while len(self._entries) >= self.max_entries:
+            # dicts keep insertion order, so the first entry is the oldest
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (time.monotonic() + ttl, raw)
+        for tag in tags:
+            keys = self._tags.setdefault(tag, set())
+            keys.intersection_update(self._entries)
+            keys.add(key)
+
+
+result_cache = ResultCache()
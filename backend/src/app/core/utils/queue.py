@@ -0,0 +1,54 @@
+import json
+from typing import Any
+
+from arq.connections import ArqRedis
+
+pool: ArqRedis | None = None
+
+# per-job progress of score generation jobs, written by the worker
+SCORE_JOB_PROGRESS_PREFIX = "score-job-progress:"
+
+
+def score_job_progress_key(job_id: str) -> str:
+    return f"{SCORE_JOB_PROGRESS_PREFIX}{job_id}"
+
+
+# aggregate progress of portfolio scoring jobs, written by the worker: the counters (and status) in
+# a hash, tier counts as its "tier:<tier>" fields, and one JSON entry per finished target in a list
+PORTFOLIO_JOB_PROGRESS_PREFIX = "portfolio-job-progress:"
+PORTFOLIO_JOB_RESULTS_PREFIX = "portfolio-job-results:"
+PORTFOLIO_TIER_FIELD_PREFIX = "tier:"
+
+
+def portfolio_job_progress_key(job_id: str) -> str:
+    return f"{PORTFOLIO_JOB_PROGRESS_PREFIX}{job_id}"
+
+
+def portfolio_job_results_key(job_id: str) -> str:
+    return f"{PORTFOLIO_JOB_RESULTS_PREFIX}{job_id}"
+
+
+async def read_score_job_progress(redis: ArqRedis, job_id: str) -> dict[str, Any] | None:
+    progress = await redis.get(score_job_progress_key(job_id))
+    return json.loads(progress) if progress else None
+
+
+async def read_portfolio_job_progress(redis: ArqRedis, job_id: str) -> dict[str, Any] | None:
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hgetall(portfolio_job_progress_key(job_id))
+        pipe.lrange(portfolio_job_results_key(job_id), 0, -1)
+        fields, results = await pipe.execute()
+    if not fields:
+        return None
+
+    progress: dict[str, Any] = {}
+    tiers: dict[str, int] = {}
+    for field, value in fields.items():
+        name, text = field.decode(), value.decode()
+        if name.startswith(PORTFOLIO_TIER_FIELD_PREFIX):
+            tiers[name[len(PORTFOLIO_TIER_FIELD_PREFIX) :]] = int(text)
+        else:
+            progress[name] = text if name == "status" else int(text)
+    progress["tiers"] = tiers
+    progress["results"] = [json.loads(result) for result in results]
+    return progress
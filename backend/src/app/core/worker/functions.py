@@ -1,24 +1,247 @@
 import asyncio
+import json
 import logging
+from typing import Any
 
 import uvloop
-from arq.worker import Worker
+
+from ...api.v1.portfolio import PortfolioScoreRequest, PortfolioTarget, run_portfolio
+from ...api.v1.query import QUERIES, ScoreGenerationRequest, run_score
+from ...crud.crud_loan import crud_loans
+from ...crud.crud_score import crud_scores
+from ...schemas.score import ScoreCreate
+from ..config import settings
+from ..db.database import local_session
+from ..mpc.cancellation import task_canceller
+from ..mpc.capabilities import node_capabilities
+from ..mpc.clients import http_clients
+from ..mpc.completion import completions
+from ..mpc.health import node_health
+from ..mpc.relay_pool import relay_ids
+from ..mpc.singleflight import single_flight
+from ..tracing import SpanKind, TraceContextFilter, parse_traceparent, tracer
+from ..utils.cache import result_cache
+from ..utils.queue import (
+    PORTFOLIO_TIER_FIELD_PREFIX,
+    portfolio_job_progress_key,
+    portfolio_job_results_key,
+    score_job_progress_key,
+)
 
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - [trace=%(trace_id)s] %(message)s"
+)
+for handler in logging.getLogger().handlers:
+    handler.addFilter(TraceContextFilter())
 
 
 # -------- background tasks --------
-async def sample_background_task(ctx: Worker, name: str) -> str:
+async def sample_background_task(ctx: dict[str, Any], name: str) -> str:
     await asyncio.sleep(5)
     return f"Task {name} is complete!"
 
 
+async def set_insights_status(loan_id: int | None, status: str) -> None:
+    if loan_id is None:
+        return
+    try:
+        async with local_session() as db:
+            await crud_loans.update(db=db, object={"insights_status": status[:30]}, id=loan_id)
+    except Exception as e:
+        # progress reporting must never fail the score itself
+        logging.warning(f"Could not update insights_status of loan {loan_id}: {e}")
+
+
+async def generate_score_job(
+    ctx: dict[str, Any], request: dict[str, Any], loan_id: int | None = None, traceparent: str | None = None
+) -> dict[str, Any]:
+    """Run the full MPC scoring pipeline for one company.
+
+    Progress is kept in Redis under ``score_job_progress_key(job_id)`` and, when
+    ``loan_id`` is given, mirrored to the loan's ``insights_status``. The returned
+    score is stored by arq as the job result. ``traceparent`` is the trace of the
+    request that queued the job, which the job's spans continue. A job aborted with
+    ``DELETE /api/score-jobs/{job_id}`` cancels its node tasks and reports ``cancelled``.
+    """
+    job_id = ctx["job_id"]
+    redis = ctx["redis"]
+    total = sum(len(queries) for queries in QUERIES.values())
+    progress: dict[str, Any] = {"status": "running", "completed_queries": 0, "total_queries": total}
+
+    async def report() -> None:
+        await redis.set(score_job_progress_key(job_id), json.dumps(progress), ex=settings.SCORE_JOB_RESULT_TTL)
+
+    async def on_event(event: str, data: dict[str, Any]) -> None:
+        if event == "query_result":
+            progress["completed_queries"] += 1
+            await report()
+            await set_insights_status(loan_id, f"Generating {progress['completed_queries']}/{total}")
+        elif event == "category_complete":
+            progress["completed_categories"] = data["completed_categories"]
+            progress["partial_score"] = data["partial_score"]
+            await report()
+        elif event == "category_subtotal":
+            progress.setdefault("category_subtotals", {})[data["category"]] = data["score"]
+            await report()
+
+    await report()
+    await set_insights_status(loan_id, "Generating")
+    try:
+        with tracer.span("generate_score_job", SpanKind.CONSUMER, parent=parse_traceparent(traceparent), job_id=job_id):
+            result = await run_score(ScoreGenerationRequest(**request), on_event=on_event, loan_id=loan_id)
+    except asyncio.CancelledError:
+        progress["status"] = "cancelled"
+        await report()
+        await set_insights_status(loan_id, "Cancelled")
+        raise
+    except Exception as e:
+        progress.update(status="failed", error=str(e))
+        await report()
+        await set_insights_status(loan_id, "Failed")
+        raise
+
+    progress.update(status="complete", score=result["score"], tier=result["tier"])
+    await report()
+    await set_insights_status(loan_id, "Generated")
+    return result
+
+
+async def generate_portfolio_job(
+    ctx: dict[str, Any], request: dict[str, Any], targets: list[dict[str, Any]], traceparent: str | None = None
+) -> dict[str, Any]:
+    """Score a portfolio of SMEs/loans, persisting each score as it completes.
+
+    Aggregate progress is kept in Redis under ``portfolio_job_progress_key(job_id)`` (counters)
+    and ``portfolio_job_results_key(job_id)`` (one entry per finished target), updated in place
+    so each report costs the same however large the portfolio; ``read_portfolio_job_progress``
+    puts them together. The returned summary (same shape) is stored by arq as the job result.
+    Its spans continue the trace of the request that queued it (``traceparent``). When the job
+    is aborted, loans not scored yet are marked ``Cancelled``.
+    """
+    job_id = ctx["job_id"]
+    redis = ctx["redis"]
+    progress_key, results_key = portfolio_job_progress_key(job_id), portfolio_job_results_key(job_id)
+    portfolio_request = PortfolioScoreRequest(**request)
+    portfolio_targets = [PortfolioTarget(**target) for target in targets]
+    queries_per_target = sum(len(queries) for queries in QUERIES.values())
+    progress: dict[str, Any] = {
+        "status": "running",
+        "total_targets": len(portfolio_targets),
+        "completed_targets": 0,
+        "failed_targets": 0,
+        "total_queries": len(portfolio_targets) * queries_per_target,
+        "completed_queries": 0,
+        "tiers": {},
+        "results": [],
+    }
+
+    async def report(
+        counters: dict[str, int] | None = None, result: dict[str, Any] | None = None, status: str | None = None
+    ) -> None:
+        async with redis.pipeline(transaction=True) as pipe:
+            for field, amount in (counters or {}).items():
+                pipe.hincrby(progress_key, field, amount)
+            if status is not None:
+                pipe.hset(progress_key, "status", status)
+            pipe.expire(progress_key, settings.SCORE_JOB_RESULT_TTL)
+            if result is not None:
+                pipe.rpush(results_key, json.dumps(result))
+                pipe.expire(results_key, settings.SCORE_JOB_RESULT_TTL)
+            await pipe.execute()
+
+    async def on_query(target: PortfolioTarget) -> None:
+        progress["completed_queries"] += 1
+        await report({"completed_queries": 1})
+
+    async def on_score(target: PortfolioTarget, result: dict[str, Any]) -> None:
+        score_create = ScoreCreate(
+            score=result["score"],
+            tier=result["tier"],
+            year=portfolio_request.year,
+            start_date=portfolio_request.start_date,
+            end_date=portfolio_request.end_date,
+            sme_id=target.sme_id,
+            loan_id=target.loan_id,
+            portfolio_job_id=job_id,
+            result=result,
+        )
+        async with local_session() as db:
+            created = await crud_scores.create(db=db, object=score_create)
+        await set_insights_status(target.loan_id, "Generated")
+
+        entry = {
+            "sme_id": target.sme_id,
+            "loan_id": target.loan_id,
+            "status": "complete",
+            "score_id": created.id,
+            "score": result["score"],
+            "tier": result["tier"],
+        }
+        progress["completed_targets"] += 1
+        progress["tiers"][result["tier"]] = progress["tiers"].get(result["tier"], 0) + 1
+        progress["results"].append(entry)
+        await report({"completed_targets": 1, f"{PORTFOLIO_TIER_FIELD_PREFIX}{result['tier']}": 1}, entry)
+
+    async def on_failure(target: PortfolioTarget, error: Exception) -> None:
+        logging.warning(f"Portfolio job {job_id}: scoring SME {target.sme_id} (loan {target.loan_id}) failed: {error}")
+        await set_insights_status(target.loan_id, "Failed")
+        entry = {"sme_id": target.sme_id, "loan_id": target.loan_id, "status": "failed", "error": str(error)}
+        progress["failed_targets"] += 1
+        progress["results"].append(entry)
+        await report({"failed_targets": 1}, entry)
+
+    # a retried job starts its progress over
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(progress_key, results_key)
+        pipe.hset(progress_key, mapping={k: v for k, v in progress.items() if k not in ("tiers", "results")})
+        pipe.expire(progress_key, settings.SCORE_JOB_RESULT_TTL)
+        await pipe.execute()
+
+    with tracer.span(
+        "generate_portfolio_job", SpanKind.CONSUMER, parent=parse_traceparent(traceparent),
+        job_id=job_id, targets=len(portfolio_targets),
+    ):
+        try:
+            await run_portfolio(
+                portfolio_request, portfolio_targets, on_score=on_score, on_failure=on_failure, on_query=on_query
+            )
+        except asyncio.CancelledError:
+            progress["status"] = "cancelled"
+            await report(status="cancelled")
+            finished = {result["loan_id"] for result in progress["results"]}
+            for target in portfolio_targets:
+                if target.loan_id not in finished:
+                    await set_insights_status(target.loan_id, "Cancelled")
+            raise
+
+    progress["status"] = "complete"
+    await report(status="complete")
+    return progress
+
+
 # -------- base functions --------
-async def startup(ctx: Worker) -> None:
+async def startup(ctx: dict[str, Any]) -> None:
+    tracer.configure(settings)
+    http_clients.configure(settings)
+    node_capabilities.configure(settings)
+    # node callbacks reach the worker only through Redis (MPC_CALLBACK_REDIS_URL), otherwise it polls
+    await completions.start(settings)
+    await single_flight.start(settings)
+    await node_health.start(settings)
+    await relay_ids.start(settings)
+    await result_cache.start(settings)
     logging.info("Worker Started")
 
 
-async def shutdown(ctx: Worker) -> None:
+async def shutdown(ctx: dict[str, Any]) -> None:
+    await result_cache.stop()
+    await task_canceller.drain()
+    await relay_ids.stop()
+    await node_health.stop()
+    await single_flight.stop()
+    await completions.stop()
+    await http_clients.aclose()
     logging.info("Worker end")
+    tracer.close()
@@ -1,15 +1,22 @@
+from arq import func
 from arq.connections import RedisSettings
 
 from ...core.config import settings
-from .functions import sample_background_task, shutdown, startup
+from .functions import generate_portfolio_job, generate_score_job, sample_background_task, shutdown, startup
 
 REDIS_QUEUE_HOST = settings.REDIS_QUEUE_HOST
 REDIS_QUEUE_PORT = settings.REDIS_QUEUE_PORT
 
 
 class WorkerSettings:
-    functions = [sample_background_task]
+    functions = [
+        sample_background_task,
+        func(generate_score_job, timeout=settings.SCORE_JOB_TIMEOUT, keep_result=settings.SCORE_JOB_RESULT_TTL),
+        func(generate_portfolio_job, timeout=settings.PORTFOLIO_JOB_TIMEOUT, keep_result=settings.SCORE_JOB_RESULT_TTL),
+    ]
     redis_settings = RedisSettings(host=REDIS_QUEUE_HOST, port=REDIS_QUEUE_PORT)
     on_startup = startup
     on_shutdown = shutdown
     handle_signals = False
+    # DELETE /api/score-jobs/{job_id} (and portfolio jobs) abort running jobs
+    allow_abort_jobs = True
@@ -35,6 +35,12 @@ class CRUDLoanExtended(CRUDLoan):
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
     
+    async def get_loans_by_ids(self, db: AsyncSession, *, ids: list[int]) -> list[Loan]:
+        """Get the Loans with these IDs (missing ones are left out)"""
+        stmt = select(self.model).where(self.model.id.in_(ids))
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
     async def get_loans_by_sme(self, db: AsyncSession, *, sme_id: int) -> list[Loan]:
         """Get Loans by SME"""
         stmt = select(self.model).where(self.model.sme_id == sme_id)
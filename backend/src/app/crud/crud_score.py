@@ -0,0 +1,62 @@
+from typing import Any
+
+from fastcrud import FastCRUD
+from sqlalchemy import ColumnElement, Row, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.score import Score
+from ..schemas.score import ScoreCreate, ScoreDelete, ScoreRead, ScoreUpdate, ScoreUpdateInternal
+
+CRUDScore = FastCRUD[Score, ScoreCreate, ScoreUpdate, ScoreUpdateInternal, ScoreDelete, ScoreRead]
+crud_scores = CRUDScore(Score)
+
+
+class CRUDScoreExtended(CRUDScore):
+    async def get_latest_by_loan(self, db: AsyncSession, *, loan_id: int) -> Score | None:
+        """Get the most recent Score of a Loan"""
+        stmt = (
+            select(self.model)
+            .where(self.model.loan_id == loan_id, self.model.is_deleted.is_(False))
+            .order_by(self.model.created_at.desc())
+            .limit(1)
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_for_rescoring(
+        self,
+        db: AsyncSession,
+        *,
+        after_id: int = 0,
+        limit: int = 500,
+        score_ids: list[int] | None = None,
+        sme_ids: list[int] | None = None,
+        loan_ids: list[int] | None = None,
+        portfolio_job_id: str | None = None,
+        latest_only: bool = True,
+    ) -> list[Row[Any]]:
+        """Get the next page (by ID) of stored scores with their results, optionally only the latest per SME/loan"""
+        model = self.model
+        filters: list[ColumnElement[bool]] = [model.is_deleted.is_(False)]
+        if score_ids:
+            filters.append(model.id.in_(score_ids))
+        if sme_ids:
+            filters.append(model.sme_id.in_(sme_ids))
+        if loan_ids:
+            filters.append(model.loan_id.in_(loan_ids))
+        if portfolio_job_id is not None:
+            filters.append(model.portfolio_job_id == portfolio_job_id)
+
+        stmt = select(model.id, model.sme_id, model.loan_id, model.score, model.tier, model.result).where(
+            model.id > after_id, *filters
+        )
+        if latest_only:
+            # IDs grow with creation time, so the highest one per SME/loan is its latest score
+            latest = select(func.max(model.id)).where(*filters).group_by(model.sme_id, model.loan_id)
+            stmt = stmt.where(model.id.in_(latest))
+
+        result = await db.execute(stmt.order_by(model.id).limit(limit))
+        return list(result.all())
+
+
+score = CRUDScoreExtended(Score)
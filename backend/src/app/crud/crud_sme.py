@@ -46,4 +46,10 @@ class CRUDSmeExtended(CRUDSME):
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_names_by_ids(self, db: AsyncSession, *, ids: list[int]) -> dict[int, str]:
+        """Get the names of the SMEs with these IDs, by ID (missing ones are left out)"""
+        stmt = select(self.model.id, self.model.name).where(self.model.id.in_(ids))
+        result = await db.execute(stmt)
+        return dict(result.tuples().all())
+
 sme = CRUDSmeExtended(SME)
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, cast
 
 from fastcrud import FastCRUD
 from sqlalchemy import select, update
@@ -50,6 +50,18 @@ class CRUDUserExtended(CRUDUser):
         
         return await self.create(db, object=user_data)
 
+    async def get_emails_by_sme_ids(self, db: AsyncSession, *, sme_ids: list[int]) -> dict[int, str]:
+        """Get the email of the first user registered for each of these SMEs, by SME ID"""
+        stmt = (
+            select(self.model.sme_id, self.model.email).where(self.model.sme_id.in_(sme_ids)).order_by(self.model.id)
+        )
+        result = await db.execute(stmt)
+        emails: dict[int, str] = {}
+        for sme_id, email in result.all():
+            # sme_id IN (...) matched, so it is set
+            emails.setdefault(cast(int, sme_id), email)
+        return emails
+
     async def get_by_username(self, db: AsyncSession, *, username: str) -> User | None:
         """Get user by username"""
         stmt = select(self.model).where(self.model.username == username)
@@ -26,6 +26,7 @@ class ClientCacheMiddleware(BaseHTTPMiddleware):
     ----
         - The `Cache-Control` header instructs clients (e.g., browsers)
         to cache the response for the specified duration.
+        - Responses that already carry a `Cache-Control` header are left unchanged.
     """
 
     def __init__(self, app: FastAPI, max_age: int = 60) -> None:
@@ -45,12 +46,14 @@ class ClientCacheMiddleware(BaseHTTPMiddleware):
         Returns
         -------
         Response
-            The response object with the `Cache-Control` header set.
+            The response object with the `Cache-Control` header set, unless the endpoint set one itself.
 
         Note
         ----
             - This method is automatically called by Starlette for processing the request-response cycle.
         """
         response: Response = await call_next(request)
-        response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        # don't override endpoints that set their own policy (e.g. event streams)
+        if "Cache-Control" not in response.headers:
+            response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
         return response
@@ -0,0 +1,109 @@
+import json
+import logging
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.tracing import TRACE_ID_HEADER, SpanKind, parse_traceparent, tracer
+
+logger = logging.getLogger(__name__)
+
+
+class TracingMiddleware:
+    """Middleware that runs every HTTP request in a server span of its own trace.
+
+    Parameters
+    ----------
+    app: ASGIApp
+        The ASGI application to wrap.
+
+    Note
+    ----
+        - A valid W3C `traceparent` request header is continued; otherwise a new trace is started.
+        - Every response carries the trace ID in `X-Trace-Id` and the server span in `traceparent`.
+        - JSON error responses (status 400 and above) get a `trace_id` field, and unhandled exceptions
+        are logged and answered with a JSON 500 carrying it, so a failure report leads straight to the
+        log lines and spans of that request.
+        - Written as plain ASGI rather than `BaseHTTPMiddleware`, so event streams are not buffered
+        and the span stays current in endpoint code and background streaming tasks.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent = parse_traceparent(Headers(scope=scope).get("traceparent"))
+        method = scope["method"]
+        with tracer.span(f"{method} {scope['path']}", SpanKind.SERVER, parent=parent, **{
+            "http.method": method,
+            "http.target": scope["path"],
+        }) as span:
+            response_started = False
+            # error bodies are held back until complete so the trace ID can be added to them
+            error_start: Message | None = None
+            error_body = b""
+
+            async def send_with_trace(message: Message) -> None:
+                nonlocal response_started, error_start, error_body
+                if message["type"] == "http.response.start":
+                    response_started = True
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.record_error(f"HTTP {message['status']}")
+                    headers = MutableHeaders(scope=message)
+                    headers[TRACE_ID_HEADER] = span.trace_id
+                    headers["traceparent"] = span.traceparent
+                    if message["status"] >= 400 and headers.get("content-type", "").startswith("application/json"):
+                        error_start = message
+                        return
+                elif message["type"] == "http.response.body" and error_start is not None:
+                    error_body += message.get("body", b"")
+                    if message.get("more_body", False):
+                        return
+                    body = with_trace_id(error_body, span.trace_id)
+                    MutableHeaders(scope=error_start)["content-length"] = str(len(body))
+                    await send(error_start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            except Exception as e:
+                logger.exception(f"Unhandled error in {method} {scope['path']}: {e}")
+                span.record_error(e)
+                if response_started:
+                    raise
+                body = json.dumps({"detail": "Internal Server Error", "trace_id": span.trace_id}).encode("utf-8")
+                await send({
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode("latin-1")),
+                        (TRACE_ID_HEADER.lower().encode("latin-1"), span.trace_id.encode("latin-1")),
+                        (b"traceparent", span.traceparent.encode("latin-1")),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": body})
+            finally:
+                # name the span after the route template, so spans of one endpoint group together
+                route = scope.get("route")
+                if route is not None and getattr(route, "path_format", None):
+                    span.name = f"{method} {route.path_format}"
+
+
+def with_trace_id(body: bytes, trace_id: str) -> bytes:
+    """Add ``trace_id`` to a JSON object error body; other bodies are returned unchanged."""
+    try:
+        content = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(content, dict):
+        return body
+    content["trace_id"] = trace_id
+    return json.dumps(content).encode("utf-8")
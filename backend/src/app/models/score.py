@@ -0,0 +1,32 @@
+import uuid as uuid_pkg
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..core.db.database import Base
+
+
+class Score(Base):
+    __tablename__ = "score"
+
+    id: Mapped[int] = mapped_column("id", autoincrement=True, nullable=False, unique=True, primary_key=True, init=False)
+
+    score: Mapped[float] = mapped_column(Float)
+    tier: Mapped[str] = mapped_column(String(5))
+    year: Mapped[int] = mapped_column(Integer)
+    start_date: Mapped[str] = mapped_column(String(30))
+    end_date: Mapped[str] = mapped_column(String(30))
+    # full /api/generate-score response, including raw_results and breakdown
+    result: Mapped[dict[str, Any]] = mapped_column(JSON)
+
+    uuid: Mapped[uuid_pkg.UUID] = mapped_column(default_factory=uuid_pkg.uuid4, primary_key=True, unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default_factory=lambda: datetime.now(UTC))
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+    is_deleted: Mapped[bool] = mapped_column(default=False, index=True)
+
+    portfolio_job_id: Mapped[str | None] = mapped_column(String(64), index=True, default=None)
+    sme_id: Mapped[int] = mapped_column(ForeignKey("sme.id"), index=True, default=None)
+    loan_id: Mapped[int | None] = mapped_column(ForeignKey("loan.id"), index=True, default=None)
@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Annotated, Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from ..core.schemas import PersistentDeletion, TimestampSchema, UUIDSchema
+
+
+class ScoreBase(BaseModel):
+    score: Annotated[float, Field(ge=0.0, le=100.0, examples=[73.8])]
+    tier: Annotated[str, Field(min_length=1, max_length=5, examples=["A", "B", "C"])]
+    year: Annotated[int, Field(examples=[2024])]
+    start_date: Annotated[str, Field(max_length=30, examples=["2024-01-01"])]
+    end_date: Annotated[str, Field(max_length=30, examples=["2024-12-31"])]
+    sme_id: Annotated[int, Field(gt=0, examples=[1, 2, 3])]
+    loan_id: Annotated[int | None, Field(gt=0, examples=[1, 2, 3], default=None)]
+    portfolio_job_id: Annotated[str | None, Field(max_length=64)] = None
+
+
+class Score(TimestampSchema, ScoreBase, UUIDSchema, PersistentDeletion):
+    id: int
+    result: dict[str, Any]
+
+
+class ScoreRead(ScoreBase):
+    id: int
+    result: dict[str, Any]
+    created_at: datetime
+
+
+class ScoreCreate(ScoreBase):
+    model_config = ConfigDict(extra="forbid")
+
+    result: dict[str, Any]
+
+
+class ScoreUpdate(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    score: Annotated[float | None, Field(ge=0.0, le=100.0, default=None)]
+    tier: Annotated[str | None, Field(min_length=1, max_length=5, default=None)]
+    result: dict[str, Any] | None = None
+
+
+class ScoreUpdateInternal(ScoreUpdate):
+    updated_at: datetime
+
+
+class ScoreDelete(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    is_deleted: bool
+    deleted_at: datetime
@@ -1,8 +1,10 @@
-from collections.abc import Callable, Generator
+import asyncio
+from collections.abc import AsyncGenerator, Callable, Generator
 from typing import Any
 from unittest.mock import AsyncMock, Mock
 
 import pytest
+import pytest_asyncio
 from faker import Faker
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -11,7 +13,11 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
 
 from src.app.core.config import settings
+from src.app.core.mpc import health
+from src.app.core.mpc.capabilities import node_capabilities
 from src.app.main import app
+from tests.helpers import stub_node
+from tests.helpers.stub_cluster import StubNodes
 
 DATABASE_URI = settings.POSTGRES_URI
 DATABASE_PREFIX = settings.POSTGRES_SYNC_PREFIX
@@ -100,3 +106,25 @@ def current_user_dict():
         "name": fake.name(),
         "is_superuser": False,
     }
+
+
+@pytest_asyncio.fixture
+async def stub_nodes(monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[StubNodes, None]:
+    """The MPC cluster served by the stub node, fast and with every capability on"""
+    nodes = StubNodes()
+    monkeypatch.setattr(health, "http_clients", nodes)
+    monkeypatch.setattr(node_capabilities, "_cache", {})
+    monkeypatch.setattr(stub_node, "tasks", {})
+    monkeypatch.setattr(stub_node, "STUB_NODE_DELAY", 0.05)
+    monkeypatch.setattr(stub_node, "STUB_NODE_CALLBACKS", False)
+    monkeypatch.setattr(stub_node, "STUB_NODE_BATCH", True)
+    monkeypatch.setattr(stub_node, "STUB_NODE_MAX_BATCH", 16)
+    monkeypatch.setattr(stub_node, "STUB_NODE_CANCEL", True)
+    yield nodes
+
+    # tasks nobody cancelled must not outlive the test's event loop
+    running = list(stub_node.running.values())
+    for task in running:
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    await nodes.client.aclose()
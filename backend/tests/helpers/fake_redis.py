@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+from typing import Any
+
+
+class FakeRedis:
+    """In-memory stand-in for the Redis commands the score and portfolio jobs use, replies as bytes like redis-py"""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.lists: dict[str, list[bytes]] = {}
+        self.ttls: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.values.get(key)
+
+    async def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.values[key] = value.encode()
+        if ex is not None:
+            self.ttls[key] = ex
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.values.pop(key, None)
+            self.hashes.pop(key, None)
+            self.lists.pop(key, None)
+            self.ttls.pop(key, None)
+
+    async def expire(self, key: str, seconds: int) -> None:
+        self.ttls[key] = seconds
+
+    async def hset(self, key: str, field: str | None = None, value: Any = None, mapping: dict | None = None) -> None:
+        fields = self.hashes.setdefault(key, {})
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        for name, item in items.items():
+            fields[str(name).encode()] = str(item).encode()
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> None:
+        fields = self.hashes.setdefault(key, {})
+        fields[field.encode()] = str(int(fields.get(field.encode(), b"0")) + amount).encode()
+
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        return dict(self.hashes.get(key, {}))
+
+    async def rpush(self, key: str, *values: str) -> None:
+        self.lists.setdefault(key, []).extend(value.encode() for value in values)
+
+    async def lrange(self, key: str, start: int, end: int) -> list[bytes]:
+        values = self.lists.get(key, [])
+        return values[start : None if end == -1 else end + 1]
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands and runs them, in order, on execute()"""
+
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list[Any] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.commands = []
+
+    def __getattr__(self, name: str) -> Any:
+        command = getattr(self.redis, name)
+        return lambda *args, **kwargs: self.commands.append(command(*args, **kwargs))
+
+    async def execute(self) -> list[Any]:
+        commands, self.commands = self.commands, []
+        return [await command for command in commands]
+
+
+class FakePool:
+    """Stands in for the arq pool (an ArqRedis): records the jobs enqueued"""
+
+    def __init__(self) -> None:
+        self.jobs: list[tuple[tuple[Any, ...], dict[str, Any]]] = []
+
+    async def enqueue_job(self, *args: Any, **kwargs: Any) -> SimpleNamespace:
+        self.jobs.append((args, kwargs))
+        return SimpleNamespace(job_id="job-1")
@@ -0,0 +1,76 @@
+"""Runs the backend's MPC clients against the stub node (``tests.helpers.stub_node``) in process."""
+
+import asyncio
+from typing import Any
+
+import httpx
+
+from src.app.api.v1 import query
+from tests.helpers import stub_node
+
+RELAY_URL = "http://relay:9007"
+NODE_URLS = ["http://node-1:9000", "http://node-2:9001", "http://node-3:9002"]
+
+
+class StubNodes:
+    """Stands in for ``http_clients``: the relay and every node are served by the stub node app,
+    and the requests sent to them are recorded as ``(method, path)``.
+    """
+
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, str]] = []
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=stub_node.app), event_hooks={"request": [self._record]}
+        )
+
+    async def _record(self, request: httpx.Request) -> None:
+        self.requests.append((request.method, request.url.path))
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        return self.client
+
+    def sent(self, method: str, path: str) -> int:
+        """Requests sent to ``path``, or to any path under it when it ends in ``/``"""
+        under = path.endswith("/")
+        return sum(1 for m, p in self.requests if m == method and (p == path or under and p.startswith(path)))
+
+
+def query_request(category: str = "banking", **kwargs: Any) -> query.QueryRequest:
+    return query.QueryRequest(
+        email="a@example.com",
+        category=category,
+        company_name="Acme Ltd",
+        year=2024,
+        start_date="2024-01-01",
+        end_date="2024-12-31",
+        relay_server_url=RELAY_URL,
+        mpc_node_urls=NODE_URLS,
+        **kwargs,
+    )
+
+
+def score_request() -> query.ScoreGenerationRequest:
+    return query.ScoreGenerationRequest(
+        email="a@example.com",
+        company_name="Acme Ltd",
+        year=2024,
+        start_date="2024-01-01",
+        end_date="2024-12-31",
+        relay_server_url=RELAY_URL,
+        mpc_node_urls=NODE_URLS,
+    )
+
+
+def canned(query_str: str) -> dict[str, Any]:
+    return {"query": query_str, "value": stub_node.CANNED_RESULTS[query_str]}
+
+
+async def wait_for_tasks(count: int) -> None:
+    """Wait until the nodes run ``count`` tasks and the backend is polling them"""
+    for _ in range(500):
+        if len(stub_node.tasks) >= count:
+            # let the dispatch responses reach poll_tasks
+            await asyncio.sleep(0.05)
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{len(stub_node.tasks)} node tasks started, expected {count}")
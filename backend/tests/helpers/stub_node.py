@@ -0,0 +1,146 @@
+"""Minimal stand-in for an MPC node (and the relay server) for local testing.
+
+Run one instance per node and point the backend at them::
+
+    STUB_NODE_CALLBACKS=1 uvicorn tests.helpers.stub_node:app --port 9000
+    STUB_NODE_CALLBACKS=1 uvicorn tests.helpers.stub_node:app --port 9001
+    STUB_NODE_CALLBACKS=1 uvicorn tests.helpers.stub_node:app --port 9002
+    uvicorn tests.helpers.stub_node:app --port 9007  # relay
+
+Environment variables:
+
+- ``STUB_NODE_DELAY``: seconds a query takes to "compute" (default 1.0)
+- ``STUB_NODE_CALLBACKS``: push results to ``callback_url`` when the request has one (default off)
+- ``STUB_NODE_BATCH``: advertise and serve batch queries (``POST /node/query-batch``), which take
+  ``STUB_NODE_DELAY`` once for all of their queries (default on)
+- ``STUB_NODE_MAX_BATCH``: largest batch advertised, 0 for no limit (default 16)
+- ``STUB_NODE_CANCEL``: advertise and serve task cancellation (``DELETE /node/query/{task_id}``),
+  which stops the task and marks it ``cancelled`` (default on)
+
+``GET /node/capabilities`` answers 404, like a node that predates it, when both are off.
+"""
+
+import asyncio
+import os
+import random
+import time
+import uuid
+from typing import Any
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+STUB_NODE_DELAY = float(os.getenv("STUB_NODE_DELAY", "1.0"))
+STUB_NODE_CALLBACKS = os.getenv("STUB_NODE_CALLBACKS", "0").lower() in ("1", "true", "yes")
+STUB_NODE_BATCH = os.getenv("STUB_NODE_BATCH", "1").lower() in ("1", "true", "yes")
+STUB_NODE_MAX_BATCH = int(os.getenv("STUB_NODE_MAX_BATCH", "16"))
+STUB_NODE_CANCEL = os.getenv("STUB_NODE_CANCEL", "1").lower() in ("1", "true", "yes")
+
+CANNED_RESULTS: dict[str, Any] = {
+    "AvgBankBalance": 16250.0,
+    "AnnualBouncedCheques": 1,
+    "AnnualDigitalSalesAmt": 420000.0,
+    "AnnualDigitalTxn": 3100,
+    "AnnualEmi": 14000.0,
+    "AnnualPOSSalesAmt": 180000.0,
+    "AnnualPOSTnx": 52000,
+    "AnnualUtilityBillPaid": 41000.0,
+    "GetLoanDefaultCounts": 0,
+    "GetDebtToEquity": 0.8,
+    "GetProfitMargin": 12.62,
+    "GetRevenueGrowthRate": 6.4,
+    "GetEmployeeCount": 85,
+    "GetFilingStatus": "Filed on time",
+    "GetGSTTaxFilingStatus": "Filed",
+    "GetITRFiled": "Filed on time",
+}
+
+app = FastAPI(title="Stub MPC node")
+tasks: dict[str, dict[str, Any]] = {}
+running: dict[str, asyncio.Task] = {}
+callback_client = httpx.AsyncClient(timeout=10.0)
+
+
+async def _complete(task_id: str, payload: dict[str, Any]) -> None:
+    started = time.perf_counter()
+    await asyncio.sleep(STUB_NODE_DELAY * random.uniform(0.8, 1.2))
+
+    task = tasks[task_id]
+    task.update(status="success", time_taken=round(time.perf_counter() - started, 3), error=None)
+    query_str = payload.get("query_str")
+    if query_str is not None:
+        task["result"] = {"query": query_str, "value": CANNED_RESULTS.get(query_str)}
+    if "query_strs" in payload:
+        # one entry per query, in request order
+        task["result"] = [{"query": q, "value": CANNED_RESULTS.get(q)} for q in payload["query_strs"]]
+
+    if STUB_NODE_CALLBACKS and payload.get("callback_url"):
+        await callback_client.post(
+            payload["callback_url"],
+            json={"task_id": task_id, **task},
+            headers={"X-Callback-Token": payload.get("callback_token", "")},
+        )
+
+
+def _start(payload: dict[str, Any]) -> dict[str, str]:
+    task_id = str(uuid.uuid4())
+    tasks[task_id] = {"status": "running", "result": None, "error": None}
+    running[task_id] = asyncio.create_task(_complete(task_id, payload))
+    running[task_id].add_done_callback(lambda _: running.pop(task_id, None))
+    return {"task_id": task_id}
+
+
+@app.post("/relay")
+async def create_relay() -> dict[str, str]:
+    return {"relay_id": str(uuid.uuid4())}
+
+
+@app.post("/node/query")
+async def start_query(payload: dict[str, Any]) -> dict[str, str]:
+    return _start(payload)
+
+
+@app.get("/node/capabilities")
+async def capabilities() -> dict[str, Any]:
+    if not (STUB_NODE_BATCH or STUB_NODE_CANCEL):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"batch_query": STUB_NODE_BATCH, "max_batch_size": STUB_NODE_MAX_BATCH, "cancel_query": STUB_NODE_CANCEL}
+
+
+@app.post("/node/query-batch")
+async def start_query_batch(payload: dict[str, Any]) -> dict[str, str]:
+    if not STUB_NODE_BATCH:
+        raise HTTPException(status_code=404, detail="Not Found")
+    queries = payload.get("query_strs")
+    if not isinstance(queries, list) or not queries:
+        raise HTTPException(status_code=422, detail="query_strs must be a non-empty list")
+    if STUB_NODE_MAX_BATCH and len(queries) > STUB_NODE_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {STUB_NODE_MAX_BATCH} queries per batch")
+    return _start(payload)
+
+
+@app.post("/node/userdata")
+async def post_userdata(payload: dict[str, Any]) -> dict[str, str]:
+    return _start(payload)
+
+
+@app.get("/node/query/{task_id}")
+async def get_query(task_id: str) -> dict[str, Any]:
+    task = tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Unknown task")
+    return task
+
+
+@app.delete("/node/query/{task_id}")
+async def cancel_query(task_id: str) -> dict[str, Any]:
+    if not STUB_NODE_CANCEL:
+        raise HTTPException(status_code=405, detail="Method Not Allowed")
+    task = tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Unknown task")
+    if task_id not in running:
+        raise HTTPException(status_code=409, detail=f"Task already {task['status']}")
+    running[task_id].cancel()
+    task.update(status="cancelled", error="Cancelled")
+    return task
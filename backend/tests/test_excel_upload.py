@@ -0,0 +1,226 @@
+import importlib.util
+import io
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+
+from src.app.api.v1 import upload
+from src.app.core.excel import read_sheets
+
+ENGINES = ["openpyxl"] + (["calamine"] if importlib.util.find_spec("python_calamine") is not None else [])
+
+
+def workbook_bytes() -> bytes:
+    """A workbook in the upload layout: a title row, then headers, in every sheet"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    sheets = {
+        "Open Banking Data": (
+            ["Company Legal Name", "Year", "Month", "Primary Bank", "Monthly Bank Balance"],
+            [["Acme Ltd", 2024, 1, "HDFC", 1250.5], ["Beta Corp", 2024, 2, "SBI", 90.25]],
+        ),
+        "Tax Authorities": (
+            ["Company Legal Name", "Year", "Income tax Return Filed", "Filing Status", "GST/Tax Filing Status"],
+            [["Acme Ltd", 2023, "Yes", "Filed", "Regular"]],
+        ),
+    }
+    for name, (columns, rows) in sheets.items():
+        sheet = workbook.create_sheet(name)
+        sheet.append([name])
+        sheet.append(columns)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def spooled(contents: bytes, max_size: int) -> tempfile.SpooledTemporaryFile:
+    # left at its end: read_sheets must rewind it
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size)
+    spool.write(contents)
+    return spool
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("max_size", [64, 1 << 20], ids=["on-disk", "in-memory"])
+def test_read_sheets_from_spooled_file_matches_path(tmp_path: Path, engine: str, max_size: int) -> None:
+    contents = workbook_bytes()
+    path = tmp_path / "upload.xlsx"
+    path.write_bytes(contents)
+    names = ["Open Banking Data", "Tax Authorities", "Credit Bureaus"]
+
+    expected = read_sheets(str(path), names, engine)
+    with spooled(contents, max_size) as spool:
+        sheets = read_sheets(spool, names, engine)
+
+    for name in names[:2]:
+        assert isinstance(sheets[name], pd.DataFrame)
+        pd.testing.assert_frame_equal(sheets[name], expected[name])
+    assert len(sheets["Open Banking Data"]) == 2
+    # a missing sheet is its exception, not a failure of the whole workbook
+    assert isinstance(sheets["Credit Bureaus"], Exception)
+
+
+def test_read_sheets_rejects_a_file_that_is_not_a_workbook() -> None:
+    with spooled(b"not a workbook", 64) as spool, pytest.raises(Exception):
+        read_sheets(spool, ["Open Banking Data"])
+
+
+@pytest.fixture
+def upload_client() -> TestClient:
+    app = FastAPI()
+    app.include_router(upload.router)
+    return TestClient(app)
+
+
+def test_upload_excel(upload_client: TestClient) -> None:
+    response = upload_client.post("/api/upload-excel", files={"file": ("data.xlsx", workbook_bytes())})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["companies"] == ["Acme Ltd", "Beta Corp"]
+    assert [row["Primary Bank"] for row in body["sheets_data"]["Open Banking Data"]] == ["HDFC", "SBI"]
+
+
+def test_upload_excel_rejects_garbage(upload_client: TestClient) -> None:
+    response = upload_client.post("/api/upload-excel", files={"file": ("data.xlsx", b"not a workbook")})
+
+    assert response.status_code == 400
+
+
+# ---- generate-ciphertext/excel against upload-excel -> generate-json -> generate-ciphertext ----
+
+
+def awkward_sheets() -> dict[str, tuple[list[str], list[list[Any]]]]:
+    """Two companies whose sheets have blanks, infinities, numbers stored as text, mixed columns and missing ones"""
+    inf = float("inf")
+    return {
+        # no Monthly EMI column; Monthly POS Transactions mixes numbers and text
+        "Open Banking Data": (
+            [
+                "Company Legal Name",
+                "Year",
+                "Month",
+                "Primary Bank",
+                "Monthly POS Transactions",
+                "Monthly POS Sales Amount",
+                "Monthly Digital Transactions",
+                "Monthly Digital Sales Amount",
+                "Monthly Utility Bill Paid",
+                "Monthly Bank Balance",
+                "Monthly Number of Bounced Cheques",
+            ],
+            [
+                ["Acme Ltd", 2024, 1, "HDFC", 120, 1500.25, 30, 800.5, 90.75, 1250.5, 0],
+                ["Acme Ltd", 2024, 2, None, "n/a", None, 31.9, inf, "45.5", -inf, 2],
+                ["Beta Corp", 2024, 1, "SBI", 7, 10.0, 1, 2.0, 3.0, 4.0, 1],
+                ["Acme Ltd", "2024", 3.0, "", "140", "1600", None, 810.0, 91, 1300, None],
+            ],
+        ),
+        # Employees as text in one row and a float in another
+        "Financial statements - SME self": (
+            [
+                "Company Legal Name",
+                "Year",
+                "Annual Revenue",
+                "Net Profit",
+                "Total Liabilities",
+                "Total Debt",
+                "Shareholder Equity",
+                "Employees",
+            ],
+            [
+                ["Acme Ltd", 2023, 1.2e6, 150000, None, 90000.5, inf, "85"],
+                ["Acme Ltd", 2024, "1300000", 160000.75, 400000, None, 520000, 86.7],
+            ],
+        ),
+        # no GST/Tax Filing Status column
+        "Tax Authorities": (
+            ["Company Legal Name", "Year", "Income tax Return Filed", "Filing Status"],
+            [
+                ["Acme Ltd", 2023, "Yes", "Filed on time"],
+                ["Acme Ltd", None, "No", None],
+                ["Beta Corp", 2023, "Yes", "Late"],
+            ],
+        ),
+        # Loan Default Count all blank
+        "Credit Bureaus": (
+            ["Company Legal Name", "Year", "Loan Default Count"],
+            [["Acme Ltd", 2024, None], ["Acme Ltd", 2023.0, None]],
+        ),
+    }
+
+
+def awkward_workbook_bytes() -> bytes:
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name, (columns, rows) in awkward_sheets().items():
+        sheet = workbook.create_sheet(name)
+        sheet.append([name])
+        sheet.append(columns)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def encrypted(monkeypatch: pytest.MonkeyPatch) -> list[bytes]:
+    """The plaintext each generate-ciphertext call encrypts (the ciphertext itself is under a fresh key)"""
+    plaintexts: list[bytes] = []
+
+    def encrypt_category(category: str, plaintext: bytes | bytearray) -> dict[str, Any]:
+        plaintexts.append(bytes(plaintext))
+        return {"ciphertext": [], "client_info": {}}
+
+    monkeypatch.setattr(upload, "encrypt_category", encrypt_category)
+    return plaintexts
+
+
+@pytest.fixture(params=["workbook", "raw-frames"])
+def awkward_frames(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sheets as a workbook parse gives them, or as raw frames: the parse already turns text numbers into numbers
+    and drops infinities, so only the raw frames put object columns and infinities through company_columns
+    """
+    if request.param == "raw-frames":
+        frames = {name: pd.DataFrame(rows, columns=columns) for name, (columns, rows) in awkward_sheets().items()}
+
+        def read_sheets(file: Any, names: list[str], engine: str | None = None) -> dict[str, Any]:
+            return {name: frames[name].copy() for name in names}
+
+        monkeypatch.setattr(upload, "read_sheets", read_sheets)
+
+
+@pytest.mark.parametrize("category", list(upload.CATEGORY_SOURCES))
+@pytest.mark.parametrize("company", ["Acme Ltd", "Beta Corp", "Nobody Inc"])
+def test_excel_ciphertext_matches_the_json_round_trip(
+    upload_client: TestClient, awkward_frames: None, encrypted: list[bytes], category: str, company: str
+) -> None:
+    contents = awkward_workbook_bytes()
+
+    sheets = upload_client.post("/api/upload-excel", files={"file": ("data.xlsx", contents)}).json()["sheets_data"]
+    data = upload_client.post("/api/generate-json", json={"company": company, "excel_data": sheets}).json()
+    round_trip = upload_client.post("/api/generate-ciphertext", json={"category": category, "data": data})
+    direct = upload_client.post(
+        "/api/generate-ciphertext/excel",
+        files={"file": ("data.xlsx", contents)},
+        data={"company": company, "category": category},
+    )
+
+    assert round_trip.status_code == direct.status_code == 200
+    json_plaintext, excel_plaintext = encrypted
+    assert excel_plaintext == json_plaintext
+    codec = upload.CATEGORY_SOURCES[category][2]
+    assert len(excel_plaintext) == codec.size * len(data[upload.CATEGORY_SOURCES[category][0]])
+
+
+def test_company_columns_of_a_sheet_without_company_names() -> None:
+    assert upload.company_columns(pd.DataFrame({"Year": [2024]}), "Acme Ltd", "credit") == ({}, 0)
@@ -0,0 +1,159 @@
+"""Known answers for the fast key agreement: point_mul_g and X25519 must give the keys
+point_mul/convert2wei give, byte for byte, since that is what the MPC nodes derive."""
+
+import base64
+import random
+
+import pytest
+
+from src.app.core import key_material
+from src.app.core.curve25519 import (
+    G,
+    build_table,
+    convert2wei,
+    montgomery_u,
+    point_compress,
+    point_decompress,
+    point_mul,
+    point_mul_g,
+    q,
+    x25519_shared_key,
+)
+from src.app.core.key_material import (
+    BUILT_IN_SERVER_NONCE,
+    BUILT_IN_SERVER_PUBLIC_KEY,
+    KEY_AGREEMENT_KNOWN_ANSWERS,
+    KeyMaterial,
+    check_fast_key_agreement,
+    load_key_material,
+)
+
+SERVER_POINT = point_decompress(base64.b64decode(BUILT_IN_SERVER_PUBLIC_KEY))
+
+# scalars X25519 would clamp differently, or that the tables only just cover
+EDGE_SCALARS = [
+    0,
+    1,
+    2,
+    7,
+    8,
+    15,
+    16,
+    q - 1,
+    q,
+    q + 1,
+    8 * q,
+    2**254,
+    2**254 + 1,
+    2**255 - 19,
+    2**255 - 1,
+    2**255,
+    2**256 - 1,
+]
+
+# encodings of the small-order points: the identity, order 2, order 4 and two of order 8
+LOW_ORDER_POINTS = [
+    "0100000000000000000000000000000000000000000000000000000000000000",
+    "ecffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff7f",
+    "0000000000000000000000000000000000000000000000000000000000000000",
+    "26e8958fc2b227b045c3f489f2ef98f0d5dfac05d3c63339b13802886d53fc05",
+    "c7176a703d4dd84fba3c0b760d10670f2a2053fa2c39ccc64ec7fd7792ac037a",
+]
+
+
+def shared_key(private_key: int, point: tuple) -> bytes:
+    """The reference the nodes compute"""
+    return convert2wei(point_mul(private_key, point)).to_bytes(32, "big")
+
+
+def clamped(private_key: int) -> int:
+    return private_key & ((1 << 254) - 8) | 1 << 254
+
+
+@pytest.mark.parametrize("private_key, public_key, expected", KEY_AGREEMENT_KNOWN_ANSWERS)
+def test_known_answers(private_key: str, public_key: str, expected: str) -> None:
+    scalar = int(private_key, 16)
+
+    assert point_compress(point_mul(scalar, G)).hex() == public_key
+    assert point_compress(point_mul_g(scalar)).hex() == public_key
+    assert shared_key(scalar, SERVER_POINT).hex() == expected
+    assert x25519_shared_key(scalar, montgomery_u(SERVER_POINT)).hex() == expected
+
+
+def test_known_answers_check_passes() -> None:
+    assert check_fast_key_agreement() is True
+    assert key_material.FAST_KEY_AGREEMENT is True
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_known_answers_check_raises_on_mismatch(monkeypatch: pytest.MonkeyPatch, index: int) -> None:
+    private_key, public_key, expected = KEY_AGREEMENT_KNOWN_ANSWERS[0]
+    answers = [private_key, public_key, expected]
+    # a wrong public key fails point_mul_g, a wrong shared key X25519
+    answers[index + 1] = "00" * 32
+    monkeypatch.setattr(key_material, "KEY_AGREEMENT_KNOWN_ANSWERS", [tuple(answers)])
+
+    with pytest.raises(RuntimeError):
+        check_fast_key_agreement()
+
+
+@pytest.mark.parametrize("scalar", EDGE_SCALARS)
+def test_point_mul_g_edge_scalars(scalar: int) -> None:
+    assert point_compress(point_mul_g(scalar)) == point_compress(point_mul(scalar, G))
+
+
+def test_point_mul_g_random_scalars() -> None:
+    rng = random.Random(25519)
+    for _ in range(50):
+        scalar = rng.getrandbits(256)
+        assert point_compress(point_mul_g(scalar)) == point_compress(point_mul(scalar, G))
+
+
+def test_x25519_random_clamped_scalars() -> None:
+    rng = random.Random(25519)
+    server_u = montgomery_u(SERVER_POINT)
+    for _ in range(50):
+        scalar = clamped(rng.getrandbits(256))
+        assert x25519_shared_key(scalar, server_u) == shared_key(scalar, SERVER_POINT)
+
+
+@pytest.mark.parametrize("with_table", [False, True])
+@pytest.mark.parametrize("scalar", EDGE_SCALARS + [2**256, 2**300 + 5])
+def test_shared_key_unclamped_scalars(scalar: int, with_table: bool) -> None:
+    # X25519 would clamp these into another key: they must take point_mul or the table
+    material = load_key_material(BUILT_IN_SERVER_PUBLIC_KEY, BUILT_IN_SERVER_NONCE, "test", with_table)
+
+    assert material.shared_key(scalar) == shared_key(scalar, SERVER_POINT)
+
+
+@pytest.mark.parametrize("encoded", LOW_ORDER_POINTS)
+def test_shared_key_low_order_points(encoded: str) -> None:
+    point = point_decompress(bytes.fromhex(encoded))
+    assert point is not None
+    scalar = clamped(int(KEY_AGREEMENT_KNOWN_ANSWERS[2][0], 16))
+
+    # a clamped scalar is a multiple of 8, so the product is the identity: X25519's all-zero result
+    with pytest.raises(ValueError):
+        x25519_shared_key(scalar, montgomery_u(point))
+
+    material = KeyMaterial(
+        key_id="low-order",
+        point=point,
+        nonce=bytes(32),
+        source="test",
+        u=montgomery_u(point),
+        table=build_table(point),
+    )
+    assert material.shared_key(scalar) == shared_key(scalar, point)
+    assert material.shared_key(scalar + 1) == shared_key(scalar + 1, point)
+
+
+@pytest.mark.parametrize("encoded", LOW_ORDER_POINTS)
+def test_load_key_material_low_order_point(encoded: str) -> None:
+    public_key = base64.b64encode(bytes.fromhex(encoded)).decode()
+    material = load_key_material(public_key, BUILT_IN_SERVER_NONCE, "test")
+
+    # the load-time cross-check can't use X25519 on it, so every shared key is point_mul's
+    assert material.u is None
+    scalar = int(KEY_AGREEMENT_KNOWN_ANSWERS[0][0], 16)
+    assert material.shared_key(scalar) == shared_key(scalar, material.point)
@@ -0,0 +1,126 @@
+import json
+import time
+from typing import Any
+
+import pytest
+
+from src.app.core.mpc.completion import CHANNEL_PREFIX, CompletionRegistry
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis") -> None:
+        self.redis = redis
+        self.ops: list[tuple[str, str, str]] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+    def hset(self, key: str, field: str, value: str) -> None:
+        self.ops.append((key, field, value))
+
+    def expire(self, key: str, ttl: int) -> None:
+        pass
+
+    def publish(self, channel: str, data: str) -> None:
+        pass
+
+    async def execute(self) -> None:
+        for key, field, value in self.ops:
+            self.redis.hashes.setdefault(key, {})[field.encode()] = value.encode()
+
+
+class FakeRedis:
+    """The Redis calls CompletionRegistry makes: callbacks stored in a hash per session."""
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.hgetall_calls = 0
+
+    def pipeline(self, transaction: bool = False) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        self.hgetall_calls += 1
+        return dict(self.hashes.get(key, {}))
+
+
+@pytest.fixture
+def registry() -> CompletionRegistry:
+    registry = CompletionRegistry()
+    registry.enabled = True
+    registry.base_url = "http://backend"
+    registry._redis = FakeRedis()  # type: ignore[assignment]
+    return registry
+
+
+@pytest.mark.asyncio
+async def test_stored_callbacks_do_not_wake_waiter_again(registry: CompletionRegistry) -> None:
+    session = registry.open()
+    assert session is not None
+    callback_id = session["callback_id"]
+
+    # node 1 calls back, node 2 is still running
+    await registry.deliver(callback_id, {"task_id": 1, "status": "completed", "result": 42})
+    assert await registry.wait(callback_id, 1.0)
+    assert set(await registry.updates(callback_id)) == {"1"}
+
+    # nothing new: the entry re-read from Redis must not count as another callback
+    assert not await registry.wait(callback_id, 0.05)
+
+
+@pytest.mark.asyncio
+async def test_wait_updates_loop_does_not_spin_with_a_node_pending(registry: CompletionRegistry) -> None:
+    session = registry.open()
+    assert session is not None
+    callback_id = session["callback_id"]
+    await registry.deliver(callback_id, {"task_id": 1, "status": "completed", "result": 42})
+
+    # poll_tasks' loop while task 2 is pending and the next poll is further away than this
+    redis = registry._redis
+    assert isinstance(redis, FakeRedis)
+    woken = 0
+    deadline = time.monotonic() + 0.3
+    while time.monotonic() < deadline:
+        woken += await registry.wait(callback_id, deadline - time.monotonic())
+        updates = await registry.updates(callback_id)
+        assert "2" not in updates
+
+    # only node 1's callback wakes it; a timer firing a little early may cost one more pass, not a spin
+    assert woken == 1
+    assert redis.hgetall_calls <= 5
+
+
+@pytest.mark.asyncio
+async def test_callback_from_another_worker_wakes_waiter(registry: CompletionRegistry) -> None:
+    session = registry.open()
+    assert session is not None
+    callback_id = session["callback_id"]
+    await registry.deliver(callback_id, {"task_id": 1, "status": "completed", "result": 1})
+    assert await registry.wait(callback_id, 1.0)
+    await registry.updates(callback_id)
+
+    # node 2's callback lands on another worker: stored in Redis and published
+    payload = {"task_id": 2, "status": "completed", "result": 2}
+    redis = registry._redis
+    assert isinstance(redis, FakeRedis)
+    redis.hashes[f"{CHANNEL_PREFIX}{callback_id}"][b"2"] = json.dumps(payload).encode()
+    registry._store(callback_id, payload, create=False)
+
+    assert await registry.wait(callback_id, 1.0)
+    assert set(await registry.updates(callback_id)) == {"1", "2"}
+
+
+@pytest.mark.asyncio
+async def test_changed_status_for_same_task_wakes_waiter(registry: CompletionRegistry) -> None:
+    session = registry.open()
+    assert session is not None
+    callback_id = session["callback_id"]
+    await registry.deliver(callback_id, {"task_id": 1, "status": "running"})
+    assert await registry.wait(callback_id, 1.0)
+
+    await registry.deliver(callback_id, {"task_id": 1, "status": "completed", "result": 7})
+    assert await registry.wait(callback_id, 1.0)
+    assert (await registry.updates(callback_id))["1"]["status"] == "completed"
@@ -0,0 +1,199 @@
+import math
+import random
+import string
+from typing import Any
+
+import numpy as np
+import pytest
+
+from src.app.core.plaintext import BANKING, CREDIT, DECIMAL_PRECISION, FINANCIAL, RECORD_CODECS, TAX, RecordCodec
+
+# ---- the per-record encoders the codecs replaced, as they were ----
+
+
+def get_num_pltext_byte(value: Any) -> bytes:
+    return int(float(value) * 2**DECIMAL_PRECISION).to_bytes(8, "big")
+
+
+def padded(value: str, width: int) -> bytes:
+    return value.encode("utf-8") + b"\x00" * (width - len(value))
+
+
+def get_banking_plaintext(entry: dict[str, Any]) -> bytes:
+    pltext = padded(entry.get("Company Legal Name", ""), 60)
+    pltext += get_num_pltext_byte(str(entry.get("Year", 0)))
+    pltext += get_num_pltext_byte(str(entry.get("Month", 0)))
+    pltext += padded(entry.get("Primary Bank", ""), 20)
+    for field in [
+        "Monthly POS Transactions",
+        "Monthly POS Sales Amount",
+        "Monthly Digital Transactions",
+        "Monthly Digital Sales Amount",
+        "Monthly Utility Bill Paid",
+        "Monthly Bank Balance",
+        "Monthly EMI",
+        "Monthly Number of Bounced Cheques",
+    ]:
+        pltext += get_num_pltext_byte(str(entry.get(field, 0)))
+    return pltext
+
+
+def get_financial_plaintext(entry: dict[str, Any]) -> bytes:
+    pltext = padded(entry.get("Company Legal Name", ""), 60)
+    pltext += get_num_pltext_byte(str(entry.get("Year", 0)))
+    for field in ["Annual Revenue", "Net Profit", "Total Liabilities", "Total Debt", "Shareholder Equity", "Employees"]:
+        pltext += get_num_pltext_byte(str(entry.get(field, 0)))
+    return pltext
+
+
+def get_tax_plaintext(entry: dict[str, Any]) -> bytes:
+    pltext = padded(entry.get("Company Legal Name", ""), 60)
+    pltext += get_num_pltext_byte(str(entry.get("Year", 0)))
+    pltext += get_num_pltext_byte("1" if entry.get("Income tax Return Filed", "") == "Yes" else "0")
+    pltext += padded(entry.get("Filing Status", ""), 15)
+    pltext += padded(entry.get("GST/Tax Filing Status", ""), 10)
+    return pltext
+
+
+def get_credit_plaintext(entry: dict[str, Any]) -> bytes:
+    pltext = padded(entry.get("Company Legal Name", ""), 60)
+    pltext += get_num_pltext_byte(str(entry.get("Year", 0)))
+    pltext += get_num_pltext_byte(str(entry.get("Loan Default Count", 0)))
+    return pltext
+
+
+BASELINE = {
+    "banking": get_banking_plaintext,
+    "financial": get_financial_plaintext,
+    "tax": get_tax_plaintext,
+    "credit": get_credit_plaintext,
+}
+
+
+def random_records(codec: RecordCodec, rng: random.Random, count: int) -> list[dict[str, Any]]:
+    """Records as the frontend sends them: ASCII text, whole and fractional numbers, flags"""
+    records = []
+    for _ in range(count):
+        record: dict[str, Any] = {}
+        for f in codec.fields:
+            if f.kind == "text":
+                record[f.name] = "".join(rng.choices(string.ascii_letters + " .&-", k=rng.randint(0, f.width)))
+            elif f.kind == "flag":
+                record[f.name] = rng.choice([f.true_value, f.false_value, ""])
+            elif rng.random() < 0.5:
+                record[f.name] = rng.randint(0, 10**9)
+            else:
+                record[f.name] = round(rng.uniform(0, 1e7), rng.randint(0, 4))
+        records.append(record)
+    return records
+
+
+def columns_of(codec: RecordCodec, records: list[dict[str, Any]]) -> dict[str, Any]:
+    return {f.name: [record[f.name] for record in records] for f in codec.fields}
+
+
+@pytest.mark.parametrize("category", list(RECORD_CODECS))
+def test_encode_matches_baseline(category: str) -> None:
+    codec = RECORD_CODECS[category]
+    records = random_records(codec, random.Random(category), 500)
+
+    assert bytes(codec.encode(records)) == b"".join(BASELINE[category](record) for record in records)
+
+
+@pytest.mark.parametrize("category", list(RECORD_CODECS))
+def test_encode_matches_baseline_with_missing_fields(category: str) -> None:
+    codec = RECORD_CODECS[category]
+    # a missing field is an empty string or zero, as entry.get() defaulted it
+    records: list[dict[str, Any]] = [{}, {codec.fields[0].name: "Acme Ltd"}]
+
+    assert bytes(codec.encode(records)) == b"".join(BASELINE[category](record) for record in records)
+
+
+@pytest.mark.parametrize("category", list(RECORD_CODECS))
+def test_encode_columns_matches_encode(category: str) -> None:
+    codec = RECORD_CODECS[category]
+    records = random_records(codec, random.Random(f"columns-{category}"), 500)
+
+    encoded = codec.encode_columns(columns_of(codec, records), len(records))
+
+    assert bytes(encoded) == bytes(codec.encode(records))
+    assert len(encoded) == codec.size * len(records)
+
+
+def test_encode_columns_broadcasts_single_values() -> None:
+    records = [{"Company Legal Name": "Acme Ltd", "Year": 2024, "Loan Default Count": n} for n in range(3)]
+    columns = {"Company Legal Name": "Acme Ltd", "Year": 2024, "Loan Default Count": np.arange(3)}
+
+    assert bytes(CREDIT.encode_columns(columns, 3)) == bytes(CREDIT.encode(records))
+
+
+@pytest.mark.parametrize("category", list(RECORD_CODECS))
+def test_decode_round_trip(category: str) -> None:
+    codec = RECORD_CODECS[category]
+    records = random_records(codec, random.Random(f"decode-{category}"), 200)
+
+    decoded = codec.decode(codec.encode(records))
+
+    assert len(decoded) == len(records)
+    for record, back in zip(records, decoded):
+        for f in codec.fields:
+            if f.kind == "text":
+                assert back[f.name] == record[f.name]
+            elif f.kind == "flag":
+                assert back[f.name] == (f.true_value if record[f.name] == f.true_value else f.false_value)
+            else:
+                # fixed point keeps DECIMAL_PRECISION fractional bits, truncated
+                assert back[f.name] == math.trunc(float(record[f.name]) * 2**DECIMAL_PRECISION) / 2**DECIMAL_PRECISION
+
+
+def test_decode_round_trip_of_encoded_output_is_stable() -> None:
+    records = random_records(BANKING, random.Random("stable"), 50)
+    encoded = bytes(BANKING.encode(records))
+
+    assert bytes(BANKING.encode(BANKING.decode(encoded))) == encoded
+
+
+def test_decode_rejects_partial_record() -> None:
+    with pytest.raises(ValueError):
+        CREDIT.decode(bytes(CREDIT.size + 1))
+
+
+@pytest.mark.parametrize("codec", [BANKING, TAX])
+def test_over_width_text_raises(codec: RecordCodec) -> None:
+    name = "x" * 61
+    record = {"Company Legal Name": name}
+
+    with pytest.raises(ValueError, match="Company Legal Name"):
+        codec.encode([record])
+    with pytest.raises(ValueError, match="Company Legal Name"):
+        codec.encode_columns({"Company Legal Name": [name]}, 1)
+
+
+def test_over_width_multibyte_text_raises() -> None:
+    # 30 characters but 90 bytes of UTF-8: the width is in bytes
+    name = "€" * 30
+
+    with pytest.raises(ValueError):
+        CREDIT.encode([{"Company Legal Name": name}])
+    with pytest.raises(ValueError):
+        CREDIT.encode_columns({"Company Legal Name": [name]}, 1)
+
+
+@pytest.mark.parametrize("value", [-1, -0.5, float("nan"), float("inf"), 2.0**64, "not a number"])
+def test_invalid_number_raises(value: Any) -> None:
+    with pytest.raises(ValueError, match="Net Profit"):
+        FINANCIAL.encode([{"Net Profit": value}])
+
+
+@pytest.mark.parametrize("value", [-1, -0.5, float("nan"), float("inf"), 2.0**64])
+def test_invalid_number_column_raises(value: float) -> None:
+    with pytest.raises(ValueError, match="Net Profit"):
+        FINANCIAL.encode_columns({"Net Profit": [1.0, value]}, 2)
+
+
+def test_tiny_negative_number_encodes_as_zero() -> None:
+    # truncation toward zero, as int() did before
+    value = -0.5 / 2**DECIMAL_PRECISION
+
+    assert bytes(FINANCIAL.encode([{"Net Profit": value}])) == bytes(FINANCIAL.encode([{"Net Profit": 0}]))
+    assert bytes(FINANCIAL.encode_columns({"Net Profit": [value]}, 1)) == bytes(FINANCIAL.encode([{}]))
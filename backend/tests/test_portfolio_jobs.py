@@ -0,0 +1,399 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from arq.jobs import JobStatus
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.app.api.v1 import portfolio, query
+from src.app.core.config import settings
+from src.app.core.db.database import async_get_db
+from src.app.core.mpc import polling
+from src.app.core.mpc.cancellation import task_canceller
+from src.app.core.utils import queue
+from src.app.core.worker import functions
+from src.app.crud import sme, user
+from src.app.crud.crud_loan import crud_loans, loan
+from src.app.crud.crud_score import crud_scores
+from src.app.middleware.client_cache_middleware import ClientCacheMiddleware
+from tests.helpers import stub_node
+from tests.helpers.fake_redis import FakePool, FakeRedis
+from tests.helpers.stub_cluster import NODE_URLS, RELAY_URL, StubNodes, query_request, wait_for_tasks
+
+QUERIES_PER_TARGET = sum(len(queries) for queries in query.QUERIES.values())
+
+
+def portfolio_request(**kwargs: Any) -> portfolio.PortfolioScoreRequest:
+    return portfolio.PortfolioScoreRequest(
+        year=2024,
+        start_date="2024-01-01",
+        end_date="2024-12-31",
+        relay_server_url=RELAY_URL,
+        mpc_node_urls=NODE_URLS,
+        **kwargs,
+    )
+
+
+def target(sme_id: int, loan_id: int | None = None) -> portfolio.PortfolioTarget:
+    return portfolio.PortfolioTarget(
+        sme_id=sme_id, loan_id=loan_id, email=f"sme-{sme_id}@example.com", company_name=f"SME {sme_id}"
+    )
+
+
+# ---- scheduling ----
+
+
+def runs(*sizes: int) -> list[portfolio.TargetRun]:
+    return [portfolio.TargetRun(target(sme_id), [query_request()] * size) for sme_id, size in enumerate(sizes)]
+
+
+def schedule(target_runs: list[portfolio.TargetRun], max_active: int) -> list[tuple[int, int]]:
+    return [(run.target.sme_id, index) for run, index in portfolio.interleave(target_runs, max_active)]
+
+
+def test_interleave_goes_round_robin_across_the_window() -> None:
+    assert schedule(runs(3, 3, 3), max_active=3) == [
+        (0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1), (0, 2), (1, 2), (2, 2),
+    ]  # fmt: skip
+
+
+def test_interleave_lets_the_next_target_in_once_one_is_handed_out() -> None:
+    assert schedule(runs(3, 3, 3), max_active=2) == [
+        (0, 0), (1, 0), (0, 1), (1, 1), (0, 2), (1, 2), (2, 0), (2, 1), (2, 2),
+    ]  # fmt: skip
+
+
+def test_interleave_keeps_at_most_max_active_targets_in_flight() -> None:
+    target_runs = runs(*[4, 1, 6, 2, 5, 3] * 5)
+    handed_out: dict[int, int] = {}
+
+    for run, index in portfolio.interleave(target_runs, max_active=4):
+        handed_out[run.target.sme_id] = index + 1
+        started = sum(1 for sme_id, count in handed_out.items() if count < len(target_runs[sme_id].query_requests))
+        assert started <= 4
+
+    assert handed_out == {run.target.sme_id: len(run.query_requests) for run in target_runs}
+
+
+def test_interleave_drops_a_failed_target() -> None:
+    target_runs = runs(3, 3)
+    order = []
+
+    for run, index in portfolio.interleave(target_runs, max_active=2):
+        order.append((run.target.sme_id, index))
+        if (run.target.sme_id, index) == (0, 0):
+            run.failed = True
+
+    assert order == [(0, 0), (1, 0), (1, 1), (1, 2)]
+
+
+# ---- running a portfolio ----
+
+
+class Recorder:
+    """Collects what run_portfolio reports"""
+
+    def __init__(self) -> None:
+        self.scores: dict[int, dict[str, Any]] = {}
+        self.failures: dict[int, str] = {}
+        self.queries: list[int] = []
+
+    async def on_score(self, scored: portfolio.PortfolioTarget, result: dict[str, Any]) -> None:
+        self.scores[scored.sme_id] = result
+
+    async def on_failure(self, failed: portfolio.PortfolioTarget, error: Exception) -> None:
+        self.failures[failed.sme_id] = str(error)
+
+    async def on_query(self, queried: portfolio.PortfolioTarget) -> None:
+        self.queries.append(queried.sme_id)
+
+
+@pytest.fixture
+def fast_polling(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Probe the stub nodes as soon as their results can be in, for tests that run queries one at a time"""
+    monkeypatch.setattr(polling, "DEFAULT_POLL_STRATEGY", polling.PollStrategy(first_probe=0.05, base_delay=0.02))
+
+
+@pytest.fixture
+def failing_sme(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Queries of SME 2 fail; returns the query of each run_query call made for it"""
+    run_query = portfolio.run_query
+    calls: list[str] = []
+
+    async def flaky_run_query(query_request: query.QueryRequest, *args: Any) -> dict[str, Any]:
+        if query_request.email == "sme-2@example.com":
+            calls.append(query_request.query_str or "")
+            raise RuntimeError("node 2 unreachable")
+        return await run_query(query_request, *args)
+
+    monkeypatch.setattr(portfolio, "run_query", flaky_run_query)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_run_portfolio_scores_every_target(stub_nodes: StubNodes) -> None:
+    recorder = Recorder()
+
+    await portfolio.run_portfolio(
+        portfolio_request(), [target(1), target(3)], recorder.on_score, recorder.on_failure, recorder.on_query
+    )
+
+    assert set(recorder.scores) == {1, 3}
+    assert recorder.scores[1]["score"] == recorder.scores[3]["score"]
+    assert recorder.failures == {}
+    assert sorted(recorder.queries) == [1] * QUERIES_PER_TARGET + [3] * QUERIES_PER_TARGET
+    # every query of both targets went to the three nodes once
+    assert stub_nodes.sent("POST", "/node/query") == 3 * 2 * QUERIES_PER_TARGET
+
+
+@pytest.mark.asyncio
+async def test_run_portfolio_skips_the_rest_of_a_failed_target(
+    stub_nodes: StubNodes, fast_polling: None, failing_sme: list[str]
+) -> None:
+    recorder = Recorder()
+
+    # one query at a time, so nothing of SME 2 is in flight when its first query fails
+    await portfolio.run_portfolio(
+        portfolio_request(max_concurrency=1),
+        [target(1), target(2), target(3)],
+        recorder.on_score,
+        recorder.on_failure,
+        recorder.on_query,
+    )
+
+    assert len(failing_sme) == 1
+    assert recorder.failures == {2: "node 2 unreachable"}
+    assert set(recorder.scores) == {1, 3}
+    assert 2 not in recorder.queries
+
+
+# ---- the job ----
+
+
+class Loans:
+    """Records the insights_status written to each loan and the scores persisted, by the API and the worker"""
+
+    def __init__(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.statuses: dict[int, list[str]] = {}
+        self.scores: list[Any] = []
+
+        async def update(db: Any, object: dict[str, Any], id: int, **kwargs: Any) -> None:
+            self.statuses.setdefault(id, []).append(object["insights_status"])
+
+        async def create(db: Any, object: Any, **kwargs: Any) -> SimpleNamespace:
+            self.scores.append(object)
+            return SimpleNamespace(id=len(self.scores))
+
+        @asynccontextmanager
+        async def local_session() -> AsyncIterator[Mock]:
+            yield Mock()
+
+        monkeypatch.setattr(crud_loans, "update", update)
+        monkeypatch.setattr(crud_scores, "create", create)
+        monkeypatch.setattr(functions, "local_session", local_session)
+
+
+@pytest.fixture
+def loans(monkeypatch: pytest.MonkeyPatch) -> Loans:
+    return Loans(monkeypatch)
+
+
+def job_targets(*targets: portfolio.PortfolioTarget) -> list[dict[str, Any]]:
+    return [t.model_dump() for t in targets]
+
+
+@pytest.mark.asyncio
+async def test_portfolio_job_reports_progress_and_insights_status(
+    stub_nodes: StubNodes, fast_polling: None, loans: Loans, failing_sme: list[str]
+) -> None:
+    redis = FakeRedis()
+    request = portfolio_request(max_concurrency=1).model_dump()
+
+    summary = await functions.generate_portfolio_job(
+        {"job_id": "job-1", "redis": redis}, request, job_targets(target(1, 10), target(2, 20), target(3))
+    )
+
+    progress = await queue.read_portfolio_job_progress(redis, "job-1")
+    assert progress == summary
+    assert {key: value for key, value in summary.items() if key not in ("tiers", "results")} == {
+        "status": "complete",
+        "total_targets": 3,
+        "completed_targets": 2,
+        "failed_targets": 1,
+        "total_queries": 3 * QUERIES_PER_TARGET,
+        "completed_queries": 2 * QUERIES_PER_TARGET,
+    }
+    tier = loans.scores[0].tier
+    assert summary["tiers"] == {tier: 2}
+    # SME 2 fails on its first query, while SME 1 is still being scored
+    assert summary["results"] == [
+        {"sme_id": 2, "loan_id": 20, "status": "failed", "error": "node 2 unreachable"},
+        {"sme_id": 1, "loan_id": 10, "status": "complete", "score_id": 1, "score": loans.scores[0].score, "tier": tier},
+        {
+            "sme_id": 3,
+            "loan_id": None,
+            "status": "complete",
+            "score_id": 2,
+            "score": loans.scores[1].score,
+            "tier": tier,
+        },
+    ]
+    assert [(s.sme_id, s.loan_id, s.portfolio_job_id) for s in loans.scores] == [(1, 10, "job-1"), (3, None, "job-1")]
+    assert loans.statuses == {10: ["Generated"], 20: ["Failed"]}
+    assert redis.ttls[queue.portfolio_job_progress_key("job-1")] == settings.SCORE_JOB_RESULT_TTL
+    assert redis.ttls[queue.portfolio_job_results_key("job-1")] == settings.SCORE_JOB_RESULT_TTL
+
+
+@pytest.mark.asyncio
+async def test_retried_portfolio_job_starts_its_progress_over(stub_nodes: StubNodes, loans: Loans) -> None:
+    redis = FakeRedis()
+    ctx = {"job_id": "job-1", "redis": redis}
+    request = portfolio_request().model_dump()
+
+    await functions.generate_portfolio_job(ctx, request, job_targets(target(1, 10)))
+    summary = await functions.generate_portfolio_job(ctx, request, job_targets(target(1, 10)))
+
+    progress = await queue.read_portfolio_job_progress(redis, "job-1")
+    assert progress == summary
+    assert progress is not None
+    assert (progress["completed_targets"], len(progress["results"])) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_portfolio_job_marks_unscored_loans(
+    stub_nodes: StubNodes, loans: Loans, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(stub_node, "STUB_NODE_DELAY", 30.0)
+    redis = FakeRedis()
+    job = asyncio.create_task(
+        functions.generate_portfolio_job(
+            {"job_id": "job-1", "redis": redis},
+            portfolio_request(max_concurrency=1).model_dump(),
+            job_targets(target(1, 10), target(2, 20)),
+        )
+    )
+    await wait_for_tasks(len(NODE_URLS))
+
+    job.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await job
+    await task_canceller.drain()
+
+    progress = await queue.read_portfolio_job_progress(redis, "job-1")
+    assert progress is not None
+    assert (progress["status"], progress["completed_targets"]) == ("cancelled", 0)
+    assert loans.statuses == {10: ["Cancelled"], 20: ["Cancelled"]}
+
+
+# ---- the API ----
+
+
+@pytest.fixture
+def portfolio_client() -> TestClient:
+    app = FastAPI()
+    app.include_router(portfolio.router)
+    app.add_middleware(ClientCacheMiddleware, max_age=60)
+    app.dependency_overrides[async_get_db] = lambda: Mock()
+    return TestClient(app)
+
+
+@pytest.fixture
+def book(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Loans 10 (SME 1), 20 (SME 2, deleted) and 30 (SME 3, whose user is gone), SMEs 1-4"""
+    loans = {
+        10: SimpleNamespace(id=10, sme_id=1, is_deleted=False),
+        20: SimpleNamespace(id=20, sme_id=2, is_deleted=True),
+        30: SimpleNamespace(id=30, sme_id=3, is_deleted=False),
+    }
+
+    async def get_loans_by_ids(db: Any, ids: list[int]) -> list[SimpleNamespace]:
+        return [loans[loan_id] for loan_id in ids if loan_id in loans]
+
+    async def get_names_by_ids(db: Any, ids: list[int]) -> dict[int, str]:
+        return {sme_id: f"SME {sme_id}" for sme_id in ids if sme_id <= 4}
+
+    async def get_emails_by_sme_ids(db: Any, sme_ids: list[int]) -> dict[int, str]:
+        return {sme_id: f"sme-{sme_id}@example.com" for sme_id in sme_ids if sme_id != 3}
+
+    monkeypatch.setattr(loan, "get_loans_by_ids", get_loans_by_ids)
+    monkeypatch.setattr(sme, "get_names_by_ids", get_names_by_ids)
+    monkeypatch.setattr(user, "get_emails_by_sme_ids", get_emails_by_sme_ids)
+
+
+def test_create_portfolio_job_enqueues_the_targets(
+    portfolio_client: TestClient, book: None, loans: Loans, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    pool = FakePool()
+    monkeypatch.setattr(queue, "pool", pool)
+    request = portfolio_request().model_dump(exclude={"loan_ids", "sme_ids", "lending_bank_id"})
+
+    response = portfolio_client.post(
+        "/api/portfolio-jobs", json={**request, "loan_ids": [10, 20, 30, 10], "sme_ids": [1, 4, 9]}
+    )
+
+    assert response.status_code == 201
+    assert response.json() == {
+        "job_id": "job-1",
+        "total_targets": 3,
+        "skipped": [
+            {"sme_id": 2, "loan_id": 20, "reason": "Loan deleted"},
+            {"sme_id": 3, "loan_id": 30, "reason": "SME or its user not found"},
+            {"sme_id": 9, "loan_id": None, "reason": "SME or its user not found"},
+        ],
+    }
+    [(args, kwargs)] = pool.jobs
+    assert args == ("generate_portfolio_job", request, job_targets(target(1, 10), target(1), target(4)))
+    assert "traceparent" in kwargs
+    assert loans.statuses == {10: ["Queued"]}
+
+
+def test_create_portfolio_job_with_unknown_loan_is_not_found(
+    portfolio_client: TestClient, book: None, loans: Loans, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    pool = FakePool()
+    monkeypatch.setattr(queue, "pool", pool)
+
+    response = portfolio_client.post(
+        "/api/portfolio-jobs", json={**portfolio_request().model_dump(), "loan_ids": [10, 11]}
+    )
+
+    assert response.status_code == 404
+    assert pool.jobs == []
+    assert loans.statuses == {}
+
+
+def test_portfolio_job_status_reads_progress(portfolio_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    class RunningJob:
+        def __init__(self, job_id: str, pool: Any) -> None:
+            pass
+
+        async def status(self) -> JobStatus:
+            return JobStatus.in_progress
+
+    redis = FakeRedis()
+    asyncio.run(redis.hset(queue.portfolio_job_progress_key("abc"), mapping={"status": "running", "total_targets": 2}))
+    asyncio.run(redis.hincrby(queue.portfolio_job_progress_key("abc"), "tier:B", 1))
+    asyncio.run(redis.rpush(queue.portfolio_job_results_key("abc"), '{"sme_id": 1, "status": "complete"}'))
+    monkeypatch.setattr(queue, "pool", redis)
+    monkeypatch.setattr("src.app.api.v1.score_jobs.ArqJob", RunningJob)
+
+    response = portfolio_client.get("/api/portfolio-jobs/abc")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "job_id": "abc",
+        "status": "in_progress",
+        "progress": {
+            "status": "running",
+            "total_targets": 2,
+            "tiers": {"B": 1},
+            "results": [{"sme_id": 1, "status": "complete"}],
+        },
+    }
+    # polled for progress: never cached
+    assert response.headers["Cache-Control"] == "no-store"
@@ -0,0 +1,72 @@
+from typing import Any
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.app.api.v1 import upload
+from src.app.core.config import ScoreCacheSettings
+from src.app.core.utils.cache import ResultCache
+
+
+@pytest.mark.asyncio
+async def test_in_process_cache_keeps_query_results_for_score_ttl() -> None:
+    cache = ResultCache()
+    await cache.start(
+        ScoreCacheSettings(SCORE_CACHE_TTL=300, SCORE_CACHE_QUERY_TTL=86400, SCORE_CACHE_REDIS_ENABLED=False)
+    )
+
+    assert cache.backend == "memory"
+    assert cache.query_ttl == 300
+
+
+@pytest.mark.asyncio
+async def test_unreachable_redis_keeps_query_results_for_score_ttl() -> None:
+    cache = ResultCache()
+    await cache.start(
+        ScoreCacheSettings(SCORE_CACHE_TTL=300, SCORE_CACHE_QUERY_TTL=86400, REDIS_CACHE_URL="redis://127.0.0.1:1")
+    )
+
+    assert cache.backend == "memory"
+    assert cache.query_ttl == 300
+
+
+@pytest.mark.asyncio
+async def test_failed_version_bump_returns_none() -> None:
+    cache = ResultCache()
+    cache._redis = Mock()
+    cache._redis.incr = AsyncMock(side_effect=ConnectionError("redis down"))
+
+    assert await cache.bump_data_version("a@example.com", "banking") is None
+
+
+@pytest.mark.parametrize("version, stale", [(3, False), (None, True)])
+@pytest.mark.asyncio
+async def test_upload_flags_failed_version_bump(
+    monkeypatch: pytest.MonkeyPatch, version: int | None, stale: bool
+) -> None:
+    async def dispatch_to_nodes(node_urls: list[str], path: str, bodies: list[bytes], **kwargs: Any) -> list[dict]:
+        return [
+            {"node": i + 1, "status": "success", "task_id": i, "latency_ms": 1.0} for i in range(len(node_urls))
+        ]
+
+    cache = Mock()
+    cache.bump_data_version = AsyncMock(return_value=version)
+    cache.invalidate = AsyncMock(return_value=2)
+    monkeypatch.setattr(upload, "dispatch_to_nodes", dispatch_to_nodes)
+    monkeypatch.setattr(upload, "node_health", Mock())
+    monkeypatch.setattr(upload, "result_cache", cache)
+
+    request = upload.PostToMPCRequest(
+        category="banking",
+        ciphertext=[{"data": "x"}],
+        client_info={},
+        email="a@example.com",
+        start_date="2024-01-01",
+        end_date="2024-12-31",
+        relay_id="relay",
+    )
+    response = await upload.post_to_mpc_nodes(request)
+
+    assert len(response["results"]) == 3
+    assert response.get("cache_stale", False) is stale
+    cache.invalidate.assert_awaited_once()
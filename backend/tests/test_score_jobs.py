@@ -0,0 +1,216 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from arq.jobs import JobStatus
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.app.api.v1 import query, score_jobs
+from src.app.core import scorecard
+from src.app.core.config import settings
+from src.app.core.db.database import async_get_db
+from src.app.core.utils import queue
+from src.app.core.worker import functions
+from src.app.crud.crud_loan import crud_loans
+from src.app.middleware.client_cache_middleware import ClientCacheMiddleware
+from tests.helpers.fake_redis import FakePool, FakeRedis
+from tests.helpers.stub_cluster import StubNodes, score_request
+
+TOTAL_QUERIES = sum(len(queries) for queries in query.QUERIES.values())
+
+
+class Loans:
+    """Records the insights_status written to each loan, by the API and by the worker"""
+
+    def __init__(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.known = {7}
+        self.statuses: dict[int, list[str]] = {}
+
+        async def get(db: Any, id: int, **kwargs: Any) -> dict[str, Any] | None:
+            return {"id": id} if id in self.known else None
+
+        async def update(db: Any, object: dict[str, Any], id: int, **kwargs: Any) -> None:
+            self.statuses.setdefault(id, []).append(object["insights_status"])
+
+        @asynccontextmanager
+        async def local_session() -> AsyncIterator[Mock]:
+            yield Mock()
+
+        monkeypatch.setattr(crud_loans, "get", get)
+        monkeypatch.setattr(crud_loans, "update", update)
+        monkeypatch.setattr(functions, "local_session", local_session)
+
+
+@pytest.fixture
+def loans(monkeypatch: pytest.MonkeyPatch) -> Loans:
+    return Loans(monkeypatch)
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch) -> FakePool:
+    fake_pool = FakePool()
+    monkeypatch.setattr(queue, "pool", fake_pool)
+    return fake_pool
+
+
+@pytest.fixture
+def jobs_client() -> TestClient:
+    app = FastAPI()
+    app.include_router(score_jobs.router)
+    app.add_middleware(ClientCacheMiddleware, max_age=60)
+    app.dependency_overrides[async_get_db] = lambda: Mock()
+    return TestClient(app)
+
+
+# ---- queueing ----
+
+
+def test_create_score_job_enqueues_it_and_queues_the_loan(
+    jobs_client: TestClient, pool: FakePool, loans: Loans
+) -> None:
+    request = score_request().model_dump()
+
+    response = jobs_client.post("/api/score-jobs", json={**request, "loan_id": 7})
+
+    assert response.status_code == 201
+    assert response.json() == {"job_id": "job-1"}
+    [(args, kwargs)] = pool.jobs
+    assert args == ("generate_score_job", request, 7)
+    assert "traceparent" in kwargs
+    assert loans.statuses == {7: ["Queued"]}
+
+
+def test_create_score_job_for_unknown_loan_is_not_found(jobs_client: TestClient, pool: FakePool, loans: Loans) -> None:
+    response = jobs_client.post("/api/score-jobs", json={**score_request().model_dump(), "loan_id": 8})
+
+    assert response.status_code == 404
+    assert pool.jobs == []
+    assert loans.statuses == {}
+
+
+def test_create_score_job_without_queue_is_unavailable(jobs_client: TestClient, loans: Loans) -> None:
+    response = jobs_client.post("/api/score-jobs", json=score_request().model_dump())
+
+    assert response.status_code == 503
+
+
+# ---- the job ----
+
+
+@pytest.mark.asyncio
+async def test_score_job_reports_progress_and_insights_status(stub_nodes: StubNodes, loans: Loans) -> None:
+    redis = FakeRedis()
+
+    result = await functions.generate_score_job({"job_id": "job-1", "redis": redis}, score_request().model_dump(), 7)
+
+    progress = await queue.read_score_job_progress(redis, "job-1")
+    assert progress is not None
+    assert progress["status"] == "complete"
+    assert progress["completed_queries"] == progress["total_queries"] == TOTAL_QUERIES
+    assert (progress["score"], progress["tier"]) == (result["score"], result["tier"])
+    assert set(progress["category_subtotals"]) == set(scorecard.DEFAULT_SPEC.categories)
+    assert redis.ttls[queue.score_job_progress_key("job-1")] == settings.SCORE_JOB_RESULT_TTL
+    generating = [f"Generating {n}/{TOTAL_QUERIES}" for n in range(1, TOTAL_QUERIES + 1)]
+    assert loans.statuses == {7: ["Generating", *generating, "Generated"]}
+
+
+@pytest.mark.asyncio
+async def test_failed_score_job_reports_the_error(loans: Loans, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def run_score(*args: Any, **kwargs: Any) -> dict[str, Any]:
+        raise RuntimeError("relay unreachable")
+
+    monkeypatch.setattr(functions, "run_score", run_score)
+    redis = FakeRedis()
+
+    with pytest.raises(RuntimeError):
+        await functions.generate_score_job({"job_id": "job-1", "redis": redis}, score_request().model_dump(), 7)
+
+    progress = await queue.read_score_job_progress(redis, "job-1")
+    assert progress is not None
+    assert (progress["status"], progress["error"]) == ("failed", "relay unreachable")
+    assert loans.statuses == {7: ["Generating", "Failed"]}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_score_job_reports_it(loans: Loans, monkeypatch: pytest.MonkeyPatch) -> None:
+    started = asyncio.Event()
+
+    async def run_score(*args: Any, **kwargs: Any) -> dict[str, Any]:
+        started.set()
+        await asyncio.sleep(30)
+        return {}
+
+    monkeypatch.setattr(functions, "run_score", run_score)
+    redis = FakeRedis()
+    job = asyncio.create_task(
+        functions.generate_score_job({"job_id": "job-1", "redis": redis}, score_request().model_dump(), 7)
+    )
+    await started.wait()
+
+    job.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await job
+
+    progress = await queue.read_score_job_progress(redis, "job-1")
+    assert progress is not None
+    assert progress["status"] == "cancelled"
+    assert loans.statuses == {7: ["Generating", "Cancelled"]}
+
+
+@pytest.mark.asyncio
+async def test_score_job_without_loan_writes_no_insights_status(stub_nodes: StubNodes, loans: Loans) -> None:
+    await functions.generate_score_job({"job_id": "job-1", "redis": FakeRedis()}, score_request().model_dump())
+
+    assert loans.statuses == {}
+
+
+# ---- status ----
+
+
+class CompleteJob:
+    """A finished job, as arq reports it"""
+
+    def __init__(self, job_id: str, pool: Any) -> None:
+        pass
+
+    async def status(self) -> JobStatus:
+        return JobStatus.complete
+
+    async def result_info(self) -> SimpleNamespace:
+        return SimpleNamespace(success=True, result={"score": 71.5, "tier": "B"})
+
+
+def test_score_job_status_reads_progress_and_result(jobs_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    redis = FakeRedis()
+    asyncio.run(redis.set(queue.score_job_progress_key("abc"), '{"status": "complete", "completed_queries": 16}'))
+    monkeypatch.setattr(queue, "pool", redis)
+    monkeypatch.setattr(score_jobs, "ArqJob", CompleteJob)
+
+    response = jobs_client.get("/api/score-jobs/abc")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "job_id": "abc",
+        "status": "complete",
+        "progress": {"status": "complete", "completed_queries": 16},
+        "success": True,
+        "result": {"score": 71.5, "tier": "B"},
+    }
+    # polled for progress: never cached
+    assert response.headers["Cache-Control"] == "no-store"
+
+
+def test_unknown_score_job_is_not_found(jobs_client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    class MissingJob(CompleteJob):
+        async def status(self) -> JobStatus:
+            return JobStatus.not_found
+
+    monkeypatch.setattr(queue, "pool", FakeRedis())
+    monkeypatch.setattr(score_jobs, "ArqJob", MissingJob)
+
+    assert jobs_client.get("/api/score-jobs/abc").status_code == 404
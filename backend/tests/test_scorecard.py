@@ -0,0 +1,432 @@
+import math
+import random
+from typing import Any
+
+import pytest
+
+from src.app.api.v1.query import QUERIES, summarize_score
+from src.app.core.scorecard import DEFAULT_SPEC, Scorecard, scorecard
+
+# ---- the scoring functions the scorecard replaced, as they were ----
+
+
+def calculate_metric_score(metric: str, value: Any) -> float:  # noqa: C901
+    if value is None or value == "":
+        return 0.0
+
+    try:
+        val = float(value)
+    except (ValueError, TypeError):
+        if metric in ["GetFilingStatus", "GetITRFiled"]:
+            val_str = str(value).lower()
+            if "filed on time" in val_str or val_str == "filed on time":
+                return 10.0
+            elif "filed late" in val_str or val_str == "filed late":
+                return 2.5
+            elif "filed" in val_str:
+                return 10.0
+            return 0.0
+        if metric == "GetGSTTaxFilingStatus":
+            return 10.0 if "filed" in str(value).lower() else 0.0
+        return 0.0
+
+    if metric == "GetProfitMargin":
+        percent = val
+        if percent < 0:
+            return 0.0
+        if percent < 5:
+            return 2.5
+        if percent < 10:
+            return 5.0
+        if percent < 20:
+            return 7.5
+        return 10.0
+
+    if metric == "GetDebtToEquity":
+        if val < 0.5:
+            return 10.0
+        if val < 1:
+            return 7.5
+        if val < 1.5:
+            return 5.0
+        if val < 2:
+            return 2.5
+        return 0.0
+
+    if metric == "GetRevenueGrowthRate":
+        percent = val
+        if percent < 2.5:
+            return 0.0
+        if percent < 5:
+            return 2.5
+        if percent < 10:
+            return 5.0
+        if percent < 15:
+            return 7.5
+        return 10.0
+
+    if metric == "AvgBankBalance":
+        if val < 5000:
+            return 0.0
+        if val < 10000:
+            return 2.5
+        if val < 15000:
+            return 5.0
+        if val < 20000:
+            return 7.5
+        return 10.0
+
+    if metric == "AnnualBouncedCheques":
+        if val == 0:
+            return 10.0
+        if val == 1:
+            return 7.5
+        if val == 2:
+            return 5.0
+        return 0.0
+
+    if metric == "GetLoanDefaultCounts":
+        if val == 0:
+            return 10.0
+        if val == 1:
+            return 7.5
+        if val == 2:
+            return 5.0
+        return 0.0
+
+    if metric == "GetEmployeeCount":
+        if val < 50:
+            return 5.0
+        if val < 100:
+            return 7.5
+        return 10.0
+
+    if metric == "AnnualUtilityBillPaid":
+        if val < 20000:
+            return 0.0
+        if val < 35000:
+            return 2.5
+        if val < 45000:
+            return 5.0
+        if val < 55000:
+            return 7.5
+        return 10.0
+
+    if metric == "AnnualPOSTnx":
+        if val < 30000:
+            return 0.0
+        if val < 45000:
+            return 2.5
+        if val < 60000:
+            return 5.0
+        if val < 75000:
+            return 7.5
+        return 10.0
+
+    return 0.0
+
+
+def get_metric_weight(metric: str) -> float:
+    weights = {
+        "GetProfitMargin": 15.0,
+        "GetDebtToEquity": 10.0,
+        "GetRevenueGrowthRate": 10.0,
+        "AvgBankBalance": 10.0,
+        "EMICoverageRatio": 10.0,
+        "AnnualBouncedCheques": 5.0,
+        "GetFilingStatus": 10.0,
+        "GetGSTTaxFilingStatus": 5.0,
+        "GetLoanDefaultCounts": 5.0,
+        "GetEmployeeCount": 5.0,
+        "AnnualUtilityBillPaid": 5.0,
+        "AnnualPOSTnx": 10.0,
+    }
+    return weights.get(metric, 0.0)
+
+
+def calculate_emi_coverage_ratio(all_results: dict[str, dict[str, Any]]) -> float:
+    try:
+        banking_results = all_results.get("banking", {})
+        digital_sales = 0.0
+        digital_txn = 0.0
+        pos_sales = 0.0
+        annual_emi = 0.0
+        for query_name, data in banking_results.items():
+            if isinstance(data, dict) and "error" not in data:
+                if query_name == "AnnualDigitalSalesAmt":
+                    for key, value in data.items():
+                        if key != "query" and value is not None:
+                            digital_sales = float(value)
+                elif query_name == "AnnualDigitalTxn":
+                    for key, value in data.items():
+                        if key != "query" and value is not None:
+                            digital_txn = float(value)
+                elif query_name == "AnnualPOSSalesAmt":
+                    for key, value in data.items():
+                        if key != "query" and value is not None:
+                            pos_sales = float(value)
+                elif query_name == "AnnualEmi":
+                    for key, value in data.items():
+                        if key != "query" and value is not None:
+                            annual_emi = float(value)
+        if annual_emi > 0:
+            return (digital_sales + digital_txn + pos_sales) / annual_emi
+        return 0.0
+    except Exception:
+        return 0.0
+
+
+def calculate_emi_coverage_score(ratio: float) -> float:
+    if ratio < 15:
+        return 0.0
+    if ratio < 25:
+        return 2.5
+    if ratio < 35:
+        return 5.0
+    if ratio < 45:
+        return 7.5
+    return 10.0
+
+
+def calculate_total_score(all_results: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    category_scores: dict[str, dict[str, Any]] = {
+        "Financial Health": {"score": 0.0, "weight": 35.0, "details": []},
+        "Liquidity & Repayment": {"score": 0.0, "weight": 25.0, "details": []},
+        "Compliance Behavior": {"score": 0.0, "weight": 20.0, "details": []},
+        "Operational Size & Stability": {"score": 0.0, "weight": 20.0, "details": []},
+    }
+
+    emi_coverage_ratio = calculate_emi_coverage_ratio(all_results)
+    emi_coverage_score = calculate_emi_coverage_score(emi_coverage_ratio)
+    emi_weight = get_metric_weight("EMICoverageRatio")
+
+    category_scores["Liquidity & Repayment"]["details"].append(
+        {
+            "metric": "EMI Coverage Ratio",
+            "value": emi_coverage_ratio,
+            "score": emi_coverage_score,
+            "weight": emi_weight,
+            "product": (emi_coverage_score / 10.0) * emi_weight,
+        }
+    )
+    category_scores["Liquidity & Repayment"]["score"] += (emi_coverage_score / 10.0) * emi_weight
+
+    category_mapping = {
+        "GetProfitMargin": "Financial Health",
+        "GetDebtToEquity": "Financial Health",
+        "GetRevenueGrowthRate": "Financial Health",
+        "AvgBankBalance": "Liquidity & Repayment",
+        "AnnualBouncedCheques": "Liquidity & Repayment",
+        "GetFilingStatus": "Compliance Behavior",
+        "GetITRFiled": "Compliance Behavior",
+        "GetGSTTaxFilingStatus": "Compliance Behavior",
+        "GetLoanDefaultCounts": "Compliance Behavior",
+        "GetEmployeeCount": "Operational Size & Stability",
+        "AnnualUtilityBillPaid": "Operational Size & Stability",
+        "AnnualPOSTnx": "Operational Size & Stability",
+    }
+
+    for category, queries in all_results.items():
+        for query_name, data in queries.items():
+            if query_name in ["AnnualEmi", "AnnualDigitalSalesAmt", "AnnualDigitalTxn", "AnnualPOSSalesAmt"]:
+                continue
+            if query_name not in category_mapping:
+                continue
+            if data and not isinstance(data, dict) or (isinstance(data, dict) and "error" not in data):
+                if isinstance(data, dict):
+                    for key, value in data.items():
+                        if key != "query":
+                            score = calculate_metric_score(query_name, value)
+                            weight = get_metric_weight(query_name)
+                            product = (score / 10.0) * weight
+                            cat_name = category_mapping[query_name]
+                            category_scores[cat_name]["details"].append(
+                                {
+                                    "metric": query_name,
+                                    "value": value,
+                                    "score": score,
+                                    "weight": weight,
+                                    "product": product,
+                                }
+                            )
+                            category_scores[cat_name]["score"] += product
+
+    total_score = sum(cat["score"] for cat in category_scores.values())
+    return {
+        "total_score": round(total_score, 2),
+        "category_breakdown": category_scores,
+        "emi_coverage_ratio": emi_coverage_ratio,
+    }
+
+
+def score_result(total_score: float) -> dict[str, Any]:
+    result = scorecard.score({})
+    result["total_score"] = total_score
+    return result
+
+
+@pytest.mark.parametrize(
+    "total_score, tier",
+    [(74.44, "B"), (74.46, "A"), (74.9, "A"), (75.0, "A"), (60.2, "B"), (59.9, "C")],
+)
+def test_fractional_tier_cutoff(total_score: float, tier: str) -> None:
+    card = Scorecard(DEFAULT_SPEC.override(tier_cutoffs={"A": 74.5, "B": 60.1}))
+
+    summary = summarize_score(score_result(total_score), card)
+
+    # the score shown is rounded to one decimal, and that is what the tier goes by
+    assert summary["score"] == round(total_score, 1)
+    assert summary["tier"] == tier
+
+
+@pytest.mark.parametrize("total_score, tier", [(74.9, "B"), (75.0, "A"), (60.0, "B"), (59.94, "C"), (0.0, "C")])
+def test_default_tier_cutoffs(total_score: float, tier: str) -> None:
+    assert summarize_score(score_result(total_score))["tier"] == tier
+
+
+def random_value(rng: random.Random) -> Any:
+    """A query value as nodes return them: numbers around the band edges, or something odd"""
+    kind = rng.random()
+    if kind < 0.45:
+        return rng.choice([0, 1, 2, 3, 0.5, 1.5, 2.5, 5, 10, 15, 20, 50, 100, 5000, 20000, 45000, 75000])
+    if kind < 0.7:
+        return round(rng.uniform(-10, 100000), rng.randint(0, 3))
+    return rng.choice(
+        [
+            None,
+            "",
+            float("nan"),
+            float("inf"),
+            float("-inf"),
+            "nan",
+            "12.5",
+            "0",
+            "Filed on time",
+            "Filed late",
+            "filed",
+            "Not Filed",
+            "pending",
+            True,
+        ]
+    )
+
+
+def random_results(rng: random.Random) -> dict[str, dict[str, Any]]:
+    """One company's ``raw_results``, with failed, missing and malformed queries mixed in"""
+    all_results: dict[str, dict[str, Any]] = {}
+    for category, queries in QUERIES.items():
+        if rng.random() < 0.1:
+            continue
+        results: dict[str, Any] = {}
+        for query_str in rng.sample(queries, len(queries)):
+            kind = rng.random()
+            if kind < 0.1:
+                continue
+            if kind < 0.2:
+                results[query_str] = {"error": "node 2: Polling timeout"}
+            elif kind < 0.25:
+                results[query_str] = rng.choice([None, "oops", [1, 2], 7])
+            elif kind < 0.3:
+                results[query_str] = {"query": query_str, "value": random_value(rng), "extra": random_value(rng)}
+            else:
+                results[query_str] = {"query": query_str, "value": random_value(rng)}
+        all_results[category] = results
+    return all_results
+
+
+def same(a: Any, b: Any) -> bool:
+    # repr compares NaN values (which never equal themselves) as well
+    return repr(a) == repr(b)
+
+
+def test_score_matches_baseline() -> None:
+    rng = random.Random(11)
+    for _ in range(2000):
+        all_results = random_results(rng)
+        assert same(scorecard.score(all_results), calculate_total_score(all_results)), all_results
+
+
+@pytest.mark.parametrize("query_str", [q for queries in QUERIES.values() for q in queries])
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        "",
+        float("nan"),
+        float("inf"),
+        "text",
+        "Filed late",
+        "Filed on time",
+        "Not Filed",
+        "3",
+        -1,
+        0,
+        1,
+        2,
+        0.4999,
+        0.5,
+        2.5,
+        4.99,
+        5,
+        10,
+        14.99,
+        15,
+        20,
+        49,
+        50,
+        99.5,
+        100,
+        5000,
+        19999.99,
+        20000,
+        30000,
+        54999,
+        75000,
+    ],
+)
+def test_metric_score_matches_baseline(query_str: str, value: Any) -> None:
+    assert scorecard.metric_score(query_str, value) == calculate_metric_score(query_str, value)
+
+
+@pytest.mark.parametrize(
+    "banking, ratio",
+    [
+        # (420000 + 3100 + 180000) / 14000
+        (
+            {
+                "AnnualDigitalSalesAmt": 420000,
+                "AnnualDigitalTxn": 3100,
+                "AnnualPOSSalesAmt": 180000,
+                "AnnualEmi": 14000,
+            },
+            43.07857142857143,
+        ),
+        ({"AnnualDigitalSalesAmt": 420000, "AnnualEmi": 0}, 0.0),
+        ({"AnnualDigitalSalesAmt": 420000, "AnnualEmi": {"error": "Polling timeout"}}, 0.0),
+        ({"AnnualDigitalSalesAmt": 420000}, 0.0),
+        ({"AnnualDigitalSalesAmt": 420000, "AnnualEmi": "n/a"}, 0.0),
+        ({"AnnualDigitalSalesAmt": None, "AnnualPOSSalesAmt": "3000", "AnnualEmi": "100"}, 30.0),
+        ({"AnnualDigitalSalesAmt": float("nan"), "AnnualEmi": 100}, float("nan")),
+    ],
+)
+def test_emi_coverage_ratio_matches_baseline(banking: dict[str, Any], ratio: float) -> None:
+    all_results = {
+        "banking": {
+            query_str: value if isinstance(value, dict) else {"query": query_str, "value": value}
+            for query_str, value in banking.items()
+        }
+    }
+
+    assert same(scorecard.emi_coverage_ratio(all_results), ratio)
+    assert same(scorecard.emi_coverage_ratio(all_results), calculate_emi_coverage_ratio(all_results))
+    if not math.isnan(ratio):
+        assert scorecard.emi_coverage_score(ratio) == calculate_emi_coverage_score(ratio)
+
+
+def test_score_batch_matches_score() -> None:
+    rng = random.Random(12)
+    rows = [random_results(rng) for _ in range(300)]
+
+    assert same(scorecard.score_batch(rows), [scorecard.score(row) for row in rows])
+    assert same(scorecard.score_batch(rows), [calculate_total_score(row) for row in rows])
+    assert scorecard.score_batch([]) == []
@@ -0,0 +1,101 @@
+import asyncio
+import base64
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from src.app.core import key_material
+from src.app.core.config import MPCServerKeySettings
+from src.app.core.curve25519 import point_compress, point_mul_g
+from src.app.core.key_material import BUILT_IN_SERVER_NONCE, ServerKeyStore
+
+
+def write_key(path: Path, scalar: int) -> str:
+    """Write a key file for the key pair of ``scalar``, returning its base64 public key"""
+    public_key = base64.b64encode(point_compress(point_mul_g(scalar))).decode()
+    path.write_text(json.dumps({"public_key": public_key, "nonce": BUILT_IN_SERVER_NONCE}))
+    return public_key
+
+
+async def wait_for_rotation(store: ServerKeyStore, key_id: str) -> None:
+    for _ in range(200):
+        if store.current().key_id != key_id:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("key file change not picked up")
+
+
+@pytest.mark.asyncio
+async def test_key_file_rotates_in_background(tmp_path: Path) -> None:
+    key_file = tmp_path / "server-key.json"
+    write_key(key_file, 1234567)
+    store = ServerKeyStore()
+    await store.start(MPCServerKeySettings(MPC_SERVER_KEY_FILE=str(key_file), MPC_SERVER_KEY_CHECK_INTERVAL=0.02))
+    try:
+        first = store.current()
+        assert first.source == str(key_file)
+
+        write_key(key_file, 7654321)
+        # a different size or mtime is what marks the file changed
+        os.utime(key_file, ns=(1, 1))
+        await wait_for_rotation(store, first.key_id)
+
+        assert store.rotations == 1
+        assert store.snapshot()["key_id"] == store.current().key_id
+    finally:
+        await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_current_does_not_touch_the_key_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    key_file = tmp_path / "server-key.json"
+    write_key(key_file, 1234567)
+    store = ServerKeyStore()
+    await store.start(MPCServerKeySettings(MPC_SERVER_KEY_FILE=str(key_file), MPC_SERVER_KEY_CHECK_INTERVAL=3600))
+    try:
+        stats = []
+        real_stat = os.stat
+        monkeypatch.setattr(key_material.os, "stat", lambda *args: stats.append(args) or real_stat(*args))
+
+        for _ in range(100):
+            store.current()
+
+        assert stats == []
+    finally:
+        await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_unusable_key_file_keeps_current_key(tmp_path: Path) -> None:
+    key_file = tmp_path / "server-key.json"
+    write_key(key_file, 1234567)
+    store = ServerKeyStore()
+    await store.start(MPCServerKeySettings(MPC_SERVER_KEY_FILE=str(key_file), MPC_SERVER_KEY_CHECK_INTERVAL=0.02))
+    try:
+        key_id = store.current().key_id
+        key_file.write_text('{"public_key": "not base64!", "nonce": ""}')
+        await asyncio.sleep(0.1)
+        key_file.unlink()
+        await asyncio.sleep(0.1)
+
+        assert store.current().key_id == key_id
+        assert store.rotations == 0
+    finally:
+        await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_ends_the_watcher(tmp_path: Path) -> None:
+    key_file = tmp_path / "server-key.json"
+    write_key(key_file, 1234567)
+    store = ServerKeyStore()
+    await store.start(MPCServerKeySettings(MPC_SERVER_KEY_FILE=str(key_file), MPC_SERVER_KEY_CHECK_INTERVAL=0.02))
+    await store.stop()
+    key_id = store.current().key_id
+
+    write_key(key_file, 7654321)
+    await asyncio.sleep(0.1)
+
+    assert store.current().key_id == key_id
@@ -0,0 +1,90 @@
+import json
+from typing import Any
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import HTTPException
+
+from src.app.core.exceptions.mpc_exceptions import NodeUnavailableError, SingleFlightError
+from src.app.core.mpc.singleflight import SingleFlight
+
+
+def worker(acquires_lock: bool) -> SingleFlight:
+    """A SingleFlight coordinating through a stand-in Redis whose lock it does or doesn't get"""
+    lock = Mock()
+    lock.acquire = AsyncMock(return_value=acquires_lock)
+    lock.release = AsyncMock()
+    redis = Mock()
+    redis.lock = Mock(return_value=lock)
+    redis.delete = AsyncMock()
+
+    single_flight = SingleFlight()
+    single_flight.enabled = True
+    single_flight._redis = redis
+    return single_flight
+
+
+async def leader_outcome(error: Exception) -> dict[str, Any]:
+    """What a leader failing with ``error`` publishes, as a follower reads it back from Redis"""
+    leader = worker(acquires_lock=True)
+    published: list[dict[str, Any]] = []
+
+    async def publish(key: str, outcome: dict[str, Any]) -> None:
+        published.append(json.loads(json.dumps(outcome, default=str)))
+
+    async def fail() -> None:
+        raise error
+
+    leader._publish = publish  # type: ignore[method-assign]
+    with pytest.raises(type(error)):
+        await leader.run(fail, "query", 1)
+    return published[0]
+
+
+async def follow(outcome: dict[str, Any]) -> None:
+    follower = worker(acquires_lock=False)
+    follower._follow = AsyncMock(return_value=outcome)  # type: ignore[method-assign]
+    await follower.run(AsyncMock(), "query", 1)
+
+
+@pytest.mark.asyncio
+async def test_follower_gets_leader_result() -> None:
+    follower = worker(acquires_lock=False)
+    follower._follow = AsyncMock(return_value={"result": {"value": 42}})  # type: ignore[method-assign]
+    fn = AsyncMock()
+
+    assert await follower.run(fn, "query", 1) == ({"value": 42}, True)
+    fn.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_follower_raises_node_unavailable() -> None:
+    outcome = await leader_outcome(NodeUnavailableError("MPC node 2 is unavailable"))
+
+    with pytest.raises(NodeUnavailableError, match="MPC node 2 is unavailable"):
+        await follow(outcome)
+
+
+@pytest.mark.asyncio
+async def test_follower_raises_http_exception_with_status() -> None:
+    outcome = await leader_outcome(HTTPException(status_code=503, detail="Node down"))
+
+    with pytest.raises(HTTPException) as raised:
+        await follow(outcome)
+    assert raised.value.status_code == 503
+    assert raised.value.detail == "Node down"
+
+
+@pytest.mark.asyncio
+async def test_follower_raises_other_errors_as_single_flight_error() -> None:
+    outcome = await leader_outcome(KeyError("relay_id"))
+
+    with pytest.raises(SingleFlightError, match="relay_id"):
+        await follow(outcome)
+
+
+@pytest.mark.asyncio
+async def test_follower_of_older_leader_outcome() -> None:
+    # published before outcomes carried the error type
+    with pytest.raises(SingleFlightError, match="boom"):
+        await follow({"error": "boom"})
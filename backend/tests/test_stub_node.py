@@ -0,0 +1,232 @@
+import asyncio
+import json
+from typing import Any
+from unittest.mock import Mock
+
+import httpx
+import pytest
+from arq.jobs import JobStatus
+from fastapi import FastAPI, HTTPException
+from starlette.requests import Request
+
+from src.app.api.v1 import query, score_jobs
+from src.app.core.mpc.cancellation import task_canceller
+from src.app.core.mpc.capabilities import node_capabilities
+from src.app.core.mpc.completion import completions
+from src.app.core.utils import queue
+from src.app.core.worker.functions import generate_score_job
+from tests.helpers import stub_node
+from tests.helpers.fake_redis import FakeRedis
+from tests.helpers.stub_cluster import NODE_URLS, StubNodes, canned, query_request, score_request, wait_for_tasks
+
+backend = FastAPI()
+backend.include_router(query.router, prefix="/api/v1")
+backend.include_router(score_jobs.router, prefix="/api/v1")
+
+
+# ---- batch dispatch and its per-query fallback ----
+
+
+@pytest.mark.asyncio
+async def test_batch_query_runs_one_task_per_node(stub_nodes: StubNodes) -> None:
+    query_strs = query.QUERIES["banking"]
+
+    results = await query.run_batch_query(query_request(query_strs=query_strs))
+
+    assert [r["query_str"] for r in results] == query_strs
+    assert [r["result"] for r in results] == [{"success": True, "data": canned(q)} for q in query_strs]
+    # one relay session for all of them
+    assert len({r["relay_id"] for r in results}) == 1
+    assert stub_nodes.sent("POST", "/node/query-batch") == 3
+    assert stub_nodes.sent("POST", "/node/query") == 0
+    assert stub_nodes.sent("POST", "/relay") == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_query_is_split_at_max_batch_size(stub_nodes: StubNodes, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(stub_node, "STUB_NODE_MAX_BATCH", 3)
+    query_strs = query.QUERIES["banking"]
+
+    response = await query.execute_query(query_request(query_strs=query_strs))
+
+    assert response["batch"] is True
+    assert [d["query_strs"] for d in response["dispatches"]] == [query_strs[0:3], query_strs[3:6], query_strs[6:8]]
+    assert stub_nodes.sent("POST", "/node/query-batch") == 9
+
+
+@pytest.mark.parametrize("cancel", [True, False], ids=["no-batch", "no-capabilities"])
+@pytest.mark.asyncio
+async def test_batch_query_falls_back_to_one_task_per_query(
+    stub_nodes: StubNodes, monkeypatch: pytest.MonkeyPatch, cancel: bool
+) -> None:
+    # without either capability, GET /node/capabilities answers 404 like an older node
+    monkeypatch.setattr(stub_node, "STUB_NODE_BATCH", False)
+    monkeypatch.setattr(stub_node, "STUB_NODE_CANCEL", cancel)
+    query_strs = query.QUERIES["financial"]
+
+    results = await query.run_batch_query(query_request(category="financial", query_strs=query_strs))
+
+    assert [r["result"] for r in results] == [{"success": True, "data": canned(q)} for q in query_strs]
+    assert len({r["relay_id"] for r in results}) == len(query_strs)
+    assert stub_nodes.sent("POST", "/node/query-batch") == 0
+    assert stub_nodes.sent("POST", "/node/query") == 3 * len(query_strs)
+
+
+@pytest.mark.asyncio
+async def test_batch_disabled_falls_back_to_one_task_per_query(
+    stub_nodes: StubNodes, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(node_capabilities, "batch_enabled", False)
+    query_strs = query.QUERIES["tax"]
+
+    response = await query.execute_query(query_request(category="tax", query_strs=query_strs))
+
+    assert response["batch"] is False
+    assert [d["query_strs"] for d in response["dispatches"]] == [[q] for q in query_strs]
+    assert stub_nodes.sent("POST", "/node/query-batch") == 0
+
+
+# ---- completion callbacks ----
+
+
+@pytest.fixture
+def callbacks(stub_nodes: StubNodes, monkeypatch: pytest.MonkeyPatch) -> list[httpx.Response]:
+    """Nodes push their results to the backend's callback endpoint; returns its responses"""
+    received: list[httpx.Response] = []
+
+    async def record(response: httpx.Response) -> None:
+        received.append(response)
+
+    monkeypatch.setattr(stub_node, "STUB_NODE_CALLBACKS", True)
+    monkeypatch.setattr(
+        stub_node,
+        "callback_client",
+        httpx.AsyncClient(transport=httpx.ASGITransport(app=backend), event_hooks={"response": [record]}),
+    )
+    monkeypatch.setattr(completions, "enabled", True)
+    monkeypatch.setattr(completions, "base_url", "http://backend")
+    return received
+
+
+@pytest.mark.asyncio
+async def test_query_completes_from_node_callbacks(stub_nodes: StubNodes, callbacks: list[httpx.Response]) -> None:
+    result = await query.run_query(query_request(query_str="AvgBankBalance"))
+
+    assert result["result"] == {"success": True, "data": canned("AvgBankBalance")}
+    assert [response.status_code for response in callbacks] == [200, 200, 200]
+    # the results were pushed: no node was polled
+    assert stub_nodes.sent("GET", "/node/query/") == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_query_completes_from_node_callbacks(
+    stub_nodes: StubNodes, callbacks: list[httpx.Response]
+) -> None:
+    query_strs = query.QUERIES["financial"]
+
+    results = await query.run_batch_query(query_request(category="financial", query_strs=query_strs))
+
+    assert [r["result"] for r in results] == [{"success": True, "data": canned(q)} for q in query_strs]
+    assert len(callbacks) == 3
+    assert stub_nodes.sent("GET", "/node/query/") == 0
+
+
+@pytest.mark.asyncio
+async def test_callback_with_wrong_token_is_rejected() -> None:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=backend), base_url="http://backend") as client:
+        response = await client.post(
+            "/api/v1/api/mpc-callback/abc",
+            json={"task_id": "t", "status": "success"},
+            headers={"X-Callback-Token": "wrong"},
+        )
+
+    assert response.status_code == 401
+
+
+# ---- cancellation of node tasks ----
+
+
+def disconnecting_request(task_count: int) -> Request:
+    """A /api/generate-score request whose client goes away once the nodes run ``task_count`` tasks"""
+
+    async def receive() -> dict[str, Any]:
+        await wait_for_tasks(task_count)
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "scheme": "http",
+        "server": ("backend", 80),
+        "path": "/api/v1/api/generate-score",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+    }
+    return Request(scope, receive)
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_node_tasks(stub_nodes: StubNodes, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(stub_node, "STUB_NODE_DELAY", 30.0)
+    # one batch per category on each node
+    task_count = len(query.QUERIES) * len(NODE_URLS)
+
+    with pytest.raises(HTTPException) as raised:
+        await query.generate_score(score_request(), disconnecting_request(task_count))
+    await task_canceller.drain()
+
+    assert raised.value.status_code == 499
+    assert len(stub_node.tasks) == task_count
+    assert all(task["status"] == "cancelled" for task in stub_node.tasks.values())
+    assert stub_nodes.sent("DELETE", "/node/query/") == task_count
+
+
+@pytest.mark.asyncio
+async def test_nodes_without_cancel_get_no_delete(stub_nodes: StubNodes, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(stub_node, "STUB_NODE_DELAY", 30.0)
+    monkeypatch.setattr(stub_node, "STUB_NODE_CANCEL", False)
+    task_count = len(query.QUERIES) * len(NODE_URLS)
+
+    with pytest.raises(HTTPException):
+        await query.generate_score(score_request(), disconnecting_request(task_count))
+    await task_canceller.drain()
+
+    assert stub_nodes.sent("DELETE", "/node/query/") == 0
+    assert all(task["status"] == "running" for task in stub_node.tasks.values())
+
+
+@pytest.mark.asyncio
+async def test_delete_score_job_cancels_node_tasks(stub_nodes: StubNodes, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(stub_node, "STUB_NODE_DELAY", 30.0)
+    task_count = len(query.QUERIES) * len(NODE_URLS)
+    redis = FakeRedis()
+    job = asyncio.create_task(generate_score_job({"job_id": "job-1", "redis": redis}, score_request().model_dump()))
+
+    class RunningJob:
+        """The queued job, aborted the way arq's worker does it: by cancelling the job's task"""
+
+        def __init__(self, job_id: str, pool: Any) -> None:
+            pass
+
+        async def status(self) -> JobStatus:
+            return JobStatus.in_progress
+
+        async def abort(self, timeout: float | None = None) -> bool:
+            job.cancel()
+            await asyncio.gather(job, return_exceptions=True)
+            return True
+
+    monkeypatch.setattr(score_jobs, "ArqJob", RunningJob)
+    monkeypatch.setattr(queue, "pool", Mock())
+    await wait_for_tasks(task_count)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=backend), base_url="http://backend") as client:
+        response = await client.delete("/api/v1/api/score-jobs/job-1")
+    await task_canceller.drain()
+
+    assert response.status_code == 202
+    assert response.json() == {"job_id": "job-1", "status": "cancelled"}
+    assert json.loads(redis.values[queue.score_job_progress_key("job-1")])["status"] == "cancelled"
+    assert all(task["status"] == "cancelled" for task in stub_node.tasks.values())
+    assert stub_nodes.sent("DELETE", "/node/query/") == task_count